@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: LKSMEvent serialization throughput (events/second).
+
+"before" reproduces the original path — a plain ``@dataclass`` whose
+``to_dict()`` is ``dataclasses.asdict`` followed by ``json.dumps``, done
+once by the logger and again by the dashboard.  "after" uses the slotted
+``LKSMEvent``: ``to_dict()`` + ``json.dumps`` for a like-for-like
+comparison, and ``to_json()`` shared between the two consumers.
+
+Usage:
+    python benchmarks/bench_event_serialize.py [N_EVENTS]
+"""
+
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from python_tools.core.module_base import LKSMEvent
+
+
+@dataclass
+class OldEvent:
+    seq: int
+    ts: float
+    type: str
+    data: Dict[str, Any]
+    severity: str = "info"
+    source: str = "unknown"
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def make(cls, n):
+    return [cls(seq=i, ts=120.0 + i * 1e-3, type="kprobe_registered",
+                data={"symbol": f"sym_{i % 97}"}, source="kprobe_reader")
+            for i in range(n)]
+
+
+def bench(label, fn, events):
+    t0 = time.perf_counter()
+    fn(events)
+    dt = time.perf_counter() - t0
+    print(f"{label:<44} {dt:7.3f}s {len(events) / dt:12,.0f} events/s")
+    return dt
+
+
+def old_two_consumers(events):
+    for ev in events:
+        json.dumps(ev.to_dict())    # logger
+        json.dumps(ev.to_dict())    # dashboard
+
+
+def new_dict_dumps(events):
+    for ev in events:
+        json.dumps(ev.to_dict())
+
+
+def new_two_consumers(events):
+    for ev in events:
+        ev.to_json()                # logger encodes
+        ev.to_json()                # dashboard reuses the cached bytes
+
+
+def main() -> int:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    old_events = make(OldEvent, n)
+    print(f"{n:,} events\n")
+    before = bench("before: asdict + dumps (single consumer)",
+                   lambda evs: [json.dumps(e.to_dict()) for e in evs], old_events)
+    after = bench("after:  to_dict + dumps (single consumer)", new_dict_dumps, make(LKSMEvent, n))
+    before2 = bench("before: logger + dashboard", old_two_consumers, old_events)
+    after2 = bench("after:  logger + dashboard (shared to_json)", new_two_consumers, make(LKSMEvent, n))
+    print(f"\nspeedup: {before / after:.1f}x single, {before2 / after2:.1f}x logger+dashboard")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
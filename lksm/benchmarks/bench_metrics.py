@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Overhead benchmark: cost of metrics on ModuleRegistry.poll_all().
+
+Polls a registry of cheap modules (each returning a few events, the fast
+path where instrumentation weighs most) N times with and without a
+MetricsRegistry, and reports the added time per poll cycle and per
+histogram observation.
+
+Usage:
+    python benchmarks/bench_metrics.py [N_CYCLES] [N_MODULES]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from python_tools.core.metrics import Histogram, MetricsRegistry
+from python_tools.core.module_base import LKSMEvent, ModuleRegistry, MonitorModule
+
+
+class _Cheap(MonitorModule):
+    def __init__(self, name):
+        self._name = name
+        self._batch = [LKSMEvent(seq=0, ts=0.0, type="t", data={}) for _ in range(4)]
+
+    @property
+    def name(self):
+        return self._name
+
+    def start(self, config):
+        pass
+
+    def stop(self):
+        pass
+
+    def poll(self):
+        return list(self._batch)
+
+
+def bench(label, metrics, n, n_modules):
+    reg = ModuleRegistry(metrics=metrics)
+    for i in range(n_modules):
+        reg.register(_Cheap(f"m{i}"))
+    poll_all = reg.poll_all
+    t0 = time.perf_counter()
+    for _ in range(n):
+        poll_all()
+    dt = time.perf_counter() - t0
+    print(f"{label:<24} {dt:8.3f}s {dt / n * 1e6:8.2f} us/cycle")
+    return dt
+
+
+def main() -> int:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    n_modules = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    print(f"{n:,} poll cycles, {n_modules} modules\n")
+    off = bench("metrics off", None, n, n_modules)
+    on = bench("metrics on", MetricsRegistry(), n, n_modules)
+    print(f"\noverhead: {(on - off) / n * 1e6:.2f} us/cycle ({(on / off - 1) * 100:.1f}%)")
+
+    h = Histogram()
+    t0 = time.perf_counter()
+    for i in range(n):
+        h.observe(i * 1e-7)
+    print(f"Histogram.observe: {(time.perf_counter() - t0) / n * 1e9:.0f} ns")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: kprobe events decoded per second, text vs binary transport.
+
+Decodes the same N kprobe registrations once as ``/dev/kmsg`` printk records
+(``parse_kmsg_records``) and once as fixed-layout ``/proc/lksm`` records
+(``decode_records``).  Unlike ``bench_photon_parser.py`` there is no kernel
+noise: every record is an event, which is the storm case.
+
+Usage:
+    python benchmarks/bench_procfs_decode.py [N_EVENTS]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from python_tools.core.modules.kprobe_reader import parse_kmsg_records
+from python_tools.core.modules.procfs_reader import decode_records, encode_record
+
+_SYMBOLS = ["do_init_module", "vfs_read", "do_sys_open", "tcp_v4_connect", "commit_creds"]
+
+
+def synth(n: int):
+    kmsg, binary = [], []
+    for i in range(n):
+        sym = _SYMBOLS[i % len(_SYMBOLS)]
+        ts_usec = 1_000_000 + i * 37
+        kmsg.append(f"1,{i},{ts_usec},-;[PHOTON RING] Kprobe registered for symbol: {sym}\n")
+        binary.append(encode_record(i, ts_usec * 1000, sym, pid=1000 + i % 50))
+    return "".join(kmsg).encode(), b"".join(binary)
+
+
+def bench(label, fn, arg, n):
+    t0 = time.perf_counter()
+    out = fn(arg)
+    dt = time.perf_counter() - t0
+    print(f"{label:<36} {dt:8.3f}s {n / dt:14,.0f} events/s  ({len(out)} events)")
+    return dt
+
+
+def main() -> int:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    kmsg_blob, binary_blob = synth(n)
+    print(f"{n:,} events: {len(kmsg_blob) / 1e6:.1f} MB kmsg text, "
+          f"{len(binary_blob) / 1e6:.1f} MB binary records\n")
+    text = bench("text:   parse_kmsg_records(bytes)", lambda b: parse_kmsg_records(b)[0],
+                 kmsg_blob, n)
+    binary = bench("binary: decode_records(bytes)", lambda b: decode_records(b)[0],
+                   binary_blob, n)
+    print(f"\nspeedup: {text / binary:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
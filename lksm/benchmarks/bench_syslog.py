@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: alerts written per second by ``SyslogSink``.
+
+Submits N alerts in poll-sized batches to a local receiver and reports both
+the time the daemon loop spends in ``submit()`` and end-to-end delivery,
+for a unix datagram socket (the ``/dev/log`` case) and TCP.
+
+Usage:
+    python benchmarks/bench_syslog.py [N_ALERTS]
+"""
+
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from python_tools.core.module_base import LKSMEvent
+from python_tools.output.syslog_sink import SyslogSink
+
+
+def _drain(sock, stream):
+    if stream:
+        sock, _ = sock.accept()
+    try:
+        while sock.recv(1 << 20):
+            pass
+    except OSError:
+        pass
+
+
+def bench(label, address, server, stream, alerts):
+    threading.Thread(target=_drain, args=(server, stream), daemon=True).start()
+    sink = SyslogSink(address, queue_size=len(alerts))
+    t0 = time.perf_counter()
+    for i in range(0, len(alerts), 100):
+        sink.submit(alerts[i:i + 100])
+    t_submit = time.perf_counter() - t0
+    sink.close(timeout=600)
+    dt = time.perf_counter() - t0
+    stats = sink.stats()
+    print(f"{label:<12} submit {len(alerts) / t_submit:12,.0f} alerts/s   "
+          f"delivered {stats['sent'] / dt:10,.0f} alerts/s  ({stats['failed']} failed)")
+
+
+def main() -> int:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    alerts = [LKSMEvent(seq=i, ts=i / 1000, type="rule_match",
+                        data={"rule": "kallsyms_probe", "symbol": "kallsyms_lookup_name"},
+                        severity="high", source="rules") for i in range(n)]
+    print(f"{n:,} alerts\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "log")
+        unix = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        unix.bind(path)
+        unix.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 << 20)
+        bench("unix dgram", path, unix, False, alerts)
+        unix.close()
+
+    tcp = socket.create_server(("127.0.0.1", 0))
+    bench("tcp", f"tcp://127.0.0.1:{tcp.getsockname()[1]}", tcp, True, alerts)
+    tcp.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: alerts delivered per second by ``WebhookDispatcher``.
+
+Posts N alerts to a local keep-alive HTTP server, first one alert per
+request (the naive sink), then batched over pooled persistent connections.
+The server adds LATENCY_MS per request to stand in for a remote endpoint.
+
+Usage:
+    python benchmarks/bench_webhook.py [N_ALERTS] [LATENCY_MS]
+"""
+
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from python_tools.core.module_base import LKSMEvent
+from python_tools.output.webhook import WebhookDispatcher
+
+_LATENCY = 0.0
+
+
+class _Sink(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        if _LATENCY:
+            time.sleep(_LATENCY)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def bench(label, url, alerts, **opts):
+    hooks = WebhookDispatcher([dict(url=url, queue_size=len(alerts), **opts)])
+    t0 = time.perf_counter()
+    for i in range(0, len(alerts), 100):
+        hooks.submit(alerts[i:i + 100])
+    hooks.close(timeout=600)
+    dt = time.perf_counter() - t0
+    stats = hooks.stats()[url]
+    print(f"{label:<40} {dt:8.3f}s {stats['sent'] / dt:12,.0f} alerts/s  "
+          f"({stats['batches']} requests, {stats['connections']} connections)")
+    return dt
+
+
+def main() -> int:
+    global _LATENCY
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    _LATENCY = (float(sys.argv[2]) if len(sys.argv) > 2 else 2.0) / 1000
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Sink)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{srv.server_address[1]}/hook"
+    alerts = [LKSMEvent(seq=i, ts=float(i), type="rule_match",
+                        data={"rule": "kallsyms_probe", "symbol": "kallsyms_lookup_name"},
+                        severity="high", source="rules") for i in range(n)]
+
+    print(f"{n:,} alerts, {_LATENCY * 1000:.1f} ms server latency\n")
+    single = bench("one alert per request, 1 connection", url, alerts,
+                   batch_size=1, linger=0, concurrency=1)
+    pooled = bench("batch_size=100, 4 connections", url, alerts,
+                   batch_size=100, linger=0.01, concurrency=4)
+    print(f"\nspeedup: {single / pooled:.1f}x")
+    srv.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
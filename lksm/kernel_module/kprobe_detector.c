@@ -20,6 +20,7 @@ static notrace void hook_kprobe_register(unsigned long ip, unsigned long parent_
 
     if (kp) {
         // log kprobe registration event
+        // (binary equivalent for /proc/lksm: struct photon_ring_record)
         if (kp->symbol_name) {
             printk(KERN_ALERT "[PHOTON RING] Kprobe registered for symbol: %s\n", kp->symbol_name);
 
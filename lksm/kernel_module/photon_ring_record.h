@@ -0,0 +1,53 @@
+#ifndef PHOTON_RING_RECORD_H
+#define PHOTON_RING_RECORD_H
+
+#include <linux/types.h>
+
+/*
+ * Binary event records for /proc/lksm (communication.interface: procfs)
+ *
+ * The structured alternative to the "[PHOTON RING] ..." printk lines in
+ * kprobe_detector.c.  Each hook_kprobe_register() call that logs a symbol
+ * corresponds to one record:
+ *
+ *   printk "Kprobe registered for symbol: %s"  -> type PHOTON_RING_EV_KPROBE_REGISTERED
+ *   printk "SUSPICIOUS *** kallsyms_lookup_name probe detected!"
+ *                                              -> same record, PHOTON_RING_F_SUSPICIOUS set
+ *
+ * Emitter contract (decoded by python_tools/core/modules/procfs_reader.py):
+ *   - records are fixed size (96 bytes), little endian, packed, back to back;
+ *   - read() returns whole records and consumes them (a kfifo of records);
+ *   - seq increases by one per record, so the reader can count records the
+ *     emitter dropped on overflow as gaps;
+ *   - ts_ns is local_clock(), the clock printk/dmesg timestamps use;
+ *   - symbol is NUL-padded and truncated to 63 bytes plus NUL.
+ *
+ * A proc file without a .proc_poll handler always reads as "ready", so the
+ * reader polls it on communication.poll_interval rather than waiting on it.
+ */
+
+#define PHOTON_RING_MAGIC    0x31524850u  /* "PHR1" */
+#define PHOTON_RING_VERSION  1
+#define PHOTON_RING_SYM_LEN  64
+
+enum photon_ring_event_type {
+	PHOTON_RING_EV_KPROBE_REGISTERED = 1,
+};
+
+#define PHOTON_RING_F_SUSPICIOUS  0x1u  /* symbol is kallsyms_lookup_name */
+
+struct photon_ring_record {
+	__u32 magic;                        /* PHOTON_RING_MAGIC */
+	__u16 version;                      /* PHOTON_RING_VERSION */
+	__u16 type;                         /* enum photon_ring_event_type */
+	__u64 seq;                          /* per-boot record counter */
+	__u64 ts_ns;                        /* local_clock() */
+	__u32 pid;                          /* current->tgid of the registering task */
+	__u32 flags;                        /* PHOTON_RING_F_* */
+	char  symbol[PHOTON_RING_SYM_LEN];  /* kp->symbol_name */
+} __packed;
+
+_Static_assert(sizeof(struct photon_ring_record) == 96,
+	       "photon_ring_record layout is shared with user space");
+
+#endif /* PHOTON_RING_RECORD_H */
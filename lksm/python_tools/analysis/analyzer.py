@@ -0,0 +1,375 @@
+"""
+LogAnalyzer — streams EventLogger output and computes summary aggregates.
+"""
+
+import glob
+import heapq
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from python_tools.analysis.rules import RuleEngine
+from python_tools.output.json_logger import iter_segment_lines
+
+_READ_BUFFER = 1 << 20
+_PROGRESS_EVERY = 1 << 16    # lines between progress checks
+_SHARD_BYTES = 64 << 20      # plain files larger than this are split by range
+
+
+def expand_inputs(patterns: Iterable[str]) -> List[str]:
+    """Expand globs (``data/logs/lksm_events_*.jsonl*``) into a sorted file list."""
+    files = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern)
+        if not matches and os.path.exists(pattern):
+            matches = [pattern]
+        files.update(m for m in matches
+                     if os.path.isfile(m) and not m.endswith(".idx"))
+    return sorted(files)
+
+
+class EventFilter:
+    """Predicate over decoded log records.  Empty criteria match everything."""
+
+    def __init__(self, start_ts: Optional[float] = None, end_ts: Optional[float] = None,
+                 types: Optional[Iterable[str]] = None,
+                 severities: Optional[Iterable[str]] = None,
+                 sources: Optional[Iterable[str]] = None):
+        self.start_ts = start_ts
+        self.end_ts = end_ts
+        self.types = frozenset(types or ())
+        self.severities = frozenset(severities or ())
+        self.sources = frozenset(sources or ())
+
+    def matches(self, rec: dict) -> bool:
+        ts = rec.get("ts", 0.0)
+        if self.start_ts is not None and ts < self.start_ts:
+            return False
+        if self.end_ts is not None and ts > self.end_ts:
+            return False
+        if self.types and rec.get("type") not in self.types:
+            return False
+        if self.severities and rec.get("severity") not in self.severities:
+            return False
+        if self.sources and rec.get("source") not in self.sources:
+            return False
+        return True
+
+
+def _record_weight(rec: dict) -> int:
+    """Events a record stands for: ``count`` for a coalescer summary
+    (which carries ``first_seq``/``last_seq``), otherwise 1."""
+    data = rec.get("data")
+    if isinstance(data, dict) and "first_seq" in data and "last_seq" in data:
+        count = data.get("count")
+        if isinstance(count, int) and count > 0:
+            return count
+    return 1
+
+
+class Aggregates:
+    """Mergeable summary of a stream of log records.
+
+    Coalesced summaries are weighted by the repeats they stand for (see
+    ``_record_weight``), so counts match an uncoalesced log.
+
+    Memory is bounded by the number of distinct types/sources/symbols plus
+    ``timeline_limit`` suspicious-probe entries (the latest by ``(ts, seq)``
+    are kept).  ``merge`` is order-independent, so partial aggregates from
+    any split of the input combine to the same result.
+    """
+
+    def __init__(self, timeline_limit: int = 1000):
+        self.timeline_limit = timeline_limit
+        self.lines = 0
+        self.bad_lines = 0
+        self.matched = 0
+        self.by_type: Counter = Counter()
+        self.by_severity: Counter = Counter()
+        self.by_source: Counter = Counter()
+        self.symbols: Counter = Counter()
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        self._timeline: list = []   # min-heap of (ts, seq, source, message)
+        self.rule_hits: Counter = Counter()
+
+    def add(self, rec: dict, weight: int = 1) -> None:
+        self.matched += weight
+        ev_type = rec.get("type")
+        ts = rec.get("ts", 0.0)
+        self.by_type[ev_type] += weight
+        self.by_severity[rec.get("severity")] += weight
+        self.by_source[rec.get("source")] += weight
+        if self.first_ts is None or ts < self.first_ts:
+            self.first_ts = ts
+        if self.last_ts is None or ts > self.last_ts:
+            self.last_ts = ts
+
+        data = rec.get("data") or {}
+        if ev_type == "kprobe_registered":
+            self.symbols[data.get("symbol")] += weight
+        elif ev_type == "suspicious_probe" and self.timeline_limit:
+            item = (ts, rec.get("seq", 0), rec.get("source", ""), data.get("message", ""))
+            if len(self._timeline) < self.timeline_limit:
+                heapq.heappush(self._timeline, item)
+            elif item > self._timeline[0]:
+                heapq.heapreplace(self._timeline, item)
+
+    def merge(self, other: "Aggregates") -> "Aggregates":
+        self.lines += other.lines
+        self.bad_lines += other.bad_lines
+        self.matched += other.matched
+        self.by_type.update(other.by_type)
+        self.by_severity.update(other.by_severity)
+        self.by_source.update(other.by_source)
+        self.symbols.update(other.symbols)
+        self.rule_hits.update(other.rule_hits)
+        for ts in (other.first_ts, other.last_ts):
+            if ts is None:
+                continue
+            if self.first_ts is None or ts < self.first_ts:
+                self.first_ts = ts
+            if self.last_ts is None or ts > self.last_ts:
+                self.last_ts = ts
+        merged = heapq.nlargest(self.timeline_limit, self._timeline + other._timeline)
+        heapq.heapify(merged)
+        self._timeline = merged
+        return self
+
+    @property
+    def timeline(self) -> List[tuple]:
+        return sorted(self._timeline)
+
+    def report(self, top: int = 10) -> dict:
+        return {
+            "lines": self.lines,
+            "bad_lines": self.bad_lines,
+            "matched": self.matched,
+            "first_ts": self.first_ts,
+            "last_ts": self.last_ts,
+            "by_type": dict(sorted(self.by_type.items(), key=lambda kv: (-kv[1], str(kv[0])))),
+            "by_severity": dict(sorted(self.by_severity.items(), key=lambda kv: (-kv[1], str(kv[0])))),
+            "by_source": dict(sorted(self.by_source.items(), key=lambda kv: (-kv[1], str(kv[0])))),
+            "top_symbols": sorted(self.symbols.items(), key=lambda kv: (-kv[1], str(kv[0])))[:top],
+            "rule_hits": dict(sorted(self.rule_hits.items(), key=lambda kv: (-kv[1], kv[0]))),
+            "suspicious_timeline": [
+                {"ts": ts, "seq": seq, "source": src, "message": msg}
+                for ts, seq, src, msg in self.timeline
+            ],
+        }
+
+
+class Progress:
+    """Throttled one-line progress/throughput readout (to stderr by default)."""
+
+    def __init__(self, total_bytes: int, stream: Optional[TextIO] = sys.stderr,
+                 interval: float = 1.0):
+        self.total = total_bytes
+        self.stream = stream
+        self.interval = interval
+        self.done_bytes = 0
+        self.lines = 0
+        self._t0 = time.monotonic()
+        self._last = self._t0
+
+    def update(self, done_bytes: int, lines: int, force: bool = False) -> None:
+        self.done_bytes = done_bytes
+        self.lines = lines
+        now = time.monotonic()
+        if self.stream is None or (not force and now - self._last < self.interval):
+            return
+        self._last = now
+        elapsed = max(now - self._t0, 1e-9)
+        pct = 100.0 * done_bytes / self.total if self.total else 100.0
+        self.stream.write(
+            f"\r  {done_bytes / 1e6:,.1f} / {self.total / 1e6:,.1f} MB ({pct:5.1f}%)"
+            f"  {done_bytes / 1e6 / elapsed:,.1f} MB/s  {lines / elapsed:,.0f} lines/s"
+        )
+        if force:
+            self.stream.write("\n")
+        self.stream.flush()
+
+
+def iter_lines(path: str, flt: Optional[EventFilter] = None) -> Iterator[bytes]:
+    """Yield raw JSONL lines from a plain or gzip-segment log file."""
+    if path.endswith(".gz"):
+        yield from iter_segment_lines(path, flt.start_ts if flt else None,
+                                      flt.end_ts if flt else None)
+        return
+    with open(path, "rb", buffering=_READ_BUFFER) as f:
+        yield from f
+
+
+def _tracked(f: BinaryIO, progress: Progress, base: int, agg: "Aggregates") -> Iterator[bytes]:
+    for n, line in enumerate(f, 1):
+        yield line
+        if n % _PROGRESS_EVERY == 0:
+            progress.update(base + f.tell(), agg.lines)
+
+
+def analyze_lines(lines: Iterable[bytes], flt: EventFilter, agg: Aggregates,
+                  rules: Optional[RuleEngine] = None) -> Aggregates:
+    """Decode, filter and aggregate *lines* into *agg*.
+
+    With *rules*, every matched record is also evaluated and per-rule hits
+    are counted in ``agg.rule_hits``.
+    """
+    loads = json.loads
+    matches = flt.matches
+    add = agg.add
+    rule_hits = agg.rule_hits
+    for line in lines:
+        if not line.strip():
+            continue
+        agg.lines += 1
+        try:
+            rec = loads(line)
+        except ValueError:
+            agg.bad_lines += 1
+            continue
+        if not isinstance(rec, dict):
+            agg.bad_lines += 1
+            continue
+        if matches(rec):
+            weight = _record_weight(rec)
+            add(rec, weight)
+            if rules is not None:
+                for rule in rules.match(rec.get("type"), rec.get("data") or {}):
+                    rule_hits[rule.name] += weight
+    return agg
+
+
+def analyze_files(paths: List[str], flt: Optional[EventFilter] = None,
+                  timeline_limit: int = 1000,
+                  progress: Optional[Progress] = None,
+                  rules_spec: Optional[dict] = None) -> Aggregates:
+    """Stream every file in *paths* through one set of aggregates.
+
+    *rules_spec* is a parsed rules.yml mapping, compiled once here.
+    """
+    flt = flt or EventFilter()
+    rules = RuleEngine(rules_spec) if rules_spec is not None else None
+    agg = Aggregates(timeline_limit)
+    done = 0
+    for path in paths:
+        if progress is None or path.endswith(".gz"):
+            analyze_lines(iter_lines(path, flt), flt, agg, rules)
+        else:
+            with open(path, "rb", buffering=_READ_BUFFER) as f:
+                analyze_lines(_tracked(f, progress, done, agg), flt, agg, rules)
+        done += os.path.getsize(path)
+        if progress is not None:
+            progress.update(done, agg.lines)
+    if progress is not None:
+        progress.update(done, agg.lines, force=True)
+    return agg
+
+
+def iter_range_lines(path: str, start: int, end: int) -> Iterator[bytes]:
+    """Yield the lines of *path* that begin at a byte offset in ``[start, end)``.
+
+    Adjacent ranges therefore partition the file's lines exactly, wherever
+    the boundaries fall.
+    """
+    with open(path, "rb", buffering=_READ_BUFFER) as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()        # finish the line that straddles *start*
+        pos = f.tell()
+        for line in f:
+            if pos >= end:
+                break
+            yield line
+            pos += len(line)
+
+
+def plan_shards(paths: List[str], shard_bytes: int = _SHARD_BYTES) -> List[Tuple[str, int, int]]:
+    """Split *paths* into ``(path, start, end)`` work units.
+
+    Plain JSONL files are cut into ~*shard_bytes* byte ranges; compressed
+    segments are one shard each.
+    """
+    shards: List[Tuple[str, int, int]] = []
+    for path in paths:
+        size = os.path.getsize(path)
+        if path.endswith(".gz") or size <= shard_bytes:
+            shards.append((path, 0, size))
+            continue
+        for start in range(0, size, shard_bytes):
+            shards.append((path, start, min(start + shard_bytes, size)))
+    return shards
+
+
+def _analyze_shard(shard: Tuple[str, int, int], flt: EventFilter,
+                   timeline_limit: int, rules_spec: Optional[dict]) -> Aggregates:
+    path, start, end = shard
+    agg = Aggregates(timeline_limit)
+    # Compiled rules hold closures and cannot be pickled; each worker
+    # compiles its own copy from the plain spec.
+    rules = RuleEngine(rules_spec) if rules_spec is not None else None
+    if path.endswith(".gz"):
+        lines = iter_lines(path, flt)
+    else:
+        lines = iter_range_lines(path, start, end)
+    return analyze_lines(lines, flt, agg, rules)
+
+
+def analyze_parallel(paths: List[str], flt: Optional[EventFilter] = None,
+                     timeline_limit: int = 1000, workers: int = 0,
+                     progress: Optional[Progress] = None,
+                     shard_bytes: int = _SHARD_BYTES,
+                     rules_spec: Optional[dict] = None) -> Aggregates:
+    """Like analyze_files(), but shards the input across a process pool.
+
+    Each worker returns partial aggregates for its shard and they are merged
+    here; because ``Aggregates.merge`` is order-independent the result is
+    identical to the single-process path.  ``workers=0`` uses every CPU.
+    """
+    flt = flt or EventFilter()
+    shards = plan_shards(paths, shard_bytes)
+    agg = Aggregates(timeline_limit)
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(_analyze_shard, shard, flt, timeline_limit, rules_spec): shard
+                   for shard in shards}
+        for fut in as_completed(futures):
+            agg.merge(fut.result())
+            _, start, end = futures[fut]
+            done += end - start
+            if progress is not None:
+                progress.update(done, agg.lines)
+    if progress is not None:
+        progress.update(done, agg.lines, force=True)
+    return agg
+
+
+def format_report(report: dict) -> str:
+    """Human-readable rendering of ``Aggregates.report()``."""
+    out = [
+        f"Lines read:      {report['lines']:,} ({report['bad_lines']:,} unparseable)",
+        f"Events matched:  {report['matched']:,}",
+    ]
+    if report["first_ts"] is not None:
+        out.append(f"Time range:      {report['first_ts']:.6f} .. {report['last_ts']:.6f}")
+    for title, key in (("By type", "by_type"), ("By severity", "by_severity"),
+                       ("By source", "by_source")):
+        out.append(f"\n{title}:")
+        out.extend(f"  {count:>10,}  {name}" for name, count in report[key].items())
+    out.append("\nTop kprobe symbols:")
+    out.extend(f"  {count:>10,}  {sym}" for sym, count in report["top_symbols"])
+    if report["rule_hits"]:
+        out.append("\nRule hits:")
+        out.extend(f"  {count:>10,}  {name}" for name, count in report["rule_hits"].items())
+    out.append("\nSuspicious probe timeline:")
+    out.extend(f"  {e['ts']:>16.6f}  #{e['seq']:<8} {e['message']}"
+               for e in report["suspicious_timeline"])
+    return "\n".join(out)
+
+
+def total_size(paths: List[str]) -> int:
+    return sum(Path(p).stat().st_size for p in paths)
@@ -0,0 +1,195 @@
+"""
+AnomalyDetector — online, fixed-memory detection over kprobe registrations.
+"""
+
+import math
+from array import array
+from hashlib import blake2b
+from typing import Any, Dict, List, Optional
+
+from python_tools.core.module_base import LKSMEvent
+
+_MAX_CATCHUP_BUCKETS = 600
+
+
+class CountMinSketch:
+    """Count-min sketch over string keys.
+
+    Estimates never undercount, so an estimate of 0 means the key has
+    definitely not been added since the last ``clear()``.  Row indexes come
+    from one 64-bit blake2b digest via double hashing, so an update is
+    ``depth`` array increments.  Unlike the built-in ``hash()``, the digest
+    is not salted per process, so the same keys collide the same way on
+    every run.
+    """
+
+    __slots__ = ("width", "depth", "_rows")
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self._rows = self._zeroed()
+
+    def _zeroed(self) -> List[array]:
+        return [array("L", [0]) * self.width for _ in range(self.depth)]
+
+    def _indexes(self, key: str):
+        h = int.from_bytes(blake2b(key.encode(), digest_size=8).digest(), "little")
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        w = self.width
+        return [(h1 + i * h2) % w for i in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Add *count* for *key* and return its new estimate."""
+        est = None
+        for row, idx in zip(self._rows, self._indexes(key)):
+            row[idx] += count
+            v = row[idx]
+            if est is None or v < est:
+                est = v
+        return est
+
+    def estimate(self, key: str) -> int:
+        return min(row[idx] for row, idx in zip(self._rows, self._indexes(key)))
+
+    def clear(self) -> None:
+        self._rows = self._zeroed()
+
+
+class AnomalyDetector:
+    """Watches the ``kprobe_registered`` stream and emits ``anomaly`` events.
+
+    Three checks, each O(1) per event with memory fixed at construction:
+
+    * global rate — registrations are counted in ``bucket_seconds`` buckets;
+      each closed bucket updates an EWMA mean/variance.  The open bucket
+      alerts ``medium`` when it exceeds ``mean + sigma * stddev`` (and at
+      least ``min_rate``) and escalates once to ``high`` past twice that.
+    * per-symbol burst — a count-min sketch of the current
+      ``symbol_window``; a symbol alerts once per window when its estimate
+      reaches ``symbol_burst``.
+    * new symbol — a long-lived sketch of every symbol seen; an estimate of
+      0 means never seen before.  Suppressed during ``learning_period``
+      seconds of stream time so boot-time registrations form the baseline.
+
+    Time is the events' own ``ts``, so replaying a log gives the same result.
+    """
+
+    def __init__(self, config: Optional[dict] = None):
+        cfg = config or {}
+        self.bucket_seconds = float(cfg.get("bucket_seconds", 1.0))
+        self.alpha = float(cfg.get("ewma_alpha", 0.1))
+        self.sigma = float(cfg.get("sigma", 4.0))
+        self.min_rate = int(cfg.get("min_rate", 20))
+        self.symbol_window = float(cfg.get("symbol_window", 10.0))
+        self.symbol_burst = int(cfg.get("symbol_burst", 50))
+        self.learning_period = float(cfg.get("learning_period", 60.0))
+        width = int(cfg.get("sketch_width", 2048))
+        depth = int(cfg.get("sketch_depth", 4))
+
+        self._seen = CountMinSketch(width, depth)
+        self._window = CountMinSketch(width, depth)
+        self._window_start: Optional[float] = None
+        self._start_ts: Optional[float] = None
+
+        self._bucket: Optional[int] = None
+        self._bucket_count = 0
+        self._bucket_level = 0
+        self._mean = 0.0
+        self._var = 0.0
+        self._warm_buckets = 0
+
+        self.observed = 0
+        self.distinct_symbols = 0
+        self.alerts: Dict[str, int] = {"global_rate": 0, "symbol_rate": 0, "new_symbol": 0}
+
+    def observe(self, events: List[LKSMEvent]) -> List[LKSMEvent]:
+        """Feed a batch of events; return any anomaly events it triggers."""
+        out: List[LKSMEvent] = []
+        for ev in events:
+            if ev.type != "kprobe_registered":
+                continue
+            symbol = ev.data.get("symbol")
+            if not isinstance(symbol, str):
+                continue
+            self.observed += 1
+            self._observe_rate(ev, out)
+            self._observe_symbol(ev, symbol, out)
+        return out
+
+    # ---- global rate ----
+
+    def _close_bucket(self, count: int) -> None:
+        if self._warm_buckets == 0:
+            self._mean = float(count)
+        else:
+            diff = count - self._mean
+            incr = self.alpha * diff
+            self._mean += incr
+            self._var = (1 - self.alpha) * (self._var + diff * incr)
+        self._warm_buckets += 1
+
+    def _observe_rate(self, ev: LKSMEvent, out: List[LKSMEvent]) -> None:
+        bucket = int(ev.ts // self.bucket_seconds)
+        if self._bucket is None:
+            self._bucket = bucket
+        elif bucket > self._bucket:
+            self._close_bucket(self._bucket_count)
+            for _ in range(min(bucket - self._bucket - 1, _MAX_CATCHUP_BUCKETS)):
+                self._close_bucket(0)
+            self._bucket = bucket
+            self._bucket_count = 0
+            self._bucket_level = 0
+        self._bucket_count += 1
+
+        if self._bucket_level == 2 or self._warm_buckets < 2:
+            return
+        threshold = max(self._mean + self.sigma * math.sqrt(self._var), float(self.min_rate))
+        level = 2 if self._bucket_count > 2 * threshold else 1 if self._bucket_count > threshold else 0
+        if level > self._bucket_level:
+            self._bucket_level = level
+            severity = "high" if level == 2 else "medium"
+            out.append(self._alert(ev, "global_rate", severity, {
+                "count": self._bucket_count,
+                "bucket_seconds": self.bucket_seconds,
+                "baseline": round(self._mean, 3),
+                "threshold": round(threshold, 3),
+            }))
+
+    # ---- per-symbol ----
+
+    def _observe_symbol(self, ev: LKSMEvent, symbol: str, out: List[LKSMEvent]) -> None:
+        if self._start_ts is None:
+            self._start_ts = ev.ts
+        if self._window_start is None or ev.ts - self._window_start >= self.symbol_window:
+            self._window.clear()
+            self._window_start = ev.ts
+
+        if self._seen.estimate(symbol) == 0:
+            self.distinct_symbols += 1
+            if ev.ts - self._start_ts >= self.learning_period:
+                out.append(self._alert(ev, "new_symbol", "medium", {"symbol": symbol}))
+        self._seen.add(symbol)
+
+        if self._window.add(symbol) == self.symbol_burst:
+            out.append(self._alert(ev, "symbol_rate", "high", {
+                "symbol": symbol,
+                "count": self.symbol_burst,
+                "window_seconds": self.symbol_window,
+            }))
+
+    def _alert(self, ev: LKSMEvent, kind: str, severity: str,
+               detail: Dict[str, Any]) -> LKSMEvent:
+        self.alerts[kind] += 1
+        data = {"kind": kind, "event_seq": ev.seq}
+        data.update(detail)
+        return LKSMEvent(seq=0, ts=ev.ts, type="anomaly", data=data,
+                         severity=severity, source="anomaly")
+
+    def stats(self) -> dict:
+        return {
+            "observed": self.observed,
+            "distinct_symbols": self.distinct_symbols,
+            "baseline_rate": round(self._mean / self.bucket_seconds, 3),
+            "alerts": dict(self.alerts),
+        }
@@ -0,0 +1,189 @@
+"""
+CorrelationEngine — compound alerts for event sequences within a time window.
+"""
+
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from python_tools.analysis.rules import compile_condition
+from python_tools.core.module_base import LKSMEvent
+
+_ATTR_FIELDS = ("type", "source", "severity")
+
+
+def _field(ev: LKSMEvent, name: str) -> Any:
+    if name in _ATTR_FIELDS:
+        return getattr(ev, name)
+    return ev.data.get(name)
+
+
+class _Partial:
+    """A matched prefix of a sequence: when it started and which events."""
+
+    __slots__ = ("start", "seqs", "index", "key")
+
+    def __init__(self, start: float, seqs: Tuple[int, ...],
+                 index: Dict[Any, Deque["_Partial"]], key: Any):
+        self.start = start
+        self.seqs = seqs
+        self.index = index
+        self.key = key
+
+
+class _Step:
+    __slots__ = ("type", "_predicates")
+
+    def __init__(self, spec: dict, lists: Dict[str, List[Any]]):
+        spec = dict(spec)
+        self.type = spec.pop("type", None)
+        if self.type is None:
+            raise ValueError(f"sequence step without a type: {spec!r}")
+        self._predicates = tuple(compile_condition(k, v, lists) for k, v in spec.items())
+
+    def matches(self, data: Dict[str, Any]) -> bool:
+        for pred in self._predicates:
+            if not pred(data):
+                return False
+        return True
+
+
+class Sequence:
+    """One configured sequence: ordered steps sharing a join ``key``."""
+
+    def __init__(self, spec: dict, lists: Dict[str, List[Any]]):
+        try:
+            self.name = spec["name"]
+            steps = spec["steps"]
+        except (KeyError, TypeError):
+            raise ValueError(f"sequence needs a name and steps: {spec!r}") from None
+        if not isinstance(steps, list) or len(steps) < 2:
+            raise ValueError(f"sequence {self.name!r}: needs at least two steps")
+        self.within = float(spec.get("within", 10.0))
+        self.key: Optional[str] = spec.get("key")
+        self.severity = spec.get("severity", "high")
+        self.description = spec.get("description", "")
+        self.steps = [_Step(s, lists) for s in steps]
+        # partials[i][key] holds prefixes that have matched steps 0..i,
+        # oldest first.  The last step never needs an index.
+        self.partials: List[Dict[Any, Deque[_Partial]]] = [{} for _ in steps[:-1]]
+
+
+class CorrelationEngine:
+    """Matches configured event sequences over a bounded, indexed window.
+
+    Each sequence is a list of steps (an event ``type`` plus rules.yml-style
+    conditions) that must occur in order, sharing the value of ``key`` (an
+    event attribute or data field such as ``pid``, ``symbol`` or
+    ``source``), with the last step within ``within`` seconds of the first.
+
+    State is one dict per (sequence, step) from key value to the matched
+    prefixes, so a new event is a type lookup plus a dict lookup per step it
+    matches — never a scan.  A global FIFO evicts prefixes older than
+    ``window_seconds`` or beyond ``max_entries``.  A completed sequence
+    consumes the prefix it used, so one prefix raises at most one alert.
+    """
+
+    def __init__(self, config: Optional[dict] = None):
+        cfg = config or {}
+        lists = cfg.get("lists") or {}
+        self.sequences = [Sequence(s, lists) for s in cfg.get("sequences") or []]
+        names = [s.name for s in self.sequences]
+        if len(set(names)) != len(names):
+            raise ValueError("sequence names must be unique")
+        longest = max((s.within for s in self.sequences), default=0.0)
+        self.window_seconds = float(cfg.get("window_seconds", longest))
+        self.max_entries = int(cfg.get("max_entries", 10000))
+
+        self._by_type: Dict[str, List[Tuple[Sequence, int]]] = {}
+        for seq in self.sequences:
+            # Later steps first, so one event cannot satisfy two steps.
+            for i in reversed(range(len(seq.steps))):
+                self._by_type.setdefault(seq.steps[i].type, []).append((seq, i))
+
+        self._order: Deque[_Partial] = deque()
+        self.hits: Counter = Counter()
+        self.evicted: int = 0
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def _evict(self, now: float) -> None:
+        horizon = now - self.window_seconds
+        order = self._order
+        while order and (order[0].start < horizon or len(order) > self.max_entries):
+            p = order.popleft()
+            dq = p.index.get(p.key)
+            if dq and dq[0] is p:
+                dq.popleft()
+                self.evicted += 1
+                if not dq:
+                    del p.index[p.key]
+
+    def _take(self, seq: Sequence, step: int, key: Any, now: float) -> Optional[_Partial]:
+        """Pop the oldest live prefix through *step* for *key*, if any."""
+        index = seq.partials[step]
+        dq = index.get(key)
+        if not dq:
+            return None
+        horizon = now - seq.within
+        while dq and dq[0].start < horizon:
+            dq.popleft()
+        p = dq.popleft() if dq else None
+        if not dq:
+            del index[key]
+        return p
+
+    def _add(self, seq: Sequence, step: int, key: Any, start: float,
+             seqs: Tuple[int, ...]) -> None:
+        index = seq.partials[step]
+        p = _Partial(start, seqs, index, key)
+        index.setdefault(key, deque()).append(p)
+        self._order.append(p)
+
+    def observe(self, events: List[LKSMEvent]) -> List[LKSMEvent]:
+        """Feed a batch of events; return ``correlation`` alerts completed by it."""
+        alerts: List[LKSMEvent] = []
+        for ev in events:
+            candidates = self._by_type.get(ev.type)
+            if not candidates:
+                continue
+            self._evict(ev.ts)
+            for seq, i in candidates:
+                if not seq.steps[i].matches(ev.data):
+                    continue
+                key = _field(ev, seq.key) if seq.key else None
+                if seq.key and key is None:
+                    continue
+                if i == 0:
+                    self._add(seq, 0, key, ev.ts, (ev.seq,))
+                    continue
+                prev = self._take(seq, i - 1, key, ev.ts)
+                if prev is None:
+                    continue
+                seqs = prev.seqs + (ev.seq,)
+                if i < len(seq.steps) - 1:
+                    self._add(seq, i, key, prev.start, seqs)
+                else:
+                    alerts.append(self._alert(seq, ev, key, prev.start, seqs))
+        if len(self._order) > self.max_entries:
+            self._evict(float("-inf"))
+        return alerts
+
+    def _alert(self, seq: Sequence, ev: LKSMEvent, key: Any, start: float,
+               seqs: Tuple[int, ...]) -> LKSMEvent:
+        self.hits[seq.name] += 1
+        data = {"sequence": seq.name, "description": seq.description,
+                "event_seqs": list(seqs), "first_ts": start,
+                "span": round(ev.ts - start, 6)}
+        if seq.key:
+            data[seq.key] = key
+        return LKSMEvent(seq=0, ts=ev.ts, type="correlation", data=data,
+                         severity=seq.severity, source="correlation")
+
+    def stats(self) -> dict:
+        return {
+            "sequences": len(self.sequences),
+            "window_entries": len(self._order),
+            "evicted": self.evicted,
+            "hits": {s.name: self.hits[s.name] for s in self.sequences},
+        }
@@ -0,0 +1,164 @@
+"""
+RuleEngine — compiles config/rules.yml into an indexed event matcher.
+"""
+
+import fnmatch
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import yaml
+
+from python_tools.core.module_base import LKSMEvent
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+_ANY_TYPE = "*"
+
+
+def compile_condition(key: str, value: Any, lists: Dict[str, List[Any]]) -> Predicate:
+    """Turn one ``condition`` entry into a predicate over ``event.data``.
+
+    ``<field>: [a, b]``      data[field] is one of the values (set lookup)
+    ``<field>: x``           data[field] == x
+    ``<field>_not_in: ...``  data[field] is not in the list (or named list)
+    ``<field>_matches: ...`` data[field] matches any glob, via one regex
+    """
+    def resolve(v: Any) -> List[Any]:
+        if isinstance(v, str):
+            if v not in lists:
+                raise ValueError(f"unknown list {v!r} in condition {key!r}")
+            return list(lists[v])
+        return list(v) if isinstance(v, (list, tuple, set)) else [v]
+
+    if key.endswith("_not_in"):
+        field = key[:-len("_not_in")]
+        excluded = frozenset(resolve(value))
+        return lambda data: field in data and data[field] not in excluded
+
+    if key.endswith("_matches"):
+        field = key[:-len("_matches")]
+        globs = value if isinstance(value, list) else [value]
+        matcher = re.compile("|".join(fnmatch.translate(str(g)) for g in globs)).match
+        return lambda data: isinstance(data.get(field), str) and matcher(data[field]) is not None
+
+    if isinstance(value, list):
+        allowed = frozenset(value)
+        return lambda data: data.get(key) in allowed
+
+    return lambda data: data.get(key) == value
+
+
+class CompiledRule:
+    """One rule with its conditions compiled to predicates."""
+
+    __slots__ = ("name", "description", "type", "severity", "_predicates")
+
+    def __init__(self, spec: dict, lists: Dict[str, List[Any]]):
+        try:
+            self.name = spec["name"]
+        except (KeyError, TypeError):
+            raise ValueError(f"rule without a name: {spec!r}") from None
+        self.description = spec.get("description", "")
+        self.type = spec.get("type", _ANY_TYPE)
+        self.severity = spec.get("severity", "medium")
+        condition = spec.get("condition") or {}
+        if not isinstance(condition, dict):
+            raise ValueError(f"rule {self.name!r}: condition must be a mapping")
+        try:
+            self._predicates = tuple(compile_condition(k, v, lists)
+                                     for k, v in condition.items())
+        except (ValueError, re.error) as exc:
+            raise ValueError(f"rule {self.name!r}: {exc}") from None
+
+    def matches(self, data: Dict[str, Any]) -> bool:
+        for pred in self._predicates:
+            if not pred(data):
+                return False
+        return True
+
+
+class RuleEngine:
+    """Evaluates events against rules compiled once at load time.
+
+    Rules are indexed by event ``type`` so an event is only tested against
+    rules that name its type (plus any untyped rules).  ``hits`` counts
+    matches per rule; ``evaluated`` and ``eval_ns`` give the per-event
+    evaluation cost (``avg_eval_ns``).
+    """
+
+    def __init__(self, spec: Optional[dict] = None):
+        spec = spec or {}
+        if not isinstance(spec, dict):
+            raise ValueError("rules file: top level must be a mapping")
+        self.spec = spec
+        lists = spec.get("lists") or {}
+        if not isinstance(lists, dict):
+            raise ValueError("rules file: 'lists' must be a mapping")
+        rules = spec.get("rules") or []
+        if not isinstance(rules, list):
+            raise ValueError("rules file: 'rules' must be a list")
+        self.rules: List[CompiledRule] = [CompiledRule(r, lists) for r in rules]
+        names = [r.name for r in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError("rule names must be unique")
+
+        self._by_type: Dict[str, List[CompiledRule]] = {}
+        wildcard = [r for r in self.rules if r.type == _ANY_TYPE]
+        for r in self.rules:
+            if r.type != _ANY_TYPE:
+                self._by_type.setdefault(r.type, []).append(r)
+        for rules in self._by_type.values():
+            rules.extend(wildcard)
+        self._wildcard = wildcard
+
+        self.hits: Counter = Counter()
+        self.evaluated: int = 0
+        self.eval_ns: int = 0
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "RuleEngine":
+        with open(path) as f:
+            return cls(yaml.safe_load(f) or {})
+
+    def match(self, ev_type: str, data: Dict[str, Any]) -> List[CompiledRule]:
+        """Return every rule matching an event of *ev_type* with *data*."""
+        t0 = time.perf_counter_ns()
+        hits = [r for r in self._by_type.get(ev_type, self._wildcard) if r.matches(data)]
+        self.eval_ns += time.perf_counter_ns() - t0
+        self.evaluated += 1
+        for r in hits:
+            self.hits[r.name] += 1
+        return hits
+
+    def evaluate(self, events: List[LKSMEvent]) -> List[LKSMEvent]:
+        """Return one ``rule_match`` alert event per (event, matching rule)."""
+        alerts: List[LKSMEvent] = []
+        for ev in events:
+            if ev.type == "rule_match":
+                continue
+            for rule in self.match(ev.type, ev.data):
+                alerts.append(LKSMEvent(
+                    seq=0,
+                    ts=ev.ts,
+                    type="rule_match",
+                    data={"rule": rule.name, "description": rule.description,
+                          "event_seq": ev.seq, "event_type": ev.type},
+                    severity=rule.severity,
+                    source="rules",
+                ))
+        return alerts
+
+    @property
+    def avg_eval_ns(self) -> float:
+        return self.eval_ns / self.evaluated if self.evaluated else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "rules": len(self.rules),
+            "evaluated": self.evaluated,
+            "avg_eval_ns": round(self.avg_eval_ns, 1),
+            "hits": {r.name: self.hits[r.name] for r in self.rules},
+        }
@@ -0,0 +1,119 @@
+"""
+ConfigReloader — watches the config and rules files for the running daemon.
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import yaml
+
+from python_tools.analysis.rules import RuleEngine
+
+# (config, rules) ready to be swapped in; rules is None when disabled.
+Reload = Tuple[dict, Optional[RuleEngine]]
+
+
+def _stamp(path: Path) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def rules_path(config: dict) -> Optional[Path]:
+    """The rules file *config* asks for, or None when rules are disabled."""
+    analysis_cfg = config.get("analysis", {})
+    if not analysis_cfg.get("enable_rules", False):
+        return None
+    return Path(analysis_cfg.get("rules_file", "config/rules.yml"))
+
+
+class ConfigReloader:
+    """Detects edits to the config and rules files and prepares replacements.
+
+    A background thread stats both files every *interval* seconds (mtime,
+    size and inode, so editors that save via rename are caught).  On a
+    change it loads and compiles the new files off the poll loop; the daemon
+    picks the result up between cycles with ``take()`` and swaps it in with
+    a single assignment.  A file that fails to parse or compile is rejected
+    with a warning, the previous config and rules stay active, and it is not
+    retried until it changes again.
+    """
+
+    def __init__(self, config_path: str, config: dict, interval: float = 2.0):
+        self._config_path = Path(config_path)
+        self._config = config
+        self._interval = interval
+        self._stamps: Dict[Path, Optional[Tuple[int, int, int]]] = {}
+        self._remember(config)
+        self._pending: Optional[Reload] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reloads: int = 0
+        self.rejected: int = 0
+
+    def _watched(self, config: dict):
+        paths = [self._config_path]
+        rp = rules_path(config)
+        if rp is not None:
+            paths.append(rp)
+        return paths
+
+    def _remember(self, config: dict) -> None:
+        self._stamps = {p: _stamp(p) for p in self._watched(config)}
+
+    def start(self) -> None:
+        if self._interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="lksm-config-reload",
+                                            daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self.check()
+
+    def check(self) -> bool:
+        """Scan once; return True if a new (config, rules) pair is pending."""
+        current = {p: _stamp(p) for p in self._watched(self._config)}
+        if current == self._stamps:
+            return False
+        try:
+            with open(self._config_path) as f:
+                config = yaml.safe_load(f) or {}
+            if not isinstance(config, dict):
+                raise ValueError("top level must be a mapping")
+            for section, value in config.items():
+                if not isinstance(value, dict):
+                    raise ValueError(f"section {section!r} must be a mapping")
+            rp = rules_path(config)
+            rules = RuleEngine.from_file(rp) if rp is not None else None
+        except Exception as exc:
+            # Anything a malformed file can raise; the watcher thread must
+            # survive it or hot reload silently stops for good.
+            self.rejected += 1
+            self._stamps = current
+            print(f"Warning: config reload rejected, keeping previous rules: {exc}")
+            return False
+
+        self._config = config
+        self._remember(config)
+        with self._lock:
+            self._pending = (config, rules)
+        self.reloads += 1
+        return True
+
+    def take(self) -> Optional[Reload]:
+        """Return and clear the pending reload, if any."""
+        with self._lock:
+            pending, self._pending = self._pending, None
+        return pending
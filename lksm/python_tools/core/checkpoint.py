@@ -0,0 +1,93 @@
+"""
+ReaderCheckpoint — persists a reader's position across daemon restarts.
+"""
+
+import json
+import os
+import time
+from typing import Optional
+
+_BOOT_ID_PATH = "/proc/sys/kernel/random/boot_id"
+
+
+def read_boot_id() -> Optional[str]:
+    """The kernel's per-boot UUID, or None where it is unavailable."""
+    try:
+        with open(_BOOT_ID_PATH) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+class ReaderCheckpoint:
+    """Small JSON state file holding ``last_seq`` and ``last_ts``.
+
+    ``record()`` is called after every poll and writes the file only once
+    *every* events or *interval* seconds have accumulated, via a temp
+    file and ``os.replace`` so a crash never leaves a torn checkpoint.  A
+    crash may therefore replay up to that many events on restart.
+
+    ``load()`` discards a checkpoint from an earlier boot: the saved boot id
+    differs, or (without one) its last kernel timestamp is later than the
+    current time since boot.
+    """
+
+    def __init__(self, path: str, every: int = 100, interval: float = 5.0):
+        self.path = path
+        self.every = every
+        self.interval = interval
+        self.boot_id = read_boot_id()
+        self.last_seq: int = -1
+        self.last_ts: float = 0.0
+        self._pending = 0
+        self._saved_at = time.monotonic()
+        self.saves: int = 0
+
+    def load(self) -> Optional[dict]:
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            last_seq, last_ts = int(state["last_seq"]), float(state["last_ts"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            print(f"Warning: ignoring unreadable checkpoint {self.path}: {exc}")
+            return None
+
+        saved_boot = state.get("boot_id")
+        if saved_boot and self.boot_id:
+            rebooted = saved_boot != self.boot_id
+        else:
+            rebooted = last_ts > time.monotonic()
+        if rebooted:
+            print(f"Checkpoint {self.path} is from a previous boot, starting fresh")
+            return None
+        self.last_seq, self.last_ts = last_seq, last_ts
+        return state
+
+    def record(self, last_seq: int, last_ts: float, n_events: int) -> None:
+        if n_events:
+            self.last_seq, self.last_ts = last_seq, last_ts
+            self._pending += n_events
+        if self._pending and (self._pending >= self.every
+                              or time.monotonic() - self._saved_at >= self.interval):
+            self.save()
+
+    def save(self) -> None:
+        if self._pending == 0:
+            return
+        state = {"last_seq": self.last_seq, "last_ts": self.last_ts, "boot_id": self.boot_id}
+        tmp = f"{self.path}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.path)
+        except OSError as exc:
+            print(f"Warning: cannot write checkpoint {self.path}: {exc}")
+            return
+        self._pending = 0
+        self._saved_at = time.monotonic()
+        self.saves += 1
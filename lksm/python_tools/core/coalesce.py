@@ -0,0 +1,132 @@
+"""
+EventCoalescer — folds bursts of repeated events into one event with a count.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from python_tools.core.module_base import LKSMEvent
+
+_DEFAULT_KEY_FIELDS = {"kprobe_registered": "symbol", "photon_ring_generic": "message"}
+
+
+class _Group:
+    __slots__ = ("first", "count", "first_seq", "last_seq", "first_ts", "last_ts", "opened")
+
+    def __init__(self, ev: LKSMEvent, opened: float):
+        self.first = ev
+        self.count = 0                   # repeats absorbed after *first*
+        self.first_seq = self.last_seq = -1
+        self.first_ts = self.last_ts = ev.ts
+        self.opened = opened
+
+
+class EventCoalescer:
+    """Merges events with the same (type, source, key field) per window.
+
+    Only types listed in *key_fields* (type -> data field) are coalesced,
+    and never events whose severity is in *passthrough*.  Every event that
+    is not a repeat is returned from ``process()`` in the same call with
+    its own seq, so alerts that reference it stay valid and seqs stay in
+    order.  The first one of a key also opens a group that absorbs its
+    repeats for *window* seconds.  If it absorbed any, the closing group
+    yields a summary: a copy of the first event whose data adds ``count``
+    (repeats absorbed), ``first_seq``/``last_seq`` and ``first_ts``/
+    ``last_ts`` covering them.
+
+    At most *max_groups* groups are open; opening one more closes the
+    oldest early, so memory stays bounded however many distinct keys a
+    storm produces.  Summaries are new events, returned separately so the
+    caller can give them sequence numbers.
+    """
+
+    def __init__(self, window: float = 1.0, max_groups: int = 1024,
+                 key_fields: Optional[Dict[str, str]] = None,
+                 passthrough: Sequence[str] = ("high", "critical")):
+        self.window = window
+        self.max_groups = max_groups
+        self.key_fields = dict(_DEFAULT_KEY_FIELDS if key_fields is None else key_fields)
+        self.passthrough = frozenset(passthrough)
+        self._groups: "OrderedDict[tuple, _Group]" = OrderedDict()
+        self.absorbed: int = 0
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> "EventCoalescer":
+        return cls(window=float(cfg.get("window", 1.0)),
+                   max_groups=int(cfg.get("max_groups", 1024)),
+                   key_fields=cfg.get("key_fields"),
+                   passthrough=cfg.get("passthrough", ("high", "critical")))
+
+    def reconfigure(self, cfg: dict) -> None:
+        """Apply reloaded settings; open groups keep collecting until they
+        expire under the new window."""
+        fresh = self.from_config(cfg)
+        self.window, self.max_groups = fresh.window, fresh.max_groups
+        self.key_fields, self.passthrough = fresh.key_fields, fresh.passthrough
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def process(self, events: List[LKSMEvent],
+                now: Optional[float] = None) -> Tuple[List[LKSMEvent], List[LKSMEvent]]:
+        """Return ``(ready, closed)``: events to pass on untouched, and
+        groups whose window ended (or were evicted) during this call."""
+        if now is None:
+            now = time.monotonic()
+        closed = self._expire(now)
+        if not events:
+            return [], closed
+
+        ready: List[LKSMEvent] = []
+        groups, key_fields = self._groups, self.key_fields
+        for ev in events:
+            field = key_fields.get(ev.type)
+            if field is None or ev.severity in self.passthrough:
+                ready.append(ev)
+                continue
+            key = (ev.type, ev.source, ev.data.get(field))
+            group = groups.get(key)
+            if group is not None:
+                if not group.count:
+                    group.first_seq, group.first_ts = ev.seq, ev.ts
+                group.count += 1
+                group.last_seq, group.last_ts = ev.seq, ev.ts
+                self.absorbed += 1
+                continue
+            while groups and len(groups) >= self.max_groups:
+                self._close(groups.popitem(last=False)[1], closed)
+            groups[key] = _Group(ev, now)
+            ready.append(ev)
+        return ready, closed
+
+    def flush(self) -> List[LKSMEvent]:
+        """Close every open group (e.g. at shutdown)."""
+        out: List[LKSMEvent] = []
+        for g in self._groups.values():
+            self._close(g, out)
+        self._groups.clear()
+        return out
+
+    def _expire(self, now: float) -> List[LKSMEvent]:
+        out: List[LKSMEvent] = []
+        groups = self._groups
+        horizon = now - self.window
+        while groups:
+            group = next(iter(groups.values()))
+            if group.opened > horizon:
+                break
+            groups.popitem(last=False)
+            self._close(group, out)
+        return out
+
+    @staticmethod
+    def _close(group: _Group, out: List[LKSMEvent]) -> None:
+        if not group.count:
+            return
+        ev = group.first
+        data = dict(ev.data)
+        data.update(count=group.count, first_seq=group.first_seq, last_seq=group.last_seq,
+                    first_ts=group.first_ts, last_ts=group.last_ts)
+        out.append(LKSMEvent(seq=0, ts=group.last_ts, type=ev.type, data=data,
+                             severity=ev.severity, source=ev.source))
@@ -0,0 +1,185 @@
+"""
+MetricsRegistry — cheap counters, gauges and fixed-bucket histograms.
+"""
+
+import os
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; spans a sub-100us poll up to a multi-second stall.
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_Labels = Tuple[Tuple[str, str], ...]
+
+
+def _fmt_labels(labels: _Labels, extra: str = "") -> str:
+    parts = ['%s="%s"' % (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+             for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n: int = 1) -> None:
+        self.value += n
+
+
+class Gauge:
+    """A value that is set, or read from *fn* at render time."""
+    __slots__ = ("value", "fn")
+
+    def __init__(self, fn: Optional[Callable[[], float]] = None):
+        self.value = 0
+        self.fn = fn
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def get(self) -> float:
+        return self.fn() if self.fn is not None else self.value
+
+
+class Histogram:
+    """Per-bucket counts over fixed upper *bounds*; ``observe`` is one bisect.
+
+    Counts are kept per bucket and only made cumulative when rendered.
+    """
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)      # last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the *q* quantile (inf past the last)."""
+        total = self.count
+        if total == 0:
+            return 0.0
+        rank, seen = q * total, 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    """Named metric families, each with one child per label set.
+
+    Children are created on first use and then cached by the caller, so
+    the hot path is an attribute update, no dict lookup or lock.  Updates
+    from different threads are not synchronized: each series is written by
+    one thread (a module's histogram by its poll, a stage's by the daemon
+    loop), which is what keeps this cheap enough to leave on.  Series can
+    be created while another thread renders, so ``render`` and
+    ``snapshot`` iterate over copies of the family and child dicts.
+    """
+
+    def __init__(self):
+        self._families: Dict[str, Tuple[str, str, Dict[_Labels, object]]] = {}
+
+    def _child(self, kind: str, name: str, help: str, labels: Dict[str, str], make):
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = (kind, help, {})
+        elif family[0] != kind:
+            raise ValueError(f"metric {name} is already a {family[0]}")
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        child = family[2].get(key)
+        if child is None:
+            child = family[2][key] = make()
+        return child
+
+    def counter(self, name: str, help: str, **labels: str) -> Counter:
+        return self._child("counter", name, help, labels, Counter)
+
+    def gauge(self, name: str, help: str, fn: Optional[Callable[[], float]] = None,
+              **labels: str) -> Gauge:
+        gauge = self._child("gauge", name, help, labels, lambda: Gauge(fn))
+        if fn is not None:
+            gauge.fn = fn
+        return gauge
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                  **labels: str) -> Histogram:
+        return self._child("histogram", name, help, labels, lambda: Histogram(buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        out: List[str] = []
+        for name, (kind, help, children) in list(self._families.items()):
+            out.append(f"# HELP {name} {help}")
+            out.append(f"# TYPE {name} {kind}")
+            for labels, m in list(children.items()):
+                if kind == "histogram":
+                    cumulative = 0
+                    for bound, n in zip(m.bounds + ("+Inf",), m.counts):
+                        cumulative += n
+                        le = 'le="%s"' % bound
+                        out.append(f"{name}_bucket{_fmt_labels(labels, le)} {cumulative}")
+                    out.append(f"{name}_sum{_fmt_labels(labels)} {m.sum!r}")
+                    out.append(f"{name}_count{_fmt_labels(labels)} {cumulative}")
+                else:
+                    value = m.value if kind == "counter" else m.get()
+                    out.append(f"{name}{_fmt_labels(labels)} {value}")
+        out.append("")
+        return "\n".join(out)
+
+    def snapshot(self) -> Dict[str, object]:
+        """Compact summary for logs: counters and gauges as values, histograms
+        as count, mean and bucket-bound p50/p99."""
+        snap: Dict[str, object] = {}
+        for name, (kind, _, children) in list(self._families.items()):
+            for labels, m in list(children.items()):
+                key = name + _fmt_labels(labels)
+                if kind == "histogram":
+                    n = m.count
+                    snap[key] = {"count": n, "mean": m.sum / n if n else 0.0,
+                                 "p50": m.quantile(0.5), "p99": m.quantile(0.99)}
+                else:
+                    snap[key] = m.value if kind == "counter" else m.get()
+        return snap
+
+    def write(self, path: str) -> None:
+        """Atomically write ``render()`` to *path* (a node_exporter textfile)."""
+        tmp = f"{path}.tmp"
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp, "w") as f:
+                f.write(self.render())
+            os.replace(tmp, path)
+        except OSError as exc:
+            print(f"Warning: cannot write metrics {path}: {exc}")
+
+
+class StageTimer:
+    """Latency histogram plus event counter for one daemon pipeline stage."""
+    __slots__ = ("seconds", "events")
+
+    def __init__(self, metrics: MetricsRegistry, stage: str):
+        self.seconds = metrics.histogram("lksm_stage_seconds",
+                                         "Time spent per daemon pipeline stage.", stage=stage)
+        self.events = metrics.counter("lksm_stage_events_total",
+                                      "Events handled per daemon pipeline stage.", stage=stage)
+
+    def record(self, seconds: float, n_events: int) -> None:
+        self.seconds.observe(seconds)
+        self.events.inc(n_events)
@@ -3,24 +3,80 @@ LKSM Module Base — event model, monitor ABC, and module registry.
 """
 
 import importlib
+import json
 import pkgutil
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, field, asdict
-from typing import List, Dict, Any, Optional
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from time import perf_counter
+from typing import List, Dict, Any, AsyncIterator, Iterable, Optional
+
+from python_tools.core.metrics import MetricsRegistry
 
 
-@dataclass
 class LKSMEvent:
-    """A single event produced by a monitor module."""
-    seq: int
-    ts: float
-    type: str
-    data: Dict[str, Any]
-    severity: str = "info"       # info | medium | high | critical
-    source: str = "unknown"
+    """A single event produced by a monitor module.
+
+    Slotted rather than a ``@dataclass`` so that the hot path allocates no
+    per-instance ``__dict__``.  ``to_json()`` encodes once and caches the
+    bytes, letting the logger and dashboard share one serialization; the
+    cache is dropped when ``seq`` is reassigned.  Treat ``data`` as frozen
+    once an event has been serialized.
+    """
+
+    __slots__ = ("_seq", "ts", "type", "data", "severity", "source", "_json")
+
+    def __init__(self, seq: int, ts: float, type: str, data: Dict[str, Any],
+                 severity: str = "info",    # info | medium | high | critical
+                 source: str = "unknown"):
+        self._seq = seq
+        self.ts = ts
+        self.type = type
+        self.data = data
+        self.severity = severity
+        self.source = source
+        self._json: Optional[bytes] = None
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    @seq.setter
+    def seq(self, value: int) -> None:
+        self._seq = value
+        self._json = None
 
     def to_dict(self) -> dict:
-        return asdict(self)
+        # Shallow: ``data`` is shared, not deep-copied like dataclasses.asdict.
+        return {
+            "seq": self._seq,
+            "ts": self.ts,
+            "type": self.type,
+            "data": self.data,
+            "severity": self.severity,
+            "source": self.source,
+        }
+
+    def to_json(self) -> bytes:
+        """UTF-8 JSON encoding of ``to_dict()``, computed at most once."""
+        encoded = self._json
+        if encoded is None:
+            encoded = self._json = _encode(self.to_dict()).encode()
+        return encoded
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self._seq, self.ts, self.type, self.data, self.severity, self.source) == \
+            (other._seq, other.ts, other.type, other.data, other.severity, other.source)
+
+    __hash__ = None     # mutable, like the dataclass it replaces
+
+    def __repr__(self) -> str:
+        return (f"LKSMEvent(seq={self._seq!r}, ts={self.ts!r}, type={self.type!r}, "
+                f"data={self.data!r}, severity={self.severity!r}, source={self.source!r})")
+
+
+_encode = json.JSONEncoder().encode
 
 
 class MonitorModule(ABC):
@@ -43,16 +99,94 @@ class MonitorModule(ABC):
     def poll(self) -> List[LKSMEvent]:
         ...
 
+    def fileno(self) -> Optional[int]:
+        """Return a descriptor that becomes readable when poll() has work.
+
+        Modules that return an fd are polled as soon as it is ready instead of
+        on the fixed ``poll_interval``.  The default (None) keeps interval
+        polling.
+        """
+        return None
+
+    @property
+    def active(self) -> bool:
+        """False once start() has decided the module has nothing to read
+        (e.g. a transport not selected by the config).  Inactive modules
+        are left out of interval polling so they never wake the loop.
+        """
+        return True
+
+    def reconfigure(self, config: dict) -> None:
+        """Apply a reloaded config without a stop/start cycle.
+
+        Called by the daemon after a hot reload; modules keep their read
+        position.  The default ignores the new config.
+        """
+
+
+class AsyncMonitorModule(MonitorModule):
+    """Monitor module that yields events from an async iterator.
+
+    The asyncio runner (``communication.runner: asyncio``) consumes
+    ``stream()`` directly.  ``poll()`` returns nothing, so under the
+    synchronous loops the module is inert.
+    """
+
+    def poll(self) -> List[LKSMEvent]:
+        return []
+
+    @abstractmethod
+    def stream(self) -> AsyncIterator[LKSMEvent]:
+        """Async generator yielding events as they arrive."""
+        ...
+
 
 class ModuleRegistry:
-    """Discovers, registers, and polls monitor modules."""
+    """Discovers, registers, and polls monitor modules.
 
-    def __init__(self):
+    With ``concurrent=True`` each module's ``poll()`` runs on a thread pool
+    and ``poll_all()`` waits at most *poll_timeout* seconds.  A module that
+    misses the deadline is skipped for that cycle and listed in
+    ``missed_deadlines``; its in-flight poll is not restarted, and its events
+    are merged in whichever later cycle it completes.  Sequence numbers are
+    always assigned in module registration order, so the merge is
+    deterministic regardless of which thread finished first.
+
+    With *metrics*, ``poll_all()`` and each module's ``poll()`` are timed
+    into latency histograms, and per-module event and missed-deadline
+    counts are kept.
+    """
+
+    def __init__(self, concurrent: bool = False, poll_timeout: float = 1.0,
+                 max_workers: Optional[int] = None,
+                 metrics: Optional[MetricsRegistry] = None):
         self._modules: Dict[str, MonitorModule] = {}
         self._seq: int = 0
+        self._concurrent = concurrent
+        self._poll_timeout = poll_timeout
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[str, Future] = {}
+        self.missed_deadlines: List[str] = []
+        self._metrics = metrics
+        self._poll_all_seconds = None
+        self._module_metrics: Dict[str, tuple] = {}
+        if metrics is not None:
+            self._poll_all_seconds = metrics.histogram(
+                "lksm_poll_all_seconds", "Time spent in ModuleRegistry.poll_all().")
 
     def register(self, module: MonitorModule) -> None:
         self._modules[module.name] = module
+        if self._metrics is not None:
+            m, name = self._metrics, module.name
+            self._module_metrics[name] = (
+                m.histogram("lksm_module_poll_seconds", "Time spent in a module's poll().",
+                            module=name),
+                m.counter("lksm_module_events_total", "Events returned by a module's poll().",
+                          module=name),
+                m.counter("lksm_module_missed_deadlines_total",
+                          "Concurrent polls that missed poll_timeout.", module=name),
+            )
 
     def discover(self, package_path: str) -> None:
         """Import every sub-module in *package_path* and call create_module()."""
@@ -67,19 +201,96 @@ class ModuleRegistry:
         for m in self._modules.values():
             m.start(config)
 
+    def reconfigure_all(self, config: dict) -> None:
+        for m in self._modules.values():
+            m.reconfigure(config)
+
     def stop_all(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self._pending.clear()
         for m in self._modules.values():
             m.stop()
 
-    def poll_all(self) -> List[LKSMEvent]:
+    def poll_all(self, names: Optional[Iterable[str]] = None) -> List[LKSMEvent]:
+        """Poll every module, or only *names*, and stamp global seq numbers."""
+        if names is None:
+            selected = list(self._modules)
+        else:
+            wanted = set(names)
+            selected = [n for n in self._modules if n in wanted]
+
+        t0 = perf_counter()
+        if self._concurrent:
+            batches = self._poll_concurrent(selected)
+        else:
+            batches = [self.poll_one(n) for n in selected]
+
         events: List[LKSMEvent] = []
-        for m in self._modules.values():
-            for ev in m.poll():
-                ev.seq = self._seq
-                self._seq += 1
-                events.append(ev)
+        for batch in batches:
+            events.extend(batch)
+        if self._poll_all_seconds is not None:
+            self._poll_all_seconds.observe(perf_counter() - t0)
+        return self.assign_seq(events)
+
+    def poll_one(self, name: str) -> List[LKSMEvent]:
+        """Poll one module (without seq numbers), timing it if metrics are on."""
+        timing = self._module_metrics.get(name)
+        if timing is None:
+            return self._modules[name].poll()
+        t0 = perf_counter()
+        batch = self._modules[name].poll()
+        timing[0].observe(perf_counter() - t0)
+        timing[1].inc(len(batch))
+        return batch
+
+    def assign_seq(self, events: List[LKSMEvent]) -> List[LKSMEvent]:
+        """Stamp *events* in order with the next global sequence numbers."""
+        for ev in events:
+            ev.seq = self._seq
+            self._seq += 1
         return events
 
+    def _poll_concurrent(self, selected: List[str]) -> List[List[LKSMEvent]]:
+        if self._executor is None:
+            workers = self._max_workers or max(len(self._modules), 1)
+            self._executor = ThreadPoolExecutor(max_workers=workers,
+                                                thread_name_prefix="lksm-poll")
+        for name in selected:
+            if name not in self._pending:
+                self._pending[name] = self._executor.submit(self.poll_one, name)
+
+        wait([self._pending[n] for n in selected], timeout=self._poll_timeout)
+
+        batches: List[List[LKSMEvent]] = []
+        missed: List[str] = []
+        for name in selected:
+            fut = self._pending[name]
+            if fut.done():
+                del self._pending[name]
+                batches.append(fut.result())
+            else:
+                missed.append(name)
+                timing = self._module_metrics.get(name)
+                if timing is not None:
+                    timing[2].inc()
+        self.missed_deadlines = missed
+        return batches
+
+    def waitable_fds(self) -> Dict[str, int]:
+        """Map module name -> fd for every module that exposes one."""
+        fds: Dict[str, int] = {}
+        for name, m in self._modules.items():
+            fd = m.fileno()
+            if fd is not None:
+                fds[name] = fd
+        return fds
+
     @property
     def module_names(self) -> List[str]:
         return list(self._modules.keys())
+
+    @property
+    def modules(self) -> List[MonitorModule]:
+        return list(self._modules.values())
@@ -1,98 +1,256 @@
 """
-KprobeReaderModule — reads [PHOTON RING] events from dmesg.
+KprobeReaderModule — reads [PHOTON RING] events from /dev/kmsg.
 """
 
+import os
 import re
-import subprocess
-import time
-from typing import List
+import stat
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple, Union
 
+from python_tools.core.checkpoint import ReaderCheckpoint
 from python_tools.core.module_base import LKSMEvent, MonitorModule
 
-_PHOTON_RE = re.compile(
-    r"\[\s*(?P<ts>[\d.]+)\]\s*\[PHOTON RING\]\s*(?P<msg>.*)"
-)
+_KMSG_PATH = "/dev/kmsg"
+_READ_SIZE = 8192
+_PHOTON_TAG = "[PHOTON RING]"
+_PHOTON_TAG_B = _PHOTON_TAG.encode()
+
+LineBatch = Union[bytes, str, Iterable[Union[str, bytes]]]
 
 
 class KprobeReaderModule(MonitorModule):
-    """Polls dmesg for [PHOTON RING] lines and converts them to LKSMEvents."""
+    """Streams kernel log records from /dev/kmsg and converts [PHOTON RING]
+    lines to LKSMEvents.
+
+    The device is opened once, non-blocking, and each poll drains only the
+    records appended since the previous one.  The kernel record sequence
+    number is the read cursor, so no timestamp bookkeeping is needed.
+
+    *source* may be a path or an already-open binary file object (tests pass
+    a ``BytesIO`` or a regular file).  When omitted, the path is taken from
+    ``communication.kmsg_path`` in the config, and the module stays idle if
+    ``communication.interface`` selects the binary procfs transport instead.
 
-    def __init__(self):
-        self._last_ts: float = 0.0
-        self._seen_at_last_ts: set = set()
+    With ``communication.checkpoint_path`` set, the cursor is saved there
+    (see ``ReaderCheckpoint``) and restored by ``start()``, so a restart
+    resumes after the last record it saw instead of replaying the ring.
+    """
+
+    def __init__(self, source: Optional[Union[str, BinaryIO]] = None):
+        self._source = source
+        self._file: Optional[BinaryIO] = None
+        self._owns_file: bool = False
+        self._buf: bytes = b""
+        self._last_seq: int = -1
         self._running: bool = False
+        self._checkpoint: Optional[ReaderCheckpoint] = None
 
     @property
     def name(self) -> str:
         return "kprobe_reader"
 
     def start(self, config: dict) -> None:
+        if self._file is None:
+            source = self._source
+            comm_cfg = config.get("communication", {})
+            if source is None:
+                if comm_cfg.get("interface", "kmsg") != "kmsg":
+                    return
+                source = comm_cfg.get("kmsg_path", _KMSG_PATH)
+            if isinstance(source, (str, os.PathLike)):
+                try:
+                    fd = os.open(source, os.O_RDONLY | os.O_NONBLOCK)
+                except OSError as exc:
+                    print(f"Warning: kprobe_reader cannot open {source}: {exc}")
+                    return
+                self._file = os.fdopen(fd, "rb", buffering=0)
+                self._owns_file = True
+            else:
+                self._file = source
+            ckpt_path = comm_cfg.get("checkpoint_path")
+            if ckpt_path:
+                self._checkpoint = ReaderCheckpoint(ckpt_path,
+                                                    comm_cfg.get("checkpoint_every", 100),
+                                                    comm_cfg.get("checkpoint_interval", 5.0))
+                if self._checkpoint.load() is not None:
+                    self._last_seq = self._checkpoint.last_seq
         self._running = True
 
     def stop(self) -> None:
         self._running = False
+        if self._checkpoint is not None:
+            self._checkpoint.save()
+        if self._file is not None and self._owns_file:
+            self._file.close()
+            self._file = None
+        self._buf = b""
 
-    def poll(self) -> List[LKSMEvent]:
-        if not self._running:
-            return []
+    @property
+    def active(self) -> bool:
+        return self._file is not None
 
+    def fileno(self) -> Optional[int]:
+        """The kmsg descriptor, so the daemon can sleep until a record lands.
+
+        Regular files are always "readable" to select/epoll, so a file
+        stand-in falls back to interval polling.
+        """
+        if self._file is None:
+            return None
         try:
-            result = subprocess.run(
-                ["dmesg", "--decode"],
-                capture_output=True, text=True, timeout=5,
-            )
-            lines = result.stdout.splitlines()
-        except (subprocess.SubprocessError, FileNotFoundError):
+            fd = self._file.fileno()
+        except (AttributeError, OSError, ValueError):
+            return None
+        if stat.S_ISREG(os.fstat(fd).st_mode):
+            return None
+        return fd
+
+    def poll(self) -> List[LKSMEvent]:
+        if not self._running or self._file is None:
             return []
 
         events: List[LKSMEvent] = []
-        for line in lines:
-            m = _PHOTON_RE.search(line)
-            if not m:
+        while True:
+            try:
+                chunk = self._file.read(_READ_SIZE)
+            except BrokenPipeError:
+                # EPIPE: the record under our cursor was overwritten before we
+                # read it.  The kernel has already moved us to the oldest
+                # surviving record, so just keep reading.
                 continue
+            except BlockingIOError:
+                break
+            if not chunk:
+                # b"" at EOF of a regular file, None for EAGAIN on raw files.
+                break
 
-            ts = float(m.group("ts"))
-            if ts < self._last_ts:
-                continue
+            data = self._buf + chunk if self._buf else chunk
+            cut = data.rfind(b"\n") + 1
+            self._buf = data[cut:]
+            if cut:
+                batch, self._last_seq = parse_kmsg_records(data[:cut], self._last_seq)
+                events.extend(batch)
 
-            msg = m.group("msg").strip()
+        if self._checkpoint is not None:
+            self._checkpoint.record(self._last_seq, events[-1].ts if events else 0.0,
+                                    len(events))
+        return events
 
-            if ts == self._last_ts and msg in self._seen_at_last_ts:
-                continue
-            severity, ev_type, data = _parse_message(msg)
-
-            events.append(LKSMEvent(
-                seq=0,          # registry assigns final seq
-                ts=ts,
-                type=ev_type,
-                data=data,
-                severity=severity,
-                source="kprobe_reader",
-            ))
-
-        if events:
-            new_last_ts = events[-1].ts
-            if new_last_ts > self._last_ts:
-                self._last_ts = new_last_ts
-                self._seen_at_last_ts = set()
-            for ev in events:
-                if ev.ts == self._last_ts:
-                    self._seen_at_last_ts.add(ev.data.get("message", ev.data.get("symbol", "")))
 
-        return events
+# One alternation per printk format emitted by kernel_module/kprobe_detector.c.
+# Each format is an outer named group, so ``match.lastgroup`` is the event type
+# and a single search both classifies the message and extracts its fields.
+_DISPATCH_RE = re.compile(
+    r"(?P<suspicious_probe>SUSPICIOUS)"
+    r"|(?P<kprobe_registered>Kprobe registered for symbol:\s*(?P<symbol>\S+))"
+)
+
+_DISPATCH = {
+    "suspicious_probe": ("high", lambda m, msg: {"message": msg}),
+    "kprobe_registered": ("info", lambda m, msg: {"symbol": m.group("symbol")}),
+}
+
+_DMESG_RE = re.compile(r"\[\s*(?P<ts>[\d.]+)\]\s*\[PHOTON RING\]\s*(?P<msg>.*)")
 
 
 def _parse_message(msg: str):
     """Return (severity, type, data-dict) from a PHOTON RING message body."""
-    if "SUSPICIOUS" in msg:
-        # e.g. "SUSPICIOUS *** kallsyms_lookup_name probe detected!"
-        return "high", "suspicious_probe", {"message": msg}
+    m = _DISPATCH_RE.search(msg)
+    if m is None:
+        return "info", "photon_ring_generic", {"message": msg}
+    ev_type = m.lastgroup
+    severity, build = _DISPATCH[ev_type]
+    return severity, ev_type, build(m, msg)
+
+
+def _make_event(ts: float, msg: str) -> LKSMEvent:
+    severity, ev_type, data = _parse_message(msg)
+    return LKSMEvent(
+        seq=0,          # registry assigns final seq
+        ts=ts,
+        type=ev_type,
+        data=data,
+        severity=severity,
+        source="kprobe_reader",
+    )
+
+
+def _tagged_lines(blob: bytes) -> Iterator[bytes]:
+    """Yield only the lines of *blob* that contain the PHOTON RING tag.
+
+    Uses ``bytes.find`` to jump between tags, so untagged lines are never
+    split out, decoded or matched.
+    """
+    pos = blob.find(_PHOTON_TAG_B)
+    while pos >= 0:
+        start = blob.rfind(b"\n", 0, pos) + 1
+        end = blob.find(b"\n", pos)
+        if end < 0:
+            end = len(blob)
+        yield blob[start:end]
+        pos = blob.find(_PHOTON_TAG_B, end)
+
+
+def _tag_filter(lines: LineBatch) -> Iterable[Union[str, bytes]]:
+    if isinstance(lines, (bytes, bytearray, memoryview)):
+        return _tagged_lines(bytes(lines))
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    return (
+        line for line in lines
+        if (_PHOTON_TAG_B if isinstance(line, bytes) else _PHOTON_TAG) in line
+    )
+
+
+def parse_kmsg_records(records: LineBatch,
+                       after_seq: int = -1) -> Tuple[List[LKSMEvent], int]:
+    """Parse a batch of /dev/kmsg records into events.
+
+    *records* is either a bytes blob of newline-terminated records or an
+    iterable of individual record lines (str or bytes).  Records with a
+    sequence number ``<= after_seq`` are skipped.  Returns the events and the
+    highest PHOTON RING sequence number seen.
+    """
+    events: List[LKSMEvent] = []
+    for record in _tag_filter(records):
+        if isinstance(record, str):
+            record = record.encode("utf-8", "replace")
+        if record[:1] == b" ":
+            # " KEY=value" continuation of the previous record.
+            continue
+        header, sep, body = record.partition(b";")
+        if not sep:
+            continue
+        fields = header.split(b",", 3)
+        try:
+            seq = int(fields[1])
+            ts_usec = int(fields[2])
+        except (IndexError, ValueError):
+            continue
+        if seq <= after_seq:
+            continue
+        after_seq = seq
+
+        msg = body.decode("utf-8", "replace")
+        idx = msg.find(_PHOTON_TAG)
+        if idx < 0:
+            continue
+        events.append(_make_event(ts_usec / 1_000_000,
+                                  msg[idx + len(_PHOTON_TAG):].strip()))
+    return events, after_seq
 
-    sym_match = re.search(r"Kprobe registered for symbol:\s*(\S+)", msg)
-    if sym_match:
-        return "info", "kprobe_registered", {"symbol": sym_match.group(1)}
 
-    return "info", "photon_ring_generic", {"message": msg}
+def parse_dmesg_lines(lines: LineBatch) -> List[LKSMEvent]:
+    """Parse a batch of ``dmesg`` text lines (``[  ts] [PHOTON RING] msg``)."""
+    events: List[LKSMEvent] = []
+    for line in _tag_filter(lines):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", "replace")
+        m = _DMESG_RE.search(line)
+        if m is None:
+            continue
+        events.append(_make_event(float(m.group("ts")), m.group("msg").strip()))
+    return events
 
 
 def create_module() -> KprobeReaderModule:
@@ -0,0 +1,178 @@
+"""
+ProcfsReaderModule — reads binary event records from /proc/lksm.
+"""
+
+import os
+import stat
+import struct
+from typing import BinaryIO, List, Optional, Tuple, Union
+
+from python_tools.core.module_base import LKSMEvent, MonitorModule
+
+_PROCFS_PATH = "/proc/lksm"
+
+# struct photon_ring_record in kernel_module/photon_ring_record.h.
+RECORD = struct.Struct("<IHHQQII64s")
+SYM_LEN = 64
+MAGIC = 0x31524850
+VERSION = 1
+EV_KPROBE_REGISTERED = 1
+F_SUSPICIOUS = 0x1
+
+_MAGIC_BYTES = struct.pack("<I", MAGIC)
+
+_READ_RECORDS = 256
+
+
+def encode_record(seq: int, ts_ns: int, symbol: str, pid: int = 0, flags: int = 0,
+                  ev_type: int = EV_KPROBE_REGISTERED) -> bytes:
+    """Pack one record exactly as the kernel emitter does (tests, simulators)."""
+    return RECORD.pack(MAGIC, VERSION, ev_type, seq, ts_ns, pid, flags,
+                       symbol.encode()[:SYM_LEN - 1])
+
+
+def decode_records(data: Union[bytes, bytearray, memoryview],
+                   last_seq: int = -1) -> Tuple[List[LKSMEvent], int, int, int]:
+    """Decode whole records from *data*.
+
+    Returns ``(events, last_seq, lost, end)`` where *lost* counts records
+    missing from the ``seq`` sequence (emitter overflow) and *end* is the
+    offset decoding stopped at: ``len(data)``, or the start of the first
+    record with a bad magic or version.  *data* must hold a whole number of
+    records.
+    """
+    events: List[LKSMEvent] = []
+    lost = 0
+    end = 0
+    size = RECORD.size
+    for magic, version, ev_type, seq, ts_ns, pid, flags, raw in RECORD.iter_unpack(data):
+        if magic != MAGIC or version != VERSION:
+            return events, last_seq, lost, end
+        end += size
+        if last_seq >= 0 and seq > last_seq + 1:
+            lost += seq - last_seq - 1
+        last_seq = seq
+        if ev_type != EV_KPROBE_REGISTERED:
+            continue
+        symbol = raw.split(b"\0", 1)[0].decode("utf-8", "replace")
+        ts = ts_ns / 1e9
+        events.append(LKSMEvent(seq=0, ts=ts, type="kprobe_registered",
+                                data={"symbol": symbol, "pid": pid},
+                                severity="info", source="procfs_reader"))
+        if flags & F_SUSPICIOUS:
+            # Same data as the kmsg transport's printk for this condition.
+            events.append(LKSMEvent(seq=0, ts=ts, type="suspicious_probe",
+                                    data={"message": f"SUSPICIOUS *** {symbol} probe detected!"},
+                                    severity="high", source="procfs_reader"))
+    return events, last_seq, lost, end
+
+
+class ProcfsReaderModule(MonitorModule):
+    """Decodes fixed-layout records from the kernel module's proc file.
+
+    Active when ``communication.interface`` is ``procfs`` (or a *source* is
+    given).  Each poll drains the file in reads of up to 256 records and
+    decodes every complete record of a read in one ``struct.iter_unpack``
+    pass; a partial trailing record (possible on a FIFO) is kept for the
+    next read.  Records missing from the ``seq`` sequence are counted in
+    ``lost``.  A record with a bad header is counted in ``errors``; the
+    records before it are kept and decoding resumes at the next magic.
+    """
+
+    def __init__(self, source: Optional[Union[str, BinaryIO]] = None):
+        self._source = source
+        self._fd: Optional[int] = None
+        self._owns_fd: bool = False
+        self._buf = bytearray()
+        self._last_seq: int = -1
+        self.lost: int = 0
+        self.errors: int = 0
+
+    @property
+    def name(self) -> str:
+        return "procfs_reader"
+
+    def start(self, config: dict) -> None:
+        if self._fd is not None:
+            return
+        comm_cfg = config.get("communication", {})
+        source = self._source
+        if source is None:
+            if comm_cfg.get("interface", "kmsg") != "procfs":
+                return
+            source = comm_cfg.get("procfs_path", _PROCFS_PATH)
+        if isinstance(source, (str, os.PathLike)):
+            try:
+                self._fd = os.open(source, os.O_RDONLY | os.O_NONBLOCK)
+            except OSError as exc:
+                print(f"Warning: procfs_reader cannot open {source}: {exc}")
+                return
+            self._owns_fd = True
+        else:
+            self._fd = source.fileno()
+
+    def stop(self) -> None:
+        if self._fd is not None and self._owns_fd:
+            os.close(self._fd)
+        self._fd = None
+        self._buf.clear()
+
+    @property
+    def active(self) -> bool:
+        return self._fd is not None
+
+    def fileno(self) -> Optional[int]:
+        """The descriptor for FIFOs and character devices, which support
+        select/epoll; proc and regular files are interval-polled."""
+        if self._fd is None:
+            return None
+        mode = os.fstat(self._fd).st_mode
+        if stat.S_ISFIFO(mode) or stat.S_ISCHR(mode):
+            return self._fd
+        return None
+
+    def poll(self) -> List[LKSMEvent]:
+        if self._fd is None:
+            return []
+        events: List[LKSMEvent] = []
+        size = RECORD.size
+        while True:
+            try:
+                chunk = os.read(self._fd, size * _READ_RECORDS)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            buf = self._buf
+            if buf:
+                buf += chunk
+                data = memoryview(buf)
+            else:
+                data = memoryview(chunk)
+            while True:
+                whole = len(data) - len(data) % size
+                batch, self._last_seq, lost, end = decode_records(data[:whole], self._last_seq)
+                self.lost += lost
+                events.extend(batch)
+                if end == whole:
+                    break
+                # Out of sync with the record stream: skip to the next magic.
+                self.errors += 1
+                print(f"Warning: procfs_reader bad record header after seq {self._last_seq}, "
+                      "resyncing")
+                skip = bytes(data[end + 1:]).find(_MAGIC_BYTES)
+                if skip < 0:
+                    # Keep only a trailing partial magic, if any.
+                    whole = len(data) - next((k for k in range(len(_MAGIC_BYTES) - 1, 0, -1)
+                                              if data[-k:] == _MAGIC_BYTES[:k]), 0)
+                    break
+                data = data[end + 1 + skip:]
+            tail = bytes(data[whole:])
+            data.release()
+            self._buf = bytearray(tail)
+        return events
+
+
+def create_module() -> ProcfsReaderModule:
+    """Factory used by ModuleRegistry.discover()."""
+    return ProcfsReaderModule()
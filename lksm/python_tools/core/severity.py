@@ -0,0 +1,14 @@
+"""
+Severity — ranking of LKSMEvent severities for alert filters.
+"""
+
+SEVERITY_RANK = {"info": 0, "medium": 1, "high": 2, "critical": 3}
+
+
+def severity_at_least(threshold: str):
+    """Predicate: event severity ranks at or above *threshold*."""
+    try:
+        floor = SEVERITY_RANK[threshold]
+    except KeyError:
+        raise ValueError(f"unknown severity {threshold!r}") from None
+    return lambda ev: SEVERITY_RANK.get(ev.severity, 0) >= floor
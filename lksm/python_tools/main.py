@@ -5,20 +5,41 @@ Main entry point for Python analysis tools
 """
 
 import argparse
+import asyncio
+import json
+import multiprocessing
+import selectors
 import sys
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Dict, Iterator, List, Optional
 
 import yaml
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from python_tools.core.module_base import ModuleRegistry
-from python_tools.output.json_logger import EventLogger
-from python_tools.output.dashboard import create_app, push_events
+from python_tools.analysis.analyzer import (
+    EventFilter, Progress, analyze_files, analyze_parallel, expand_inputs, format_report,
+    total_size,
+)
+from python_tools.analysis.anomaly import AnomalyDetector
+from python_tools.analysis.correlation import CorrelationEngine
+from python_tools.analysis.rules import RuleEngine
+from python_tools.config.reloader import ConfigReloader, rules_path
+from python_tools.core.coalesce import EventCoalescer
+from python_tools.core.metrics import MetricsRegistry, StageTimer
+from python_tools.core.module_base import (
+    AsyncMonitorModule, LKSMEvent, ModuleRegistry, MonitorModule,
+)
+from python_tools.output.event_ring import RingWriter
+from python_tools.output.json_logger import EventLogger, QueuedEventLogger
+from python_tools.output.dashboard import clear_events, create_app, push_events, push_json
+from python_tools.output.event_socket import EventPublisher, EventSubscriber
+from python_tools.output.syslog_sink import SyslogSink
+from python_tools.output.webhook import WebhookDispatcher
 
 
 def load_config(path: str) -> dict:
@@ -31,46 +52,479 @@ def load_config(path: str) -> dict:
         return yaml.safe_load(f) or {}
 
 
-def run_daemon(config: dict, stop_event: Optional[threading.Event] = None) -> None:
-    """Poll modules in a loop, log events, and push to dashboard."""
-    registry = ModuleRegistry()
+# Settings a hot reload applies to the running daemon.  A change to any
+# other setting is reported in the reload message and needs a restart.
+_LIVE_SETTINGS = frozenset([
+    ("analysis", "enable_rules"), ("analysis", "rules_file"),
+    ("analysis", "enable_network_correlation"), ("analysis", "correlation"),
+    ("communication", "coalesce"),
+])
+
+
+def _restart_settings(old: dict, new: dict) -> List[str]:
+    """Dotted names of settings that differ between *old* and *new* but
+    are not in ``_LIVE_SETTINGS``."""
+    changed: List[str] = []
+    for section in sorted(set(old) | set(new)):
+        a, b = old.get(section) or {}, new.get(section) or {}
+        if isinstance(a, dict) and isinstance(b, dict):
+            changed.extend(f"{section}.{key}" for key in sorted(set(a) | set(b))
+                           if a.get(key) != b.get(key) and (section, key) not in _LIVE_SETTINGS)
+        elif a != b:
+            changed.append(section)
+    return changed
+
+
+# Upper bound on a selector wait when no module needs interval polling, so a
+# stop request is still noticed promptly.
+_IDLE_WAIT = 1.0
+
+
+def load_rules(config: dict) -> Optional[RuleEngine]:
+    """Compile ``analysis.rules_file`` if ``analysis.enable_rules`` is set."""
+    path = rules_path(config)
+    if path is None:
+        return None
+    if not path.exists():
+        print(f"Warning: rules file {path} not found, rules disabled")
+        return None
+    engine = RuleEngine.from_file(path)
+    print(f"Loaded {len(engine.rules)} rules from {path}")
+    return engine
+
+
+def poll_cycles(registry: ModuleRegistry, interval: float,
+                stop_event: Optional[threading.Event] = None,
+                event_driven: bool = True) -> Iterator[List[LKSMEvent]]:
+    """Yield one batch of events per daemon cycle until *stop_event* is set.
+
+    Modules exposing ``fileno()`` are registered with a selector and drained
+    as soon as their fd is readable; the rest are polled every *interval*
+    seconds, except inactive ones, which are skipped.  With ``event_driven=False`` (or no waitable modules) this is the
+    plain poll-then-sleep loop.
+    """
+    fds = registry.waitable_fds() if event_driven else {}
+    if not fds:
+        while not (stop_event and stop_event.is_set()):
+            yield registry.poll_all()
+            time.sleep(interval)
+        return
+
+    interval_names = [m.name for m in registry.modules if m.name not in fds and m.active]
+    with selectors.DefaultSelector() as selector:
+        for name, fd in fds.items():
+            selector.register(fd, selectors.EVENT_READ, name)
+
+        next_tick = time.monotonic()
+        while not (stop_event and stop_event.is_set()):
+            if interval_names:
+                timeout = max(next_tick - time.monotonic(), 0.0)
+            else:
+                timeout = _IDLE_WAIT
+            names = [key.data for key, _ in selector.select(timeout)]
+
+            now = time.monotonic()
+            if interval_names and now >= next_tick:
+                names.extend(interval_names)
+                next_tick = now + interval
+            yield registry.poll_all(names) if names else []
+
+
+async def _pump_stream(module: AsyncMonitorModule, queue: asyncio.Queue) -> None:
+    async for ev in module.stream():
+        await queue.put([ev])
+
+
+async def _pump_legacy(registry: ModuleRegistry, module: MonitorModule,
+                       queue: asyncio.Queue, interval: float,
+                       executor: ThreadPoolExecutor) -> None:
+    """Run a synchronous module's poll() in *executor*, through
+    ``registry.poll_one`` so it is timed like any other poll.
+
+    Modules with a ``fileno()`` are woken by the event loop's reader
+    callback; the rest are polled every *interval* seconds.
+    """
+    loop = asyncio.get_running_loop()
+    fd = module.fileno()
+    ready = asyncio.Event()
+    if fd is not None:
+        loop.add_reader(fd, ready.set)
+    try:
+        while True:
+            if fd is not None:
+                await ready.wait()
+                ready.clear()
+            batch = await loop.run_in_executor(executor, registry.poll_one, module.name)
+            if batch:
+                await queue.put(batch)
+            if fd is None:
+                await asyncio.sleep(interval)
+    finally:
+        if fd is not None:
+            loop.remove_reader(fd)
+
+
+async def async_poll_cycles(registry: ModuleRegistry, interval: float,
+                            stop_event: Optional[threading.Event] = None
+                            ) -> AsyncIterator[List[LKSMEvent]]:
+    """Asyncio counterpart of poll_cycles().
+
+    Each ``AsyncMonitorModule`` is consumed as its own task; legacy modules
+    run their blocking ``poll()`` on a thread pool.  Whatever has arrived is
+    yielded as one batch, stamped with global seq numbers in arrival order.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    modules = [m for m in registry.modules if m.active]
+    legacy = [m for m in modules if not isinstance(m, AsyncMonitorModule)]
+    executor = ThreadPoolExecutor(max_workers=max(len(legacy), 1),
+                                  thread_name_prefix="lksm-legacy")
+    tasks = [
+        asyncio.ensure_future(
+            _pump_stream(m, queue) if isinstance(m, AsyncMonitorModule)
+            else _pump_legacy(registry, m, queue, interval, executor)
+        )
+        for m in modules
+    ]
+    try:
+        while not (stop_event and stop_event.is_set()):
+            for t in tasks:
+                if t.done() and not t.cancelled():
+                    t.result()      # re-raise a module failure here
+            try:
+                batch = await asyncio.wait_for(queue.get(), _IDLE_WAIT)
+            except asyncio.TimeoutError:
+                yield []        # idle tick, lets the caller flush buffers
+                continue
+            while not queue.empty():
+                batch.extend(queue.get_nowait())
+            yield registry.assign_seq(batch)
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        executor.shutdown(wait=False)
+
+
+async def _consume_async(cycles: AsyncIterator[List[LKSMEvent]], handle) -> None:
+    async for events in cycles:
+        handle(events)
+
+
+def run_daemon(config: dict, stop_event: Optional[threading.Event] = None,
+               config_path: Optional[str] = None,
+               event_socket: Optional[str] = None,
+               metrics: Optional[MetricsRegistry] = None) -> None:
+    """Poll modules in a loop, log events, and push to dashboard.
+
+    With *config_path*, edits to it and to the rules file are picked up
+    while running (``communication.reload_interval``): the rules,
+    ``analysis.correlation`` (rebuilt, dropping partial matches) and
+    ``communication.coalesce`` change live; other edits are listed in the
+    reload message and take effect on restart.  With
+    *event_socket*, events are published on that Unix socket for a
+    dashboard in another process instead of the in-process buffer.
+    Stage timings go to *metrics*, or to a registry of its own when
+    ``metrics.enabled`` is set, and are written to ``metrics.dump_path``
+    every ``metrics.dump_interval`` seconds.
+    """
+    comm_cfg = config.get("communication", {})
+    metrics_cfg = config.get("metrics", {})
+    if metrics is None and metrics_cfg.get("enabled", False):
+        metrics = MetricsRegistry()
+    registry = ModuleRegistry(
+        concurrent=comm_cfg.get("concurrent_poll", False),
+        poll_timeout=comm_cfg.get("poll_timeout", 1.0),
+        metrics=metrics,
+    )
     registry.discover("python_tools.core.modules")
     registry.start_all(config)
 
-    logger = EventLogger(config)
-    interval = config.get("communication", {}).get("poll_interval", 0.1)
+    if config.get("logging", {}).get("writer", "inline") == "thread":
+        logger = QueuedEventLogger(config)
+    else:
+        logger = EventLogger(config)
+    interval = comm_cfg.get("poll_interval", 0.1)
+
+    rules = load_rules(config)
+    reloader = None
+    reload_interval = comm_cfg.get("reload_interval", 2.0)
+    if config_path and reload_interval and Path(config_path).exists():
+        reloader = ConfigReloader(config_path, config, reload_interval)
+        reloader.start()
+
+    analysis_cfg = config.get("analysis", {})
+    detector = None
+    if analysis_cfg.get("enable_anomaly_detection", False):
+        detector = AnomalyDetector(analysis_cfg.get("anomaly", {}))
+    correlator = None
+    if analysis_cfg.get("enable_network_correlation", False):
+        correlator = CorrelationEngine(analysis_cfg.get("correlation", {}))
+
+    ring = None
+    ring_cfg = config.get("event_ring", {})
+    if ring_cfg.get("enabled", False):
+        ring = RingWriter(ring_cfg.get("path", "/dev/shm/lksm-events.ring"),
+                          ring_cfg.get("size", "16MB"))
+
+    coalescer = None
+    coalesce_cfg = comm_cfg.get("coalesce", {})
+    if coalesce_cfg.get("enabled", False):
+        coalescer = EventCoalescer.from_config(coalesce_cfg)
+
+    publisher = None
+    if event_socket:
+        publisher = EventPublisher(event_socket, backlog=config.get("dashboard", {})
+                                   .get("max_events_display", 100))
+
+    webhooks = WebhookDispatcher.from_config(config)
+    syslog = SyslogSink.from_config(config)
+
+    timers: Dict[str, StageTimer] = {}
+    dump_path = None
+    if metrics is not None:
+        timers = {stage: StageTimer(metrics, stage)
+                  for stage in ("analysis", "push", "alerts", "log")}
+        if isinstance(logger, QueuedEventLogger):
+            metrics.gauge("lksm_logger_queue_depth", "Events waiting for the log writer.",
+                          fn=lambda: logger.queue_depth)
+            metrics.gauge("lksm_logger_dropped_events", "Events the log writer discarded.",
+                          fn=lambda: logger.dropped)
+        dump_path = metrics_cfg.get("dump_path") or None
+    dump_interval = float(metrics_cfg.get("dump_interval", 10.0))
+    next_dump = time.monotonic() + dump_interval
 
-    print(f"Daemon running — modules: {registry.module_names}")
+    def emit(events: List[LKSMEvent]) -> None:
+        """Send a finished batch to every output."""
+        t0 = time.perf_counter()
+        if publisher is not None:
+            publisher.publish(events)
+        if not events:
+            logger.flush_if_due()
+            return
+        if ring is not None:
+            ring.publish(events)
+        if publisher is None:
+            push_events(events)
+        t1 = time.perf_counter()
+        if webhooks is not None:
+            webhooks.submit(events)
+        if syslog is not None:
+            syslog.submit(events)
+        t2 = time.perf_counter()
+        logger.log_events(events)
+        if timers:
+            n = len(events)
+            timers["push"].record(t1 - t0, n)
+            timers["alerts"].record(t2 - t1, n)
+            timers["log"].record(time.perf_counter() - t2, n)
+
+    def apply_reload(new_config: dict) -> List[LKSMEvent]:
+        """Swap in the live parts of *new_config*; return summaries of a
+        coalescer that was just disabled."""
+        nonlocal config, correlator, coalescer
+        registry.reconfigure_all(new_config)
+        closing: List[LKSMEvent] = []
+
+        old_analysis, new_analysis = config.get("analysis", {}), new_config.get("analysis", {})
+        corr_keys = ("enable_network_correlation", "correlation")
+        if any(old_analysis.get(k) != new_analysis.get(k) for k in corr_keys):
+            try:
+                correlator = (CorrelationEngine(new_analysis.get("correlation", {}))
+                              if new_analysis.get("enable_network_correlation", False) else None)
+            except (ValueError, KeyError, TypeError) as exc:
+                print(f"Warning: analysis.correlation not reloaded: {exc}")
+
+        new_coalesce = new_config.get("communication", {}).get("coalesce", {})
+        if new_coalesce.get("enabled", False):
+            if coalescer is None:
+                coalescer = EventCoalescer.from_config(new_coalesce)
+            else:
+                coalescer.reconfigure(new_coalesce)
+        elif coalescer is not None:
+            closing = coalescer.flush()
+            coalescer = None
+
+        stale = _restart_settings(config, new_config)
+        config = new_config
+        print(f"Reloaded {config_path} ({len(rules.rules) if rules else 0} rules active)"
+              + (f"; restart to apply {', '.join(stale)}" if stale else ""))
+        return closing
+
+    def handle(events: List[LKSMEvent]) -> None:
+        nonlocal rules, next_dump
+        closing: List[LKSMEvent] = []
+        if reloader is not None:
+            update = reloader.take()
+            if update is not None:
+                new_config, rules = update
+                closing = apply_reload(new_config)
+        if registry.missed_deadlines:
+            print(f"Warning: poll deadline missed by {registry.missed_deadlines}")
+        t0 = time.perf_counter()
+        n_raw = len(events)
+        if events and (rules is not None or detector is not None):
+            derived = rules.evaluate(events) if rules is not None else []
+            if detector is not None:
+                derived.extend(detector.observe(events))
+            events.extend(registry.assign_seq(derived))
+        if events and correlator is not None:
+            events.extend(registry.assign_seq(correlator.observe(events)))
+        if coalescer is not None:
+            # After analysis, so detectors still see every raw event.  Kept
+            # events keep their seqs; only new burst summaries are stamped.
+            ready, summaries = coalescer.process(events)
+            events = ready + registry.assign_seq(summaries)
+        if closing:
+            events = events + registry.assign_seq(closing)
+        if timers and n_raw:
+            timers["analysis"].record(time.perf_counter() - t0, n_raw)
+        emit(events)
+        if dump_path is not None and time.monotonic() >= next_dump:
+            metrics.write(dump_path)
+            next_dump = time.monotonic() + dump_interval
+
+    runner = comm_cfg.get("runner", "sync")
+    print(f"Daemon running ({runner}) — modules: {registry.module_names}")
     try:
-        while not (stop_event and stop_event.is_set()):
-            events = registry.poll_all()
-            if events:
-                logger.log_events(events)
-                push_events(events)
-            time.sleep(interval)
+        if runner == "asyncio":
+            asyncio.run(_consume_async(
+                async_poll_cycles(registry, interval, stop_event), handle))
+        else:
+            for events in poll_cycles(registry, interval, stop_event,
+                                      comm_cfg.get("event_driven", True)):
+                handle(events)
     except KeyboardInterrupt:
         pass
     finally:
+        if reloader is not None:
+            reloader.stop()
         registry.stop_all()
+        if coalescer is not None:
+            summaries = coalescer.flush()
+            if summaries:
+                emit(registry.assign_seq(summaries))
+        logger.close()
+        if publisher is not None:
+            publisher.close()
+        if ring is not None:
+            ring.close()
+        if webhooks is not None:
+            webhooks.close()
+            print(f"Webhook stats: {webhooks.stats()}")
+        if syslog is not None:
+            syslog.close()
+            print(f"Syslog stats: {syslog.stats()}")
+        if isinstance(logger, QueuedEventLogger) and logger.dropped:
+            print(f"Warning: event logger dropped {logger.dropped} events")
+        if rules is not None:
+            print(f"Rule stats: {rules.stats()}")
+        if detector is not None:
+            print(f"Anomaly stats: {detector.stats()}")
+        if correlator is not None:
+            print(f"Correlation stats: {correlator.stats()}")
+        if metrics is not None:
+            if dump_path is not None:
+                metrics.write(dump_path)
+            print("Metrics:")
+            for series, value in metrics.snapshot().items():
+                print(f"  {series} {value}")
         print("Daemon stopped.")
 
 
-def run_dashboard(config: dict) -> None:
-    """Start daemon in a background thread, then run Flask in the foreground."""
-    stop = threading.Event()
-    daemon_thread = threading.Thread(target=run_daemon, args=(config, stop), daemon=True)
-    daemon_thread.start()
+def run_analyze(args: argparse.Namespace) -> int:
+    """Stream the given log files/globs and print aggregate statistics."""
+    paths = expand_inputs(args.file)
+    if not paths:
+        print(f"Error: no log files match {args.file}")
+        return 1
 
-    dash_cfg = config.get("dashboard", {})
+    flt = EventFilter(start_ts=args.since, end_ts=args.until, types=args.type,
+                      severities=args.severity, sources=args.source)
+    rules_spec = None
+    if args.rules:
+        with open(args.rules) as f:
+            rules_spec = yaml.safe_load(f) or {}
+    progress = Progress(total_size(paths)) if not args.quiet else None
+    print(f"Analyzing {len(paths)} file(s)...")
+    if args.workers == 1:
+        agg = analyze_files(paths, flt, args.timeline_limit, progress, rules_spec)
+    else:
+        agg = analyze_parallel(paths, flt, args.timeline_limit, args.workers, progress,
+                               rules_spec=rules_spec)
+
+    report = agg.report(top=args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+    return 0
+
+
+def _serve(app, dash_cfg: dict) -> None:
+    """Run *app* with the server named by ``dashboard.server``."""
     host = dash_cfg.get("host", "127.0.0.1")
     port = dash_cfg.get("port", 5000)
+    server = dash_cfg.get("server", "builtin")
+    print(f"Dashboard at http://{host}:{port} ({server})")
+    if server == "waitress":
+        try:
+            from waitress import serve
+        except ImportError:
+            print("Warning: waitress not installed, using the threaded server")
+            server = "threaded"
+        else:
+            serve(app, host=host, port=port, threads=dash_cfg.get("threads", 16))
+            return
+    if server == "threaded":
+        from werkzeug.serving import make_server
+        make_server(host, port, app, threaded=True).serve_forever()
+    else:
+        app.run(host=host, port=port)
+
+
+def run_dashboard(config: dict, config_path: Optional[str] = None) -> None:
+    """Run the daemon and serve the dashboard in the foreground.
+
+    With ``dashboard.daemon_process`` the daemon polls in its own process
+    and publishes events over ``dashboard.event_socket``, so web clients
+    never compete with the poll loop for the GIL.  Otherwise it runs in a
+    background thread of this process.
+    """
+    dash_cfg = config.get("dashboard", {})
+    metrics_cfg = config.get("metrics", {})
+    metrics_enabled = metrics_cfg.get("enabled", False)
+    worker = subscriber = None
+    if dash_cfg.get("daemon_process", False):
+        # The daemon keeps its metrics in its own process; serve its dumps.
+        metrics_file = (metrics_cfg.get("dump_path") or None) if metrics_enabled else None
+        app = create_app(config, metrics_file=metrics_file)
+        sock_path = dash_cfg.get("event_socket", "data/lksm-events.sock")
+        Path(sock_path).parent.mkdir(parents=True, exist_ok=True)
+        stop = multiprocessing.Event()
+        worker = multiprocessing.Process(target=run_daemon, name="lksm-daemon",
+                                         args=(config, stop, config_path, sock_path))
+        worker.start()
+        subscriber = EventSubscriber(sock_path, push_json, on_connect=clear_events)
+        subscriber.start()
+    else:
+        metrics = MetricsRegistry() if metrics_enabled else None
+        app = create_app(config, metrics=metrics)
+        stop = threading.Event()
+        daemon_thread = threading.Thread(target=run_daemon,
+                                         args=(config, stop, config_path, None, metrics),
+                                         daemon=True)
+        daemon_thread.start()
 
-    app = create_app()
-    print(f"Dashboard at http://{host}:{port}")
     try:
-        app.run(host=host, port=port)
+        _serve(app, dash_cfg)
     finally:
         stop.set()
+        if subscriber is not None:
+            subscriber.stop()
+        if worker is not None:
+            worker.join(5)
+            if worker.is_alive():
+                worker.terminate()
 
 
 def main():
@@ -83,6 +537,7 @@ Examples:
   %(prog)s --mode dashboard          Run interactive dashboard
   %(prog)s --mode daemon             Run as background daemon
   %(prog)s --mode analyze --file log.json    Analyze log file
+  %(prog)s --mode analyze --file 'data/logs/lksm_events_*.jsonl*' --type suspicious_probe
         """
     )
 
@@ -102,24 +557,50 @@ Examples:
 
     parser.add_argument(
         '--file',
-        type=str,
-        help='Log file to analyze (for analyze mode)'
+        action='append',
+        help='Log file or glob to analyze (for analyze mode, repeatable)'
+    )
+
+    analyze = parser.add_argument_group('analyze mode')
+    analyze.add_argument('--since', type=float, help='Only events with ts >= SINCE')
+    analyze.add_argument('--until', type=float, help='Only events with ts <= UNTIL')
+    analyze.add_argument('--type', action='append', help='Event type to include (repeatable)')
+    analyze.add_argument('--severity', action='append',
+                         choices=['info', 'medium', 'high', 'critical'],
+                         help='Severity to include (repeatable)')
+    analyze.add_argument('--source', action='append', help='Event source to include (repeatable)')
+    analyze.add_argument('--top', type=int, default=10, help='Number of top symbols to show')
+    analyze.add_argument('--timeline-limit', type=int, default=1000,
+                         help='Most recent suspicious probes to keep in the timeline')
+    analyze.add_argument('--workers', type=int, default=1,
+                         help='Analysis processes (0 = one per CPU, default: 1)')
+    analyze.add_argument('--rules', type=str,
+                         help='Evaluate this rules file against every matched event')
+    analyze.add_argument('--json', action='store_true', help='Print the report as JSON')
+    analyze.add_argument('--quiet', action='store_true', help='No progress readout')
+
+    parser.add_argument(
+        '--runner',
+        choices=['sync', 'asyncio'],
+        help='Daemon loop implementation (default: communication.runner or sync)'
     )
 
     args = parser.parse_args()
 
     print(f"LKSM starting in {args.mode} mode...")
     config = load_config(args.config)
+    if args.runner:
+        config.setdefault("communication", {})["runner"] = args.runner
 
     if args.mode == 'dashboard':
-        run_dashboard(config)
+        run_dashboard(config, args.config)
     elif args.mode == 'daemon':
-        run_daemon(config)
+        run_daemon(config, config_path=args.config)
     elif args.mode == 'analyze':
         if not args.file:
             print("Error: --file required for analyze mode")
             return 1
-        print(f"Analyzing {args.file}...")
+        return run_analyze(args)
 
     return 0
 
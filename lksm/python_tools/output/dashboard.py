@@ -4,16 +4,35 @@ Flask dashboard — displays LKSM events at http://host:port.
 
 import json
 import threading
+import time
 from collections import deque
 from datetime import datetime
-from typing import List
+from typing import FrozenSet, Iterator, List, Optional, Tuple
 
-from flask import Flask, jsonify, Response
+from flask import Flask, Response, request
 
+from python_tools.core.metrics import MetricsRegistry
 from python_tools.core.module_base import LKSMEvent
 
-_events: deque = deque(maxlen=500)
+# (seq, type, severity, JSON bytes) per event, oldest first.
+_Entry = Tuple[int, str, str, bytes]
+
+# One buffer for the life of the process (callers may hold a reference to
+# it); ``configure`` changes the cap and trims it in place.
+_DEFAULT_MAX_EVENTS = 500
+_max_events = _DEFAULT_MAX_EVENTS
+_events: deque = deque()
 _lock = threading.Lock()
+_new_events = threading.Condition(_lock)
+
+# Bumped on every push; with the process start time it forms the ETag.
+_version = 0
+_EPOCH = int(time.time())
+
+# Seconds between SSE comment lines on an idle stream, and the longest a
+# long-poll request may wait.
+_KEEPALIVE = 15.0
+_MAX_WAIT = 30.0
 
 _HTML = """\
 <!DOCTYPE html>
@@ -45,38 +64,155 @@ _HTML = """\
 <script>
 function fmt(ts){ return ts > 1e9 ? new Date(ts*1000).toLocaleString() : ts.toFixed(6)+"s"; }
 function esc(s){ var d=document.createElement('div'); d.textContent=s; return d.innerHTML; }
-function poll(){
-  fetch("/api/events").then(r=>r.json()).then(data=>{
-    var tb=document.getElementById("evbody");
-    tb.innerHTML="";
-    data.slice().reverse().forEach(function(ev){
-      var tr=document.createElement("tr");
-      tr.innerHTML="<td>"+ev.seq+"</td><td>"+esc(fmt(ev.ts))+"</td>"
-        +"<td>"+esc(ev.type)+"</td>"
-        +"<td>"+esc(JSON.stringify(ev.data))+"</td>"
-        +"<td class='"+ev.severity+"'>"+esc(ev.severity)+"</td>";
-      tb.appendChild(tr);
-    });
-    document.getElementById("status").textContent="Last refresh: "+new Date().toLocaleTimeString()+" | Events: "+data.length;
-  }).catch(function(){});
+var MAX_ROWS=500, count=0, cursor=-1;
+function addRow(ev){
+  var tb=document.getElementById("evbody");
+  var tr=document.createElement("tr");
+  tr.innerHTML="<td>"+ev.seq+"</td><td>"+esc(fmt(ev.ts))+"</td>"
+    +"<td>"+esc(ev.type)+"</td>"
+    +"<td>"+esc(JSON.stringify(ev.data))+"</td>"
+    +"<td class='"+ev.severity+"'>"+esc(ev.severity)+"</td>";
+  tb.insertBefore(tr, tb.firstChild);
+  while(tb.rows.length>MAX_ROWS){ tb.deleteRow(-1); }
+  cursor=ev.seq; count++;
+  document.getElementById("status").textContent="Last event: "+new Date().toLocaleTimeString()+" | Events: "+count;
+}
+function longPoll(){
+  fetch("/api/events?wait=25&since="+cursor).then(r=>r.json()).then(data=>{
+    data.forEach(addRow);
+    longPoll();
+  }).catch(function(){ setTimeout(longPoll, 2000); });
+}
+if(window.EventSource){
+  var es=new EventSource("/api/stream");
+  es.onmessage=function(m){ addRow(JSON.parse(m.data)); };
+}else{
+  longPoll();
 }
-setInterval(poll, 2000);
-poll();
 </script>
 </body>
 </html>
 """
 
 
+def configure(max_events: int) -> None:
+    """Resize the event buffer, keeping the newest entries."""
+    global _max_events
+    with _lock:
+        _max_events = max_events
+        _trim()
+
+
+def _trim() -> None:
+    """Drop the oldest entries past ``_max_events``.  Caller holds ``_lock``."""
+    for _ in range(len(_events) - _max_events):
+        _events.popleft()
+
+
 def push_events(events: List[LKSMEvent]) -> None:
-    """Called by the daemon loop to feed new events into the dashboard."""
+    """Called by the daemon loop to feed new events into the dashboard.
+
+    Each event is serialized once here; requests only join cached bytes.
+    """
+    global _version
+    with _lock:
+        for ev in events[-_max_events:]:
+            _events.append((ev.seq, ev.type, ev.severity, ev.to_json()))
+        _trim()
+        _version += 1
+        _new_events.notify_all()
+
+
+def clear_events() -> None:
+    """Empty the buffer (e.g. before a publisher resends its backlog)."""
+    global _version
+    with _lock:
+        _events.clear()
+        _version += 1
+
+
+def push_json(lines: List[bytes]) -> None:
+    """Like ``push_events`` for events already serialized by another process.
+
+    Each line is parsed only for seq, type and severity; the bytes served
+    are the ones received.
+    """
+    global _version
+    entries = []
+    for line in lines:
+        try:
+            d = json.loads(line)
+            entries.append((d["seq"], d["type"], d.get("severity", "info"), bytes(line)))
+        except (ValueError, KeyError, TypeError):
+            continue
     with _lock:
-        for ev in events:
-            _events.append(ev.to_dict())
+        _events.extend(entries[-_max_events:])
+        _trim()
+        _version += 1
+        _new_events.notify_all()
+
+
+def _after(since: int) -> List[_Entry]:
+    """Buffered entries with seq > *since*, oldest first.
 
+    Walks back from the newest entry, so the cost is the number of new
+    events, not the buffer size.  Caller holds ``_lock``.
+    """
+    out = []
+    for entry in reversed(_events):
+        if entry[0] <= since:
+            break
+        out.append(entry)
+    out.reverse()
+    return out
 
-def create_app() -> Flask:
+
+def _wait_after(since: int, timeout: float) -> List[_Entry]:
+    """Like ``_after`` but block up to *timeout* seconds for new events."""
+    with _lock:
+        _new_events.wait_for(lambda: bool(_events) and _events[-1][0] > since, timeout)
+        return _after(since)
+
+
+def _stream(since: int) -> Iterator[bytes]:
+    """Server-Sent Events: one ``id``/``data`` frame per event."""
+    yield b"retry: 2000\n\n"
+    while True:
+        entries = _wait_after(since, _KEEPALIVE)
+        if not entries:
+            yield b": keepalive\n\n"
+            continue
+        since = entries[-1][0]
+        yield b"".join(b"id: %d\ndata: %s\n\n" % (e[0], e[3]) for e in entries)
+
+
+def _int_arg(value: Optional[str], default: int) -> int:
+    try:
+        return int(value) if value is not None else default
+    except ValueError:
+        return default
+
+
+def _float_arg(value: Optional[str], default: float) -> float:
+    try:
+        result = float(value) if value is not None else default
+    except ValueError:
+        return default
+    return result if result == result else default      # NaN
+
+
+def _set_arg(value: Optional[str]) -> Optional[FrozenSet[str]]:
+    return frozenset(v for v in value.split(",") if v) if value else None
+
+
+def create_app(config: Optional[dict] = None, metrics: Optional[MetricsRegistry] = None,
+               metrics_file: Optional[str] = None) -> Flask:
+    """The dashboard app.  With *metrics* (a daemon in this process) or
+    *metrics_file* (the ``metrics.dump_path`` of a daemon process), it also
+    serves ``/metrics``."""
     app = Flask(__name__)
+    if config is not None:
+        configure(config.get("dashboard", {}).get("max_events_display", _DEFAULT_MAX_EVENTS))
 
     @app.route("/")
     def index():
@@ -84,7 +220,71 @@ def create_app() -> Flask:
 
     @app.route("/api/events")
     def api_events():
-        with _lock:
-            return jsonify(list(_events))
+        """Buffered events as a JSON array, oldest first.
+
+        ``since=<seq>``   only events after that seq (a cursor)
+        ``limit=<n>``     at most n: the oldest after ``since``, else the newest
+        ``type=a,b``      only these event types
+        ``severity=a,b``  only these severities
+        ``wait=<s>``      long-poll up to s seconds for something after ``since``
+
+        Responses carry an ETag that changes only when events are pushed,
+        so an unchanged buffer is answered with 304 without touching it.
+        """
+        args = request.args
+        since = _int_arg(args.get("since"), -1)
+        limit = _int_arg(args.get("limit"), 0)
+        types = _set_arg(args.get("type"))
+        severities = _set_arg(args.get("severity"))
+        wait = min(_float_arg(args.get("wait"), 0.0), _MAX_WAIT)
+
+        if wait > 0:
+            entries = _wait_after(since, wait)
+            etag = None
+        else:
+            etag = f"{_EPOCH:x}-{_version}"
+            if request.if_none_match.contains(etag):
+                resp = Response(status=304)
+                resp.set_etag(etag)
+                return resp
+            with _lock:
+                entries = _after(since)
+
+        if types is not None or severities is not None:
+            entries = [e for e in entries
+                       if (types is None or e[1] in types)
+                       and (severities is None or e[2] in severities)]
+        if limit > 0:
+            entries = entries[:limit] if since >= 0 else entries[-limit:]
+        body = b"[" + b", ".join(e[3] for e in entries) + b"]"
+        resp = Response(body, content_type="application/json")
+        if etag is not None:
+            resp.set_etag(etag)
+            resp.headers["Cache-Control"] = "no-cache"
+        return resp
+
+    @app.route("/api/stream")
+    def api_stream():
+        """Live events as Server-Sent Events.
+
+        Starts after ``Last-Event-ID`` (set by a reconnecting EventSource)
+        or ``since``; with neither, the buffered backlog is sent first.
+        """
+        since = _int_arg(request.headers.get("Last-Event-ID", request.args.get("since")), -1)
+        return Response(_stream(since), content_type="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    if metrics is not None or metrics_file is not None:
+        @app.route("/metrics")
+        def metrics_text():
+            """Pipeline metrics in Prometheus text format."""
+            body = metrics.render() if metrics is not None else ""
+            if metrics_file is not None:
+                try:
+                    with open(metrics_file) as f:
+                        body += f.read()
+                except OSError:
+                    pass        # daemon has not written its first dump yet
+            return Response(body, content_type="text/plain; version=0.0.4")
 
     return app
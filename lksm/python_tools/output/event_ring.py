@@ -0,0 +1,197 @@
+"""
+Event ring — a memory-mapped, single-writer ring of serialized events.
+
+Layout (little endian)::
+
+    0   8s  magic  b"LKSMRING"
+    8   I   version
+    12  I   reserved
+    16  Q   capacity     size of the data area in bytes
+    24  Q   generation   changes whenever a writer (re)initializes the file
+    32  Q   head         logical offset after the last published record
+    40  Q   tail         logical offset of the oldest intact record
+    64  ... data area
+
+Records are ``<u32 length><JSON bytes>`` at logical offsets that only ever
+grow; the physical position is ``offset % capacity``.  A record never
+straddles the end of the data area: the writer leaves a ``0xFFFFFFFF``
+marker (or fewer than 4 spare bytes) and continues at the start.
+
+The writer moves ``tail`` past any record before overwriting it and
+publishes ``head`` after a batch is written, so readers need no lock: each
+keeps its own cursor, reads up to ``head``, and discards the whole copy
+(restarting from ``tail``) if ``tail`` overtook its cursor meanwhile.
+"""
+
+import mmap
+import os
+import struct
+import time
+from collections import deque
+from typing import Deque, List, Tuple, Union
+
+from python_tools.core.module_base import LKSMEvent
+from python_tools.output.json_logger import _parse_size
+
+MAGIC = b"LKSMRING"
+VERSION = 1
+_HEADER = struct.Struct("<8sIIQQQQ")
+_HEADER_SIZE = 64
+_OFF_GEN = 24
+_OFF_HEAD = 32
+_OFF_TAIL = 40
+_U64 = struct.Struct("<Q")
+_LEN = struct.Struct("<I")
+_WRAP = 0xFFFFFFFF
+
+
+class RingWriter:
+    """Publishes events into the ring at *path* (e.g. under ``/dev/shm``).
+
+    The file is reused if it exists so readers that already mapped it see
+    the new ``generation`` and resynchronize.  Only one writer may use a
+    ring at a time.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike],
+                 capacity: Union[int, str] = 16 * 1024 * 1024):
+        capacity = _parse_size(capacity)
+        if capacity < 1024:
+            raise ValueError(f"ring capacity too small: {capacity}")
+        self.path = str(path)
+        self.capacity = capacity
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, _HEADER_SIZE + capacity)
+            self._mm = mmap.mmap(fd, _HEADER_SIZE + capacity)
+        finally:
+            os.close(fd)
+        self.generation = time.time_ns()
+        _HEADER.pack_into(self._mm, 0, MAGIC, VERSION, 0, capacity, self.generation, 0, 0)
+        self._head = 0
+        self._starts: Deque[int] = deque()
+        self.written: int = 0
+        self.oversized: int = 0
+
+    def publish(self, events: List[LKSMEvent]) -> None:
+        """Append *events* and make them visible to readers in one step."""
+        if not events:
+            return
+        mm, cap, starts = self._mm, self.capacity, self._starts
+        head = self._head
+        for ev in events:
+            payload = ev.to_json()
+            need = _LEN.size + len(payload)
+            if need > cap:
+                self.oversized += 1
+                continue
+            phys = head % cap
+            start = head
+            if cap - phys < need:
+                start = head + cap - phys
+            end = start + need
+
+            if starts and starts[0] < end - cap:
+                while starts and starts[0] < end - cap:
+                    starts.popleft()
+                _U64.pack_into(mm, _OFF_TAIL, starts[0] if starts else start)
+
+            if start != head and cap - phys >= _LEN.size:
+                _LEN.pack_into(mm, _HEADER_SIZE + phys, _WRAP)
+            pos = _HEADER_SIZE + start % cap
+            _LEN.pack_into(mm, pos, len(payload))
+            mm[pos + _LEN.size:pos + need] = payload
+            starts.append(start)
+            head = end
+            self.written += 1
+        self._head = head
+        _U64.pack_into(mm, _OFF_HEAD, head)
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+class RingReader:
+    """One consumer's cursor into a ring written by ``RingWriter``.
+
+    Starts at the live end of the stream, or at the oldest retained record
+    with *from_start*.  ``read()`` never blocks; records the writer
+    overwrote before this reader got to them are counted in ``overruns``
+    (once per gap) and skipped.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike], from_start: bool = False):
+        self.path = str(path)
+        self.overruns: int = 0
+        self._open()
+        self._cursor = self._tail() if from_start else self._head()
+
+    def _open(self) -> None:
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.capacity, self.generation, _, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{self.path} is not an LKSM event ring")
+
+    def _head(self) -> int:
+        return _U64.unpack_from(self._mm, _OFF_HEAD)[0]
+
+    def _tail(self) -> int:
+        return _U64.unpack_from(self._mm, _OFF_TAIL)[0]
+
+    def _resync(self) -> None:
+        """The writer restarted: remap and start from its oldest record."""
+        self._mm.close()
+        self._open()
+        self._cursor = self._tail()
+
+    def read(self, max_records: int = 0) -> List[bytes]:
+        """Return the JSON bytes of records published since the last call."""
+        if _U64.unpack_from(self._mm, _OFF_GEN)[0] != self.generation:
+            self._resync()
+        while True:
+            head, tail = self._head(), self._tail()
+            if self._cursor < tail or self._cursor > head:
+                if self._cursor < tail:
+                    self.overruns += 1
+                self._cursor = tail
+            out, cursor = self._copy(head, max_records)
+            new_tail = self._tail()
+            if new_tail <= self._cursor:
+                self._cursor = cursor
+                return out
+            # The writer overtook the copy.  The length fields we followed may
+            # have been overwritten, so no offset past the old cursor is known
+            # to be a record boundary; restart from the tail, which is one.
+            self.overruns += 1
+            self._cursor = new_tail
+
+    def _copy(self, head: int, max_records: int) -> Tuple[List[bytes], int]:
+        mm, cap = self._mm, self.capacity
+        out: List[bytes] = []
+        cursor = self._cursor
+        while cursor < head and not (max_records and len(out) >= max_records):
+            phys = cursor % cap
+            room = cap - phys
+            if room < _LEN.size:
+                cursor += room
+                continue
+            (n,) = _LEN.unpack_from(mm, _HEADER_SIZE + phys)
+            if n == _WRAP:
+                cursor += room
+                continue
+            if n > room - _LEN.size or cursor + _LEN.size + n > head:
+                break                      # torn length; the caller's tail check resyncs
+            pos = _HEADER_SIZE + phys + _LEN.size
+            out.append(mm[pos:pos + n])
+            cursor += _LEN.size + n
+        return out, cursor
+
+    @property
+    def lag(self) -> int:
+        """Bytes published but not yet read."""
+        return max(0, self._head() - self._cursor)
+
+    def close(self) -> None:
+        self._mm.close()
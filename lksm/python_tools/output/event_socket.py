@@ -0,0 +1,165 @@
+"""
+Event socket — streams serialized events from the daemon to other processes.
+"""
+
+import os
+import socket
+import threading
+from collections import deque
+from typing import Callable, List, Optional
+
+from python_tools.core.module_base import LKSMEvent
+
+# Bytes queued for one subscriber before it is considered stuck and dropped.
+_MAX_PENDING = 4 * 1024 * 1024
+_RECONNECT_DELAY = 0.5
+
+
+class EventPublisher:
+    """Unix stream socket server the daemon writes JSON lines to.
+
+    Never blocks the poll loop: sockets are non-blocking, each subscriber
+    gets a bounded outbox, and a subscriber that falls more than
+    ``max_pending`` bytes behind is disconnected (``dropped_clients``) rather
+    than slowing the daemon down.  New connections are accepted on the next
+    ``publish`` call, which the daemon makes every cycle, and are first sent
+    the last *backlog* events.
+    """
+
+    def __init__(self, path: str, max_pending: int = _MAX_PENDING, backlog: int = 0):
+        self.path = path
+        self.max_pending = max_pending
+        self._recent: deque = deque(maxlen=backlog)
+        if os.path.exists(path):
+            os.unlink(path)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(path)
+        self._sock.listen(8)
+        self._sock.setblocking(False)
+        self._clients: List[list] = []  # [socket, outbox bytearray]
+        self.dropped_clients: int = 0
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._clients)
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            conn.setblocking(False)
+            self._clients.append([conn, bytearray(b"".join(self._recent))])
+
+    def publish(self, events: List[LKSMEvent]) -> None:
+        """Queue *events* for every subscriber and send what the sockets take."""
+        self._accept()
+        lines = [ev.to_json() + b"\n" for ev in events]
+        if self._recent.maxlen:
+            self._recent.extend(lines)
+        if not self._clients:
+            return
+        payload = b"".join(lines)
+        for client in list(self._clients):
+            conn, outbox = client
+            outbox += payload
+            try:
+                while outbox:
+                    sent = conn.send(outbox)
+                    del outbox[:sent]
+            except (BlockingIOError, InterruptedError):
+                pass
+            except OSError:
+                self._drop(client)
+                continue
+            if len(outbox) > self.max_pending:
+                self.dropped_clients += 1
+                print(f"Warning: event socket subscriber fell {len(outbox)} bytes behind, dropped")
+                self._drop(client)
+
+    def _drop(self, client: list) -> None:
+        self._clients.remove(client)
+        client[0].close()
+
+    def close(self) -> None:
+        for client in list(self._clients):
+            self._drop(client)
+        self._sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class EventSubscriber:
+    """Background thread that reads an ``EventPublisher`` socket.
+
+    Each received chunk's complete lines are handed to *on_lines* as one
+    batch of JSON bytes.  The connection is retried until ``stop()``, so the
+    subscriber may start before the daemon has bound the socket and
+    survives a daemon restart.  *on_connect* runs before each connection's
+    first batch, e.g. to drop state the publisher's backlog will resend.
+    """
+
+    def __init__(self, path: str, on_lines: Callable[[List[bytes]], None],
+                 on_connect: Optional[Callable[[], None]] = None):
+        self.path = path
+        self._on_lines = on_lines
+        self._on_connect = on_connect
+        self._stop = threading.Event()
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self.connected = threading.Event()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="lksm-event-subscriber",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                self._stop.wait(_RECONNECT_DELAY)
+                continue
+            self._sock = sock
+            if self._on_connect is not None:
+                self._on_connect()
+            self.connected.set()
+            try:
+                self._read(sock)
+            finally:
+                self.connected.clear()
+                self._sock = None
+                sock.close()
+
+    def _read(self, sock: socket.socket) -> None:
+        partial = b""
+        while not self._stop.is_set():
+            try:
+                chunk = sock.recv(65536)
+            except OSError:
+                return
+            if not chunk:
+                return
+            lines = (partial + chunk).split(b"\n")
+            partial = lines.pop()
+            if lines:
+                self._on_lines(lines)
+
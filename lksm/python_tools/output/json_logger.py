@@ -2,35 +2,404 @@
 EventLogger — writes LKSMEvents to daily JSONL files.
 """
 
+import gzip
 import json
 import os
+import re
+import threading
+import time
+import zlib
+from collections import deque
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, Iterator, List, Optional, Union
 
 from python_tools.core.module_base import LKSMEvent
 
+_DURABILITY = ("none", "flush", "fsync")
+_BACKPRESSURE = ("block", "drop_oldest", "drop")
+_FORMATS = {"json": ".jsonl", "gzip": ".jsonl.gz"}
+INDEX_SUFFIX = ".idx"
+_SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)I?B?\s*$", re.IGNORECASE)
+_SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def _parse_size(value: Union[int, float, str, None]) -> int:
+    """``100MB`` / ``512k`` / ``1048576`` -> bytes.  0 or None means unlimited."""
+    if value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    m = _SIZE_RE.match(value)
+    if not m:
+        raise ValueError(f"invalid size: {value!r}")
+    return int(float(m.group(1)) * _SIZE_UNITS[m.group(2).upper()])
+
+
+def _today() -> str:
+    return datetime.now().strftime("%Y-%m-%d")
+
 
 class EventLogger:
-    """Appends events to ``data/logs/lksm_events_YYYY-MM-DD.jsonl``."""
+    """Appends events to ``data/logs/lksm_events_YYYY-MM-DD.jsonl``.
+
+    The current file stays open between calls.  Encoded batches collect in
+    memory and are written when ``flush_bytes`` are pending or
+    ``flush_interval`` seconds have passed since the last write (both 0 means
+    write-through).  ``durability`` controls what happens per written batch:
+    ``none`` leaves it in the file object's buffer, ``flush`` hands it to the
+    OS, ``fsync`` also forces it to disk.
+
+    Files roll over when the date changes (``rotation: daily``) and before a
+    batch would push the current file past ``max_file_size``; size rollovers
+    are named ``lksm_events_YYYY-MM-DD.N.jsonl``.  A batch is never split
+    across files, and restarting resumes the newest part for today.
+
+    With ``format: gzip`` each flush is written as one independently
+    decompressible gzip member to ``lksm_events_YYYY-MM-DD.jsonl.gz`` (the
+    file as a whole is still ordinary gzip), and a line is appended to the
+    ``.idx`` sidecar recording the member's offset, length and seq/ts range.
+    ``flush_bytes`` therefore sets the block size.  See ``iter_segment_lines``.
+    """
 
     def __init__(self, config: dict):
         log_cfg = config.get("logging", {})
         self._output_dir = Path(log_cfg.get("output_dir", "data/logs"))
         self._output_dir.mkdir(parents=True, exist_ok=True)
+        self._max_size = _parse_size(log_cfg.get("max_file_size"))
+        self._daily = log_cfg.get("rotation", "daily") == "daily"
+        self._flush_interval = float(log_cfg.get("flush_interval", 0.0))
+        self._flush_bytes = _parse_size(log_cfg.get("flush_bytes", 0))
+        self._durability = log_cfg.get("durability", "flush")
+        if self._durability not in _DURABILITY:
+            raise ValueError(f"logging.durability must be one of {_DURABILITY}")
+        self._format = log_cfg.get("format", "json")
+        if self._format not in _FORMATS:
+            raise ValueError(f"logging.format must be one of {tuple(_FORMATS)}")
+        self._compress_level = int(log_cfg.get("compress_level", 6))
+
+        self._file: Optional[BinaryIO] = None
+        self._index: Optional[BinaryIO] = None
+        self._day: Optional[str] = None
+        self._part: int = 0
+        self._size: int = 0
+        self._pending: List[bytes] = []
+        self._pending_bytes: int = 0
+        self._pending_day: str = ""
+        # first_seq, last_seq, min_ts, max_ts of everything pending
+        self._pending_range: Optional[list] = None
+        self._last_flush: float = time.monotonic()
 
-    def _log_path(self) -> Path:
-        today = datetime.now().strftime("%Y-%m-%d")
-        return self._output_dir / f"lksm_events_{today}.jsonl"
+    def _log_path(self, day: Optional[str] = None, part: int = 0) -> Path:
+        day = day or _today()
+        suffix = f".{part}" if part else ""
+        return self._output_dir / f"lksm_events_{day}{suffix}{_FORMATS[self._format]}"
 
     def log_event(self, event: LKSMEvent) -> None:
-        with open(self._log_path(), "a") as f:
-            f.write(json.dumps(event.to_dict()) + "\n")
+        self.log_events([event])
 
     def log_events(self, events: List[LKSMEvent]) -> None:
         if not events:
             return
-        path = self._log_path()
-        with open(path, "a") as f:
-            for ev in events:
-                f.write(json.dumps(ev.to_dict()) + "\n")
+        today = _today() if self._daily else (self._day or _today())
+        if self._pending and today != self._pending_day:
+            # Everything buffered so far belongs to the previous day's file.
+            self.flush()
+        if not self._pending:
+            self._pending_day = today
+        chunk = b"".join(ev.to_json() + b"\n" for ev in events)
+        if self._format != "json":
+            lo = min(ev.ts for ev in events)
+            hi = max(ev.ts for ev in events)
+            r = self._pending_range
+            if r is None:
+                self._pending_range = [events[0].seq, events[-1].seq, lo, hi]
+            else:
+                r[1] = events[-1].seq
+                r[2] = min(r[2], lo)
+                r[3] = max(r[3], hi)
+        self._pending.append(chunk)
+        self._pending_bytes += len(chunk)
+        self.flush_if_due()
+
+    def flush_if_due(self) -> None:
+        """Write pending batches if the byte or time threshold is reached."""
+        if not self._pending:
+            return
+        if (self._pending_bytes >= self._flush_bytes
+                or time.monotonic() - self._last_flush >= self._flush_interval):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write every pending batch and apply the durability policy."""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        pending, self._pending, self._pending_bytes = self._pending, [], 0
+        if self._format == "json":
+            for chunk in pending:
+                f = self._current_file(self._pending_day, len(chunk))
+                f.write(chunk)
+                self._size += len(chunk)
+        else:
+            self._write_block(pending)
+        for f in (self._file, self._index):
+            if f is not None and self._durability != "none":
+                f.flush()
+                if self._durability == "fsync":
+                    os.fsync(f.fileno())
+
+    def _write_block(self, pending: List[bytes]) -> None:
+        raw = b"".join(pending)
+        block = gzip.compress(raw, compresslevel=self._compress_level, mtime=0)
+        f = self._current_file(self._pending_day, len(block))
+        offset = self._size
+        f.write(block)
+        self._size += len(block)
+
+        first_seq, last_seq, min_ts, max_ts = self._pending_range
+        self._pending_range = None
+        entry = {"offset": offset, "length": len(block), "count": raw.count(b"\n"),
+                 "first_seq": first_seq, "last_seq": last_seq,
+                 "min_ts": min_ts, "max_ts": max_ts}
+        self._index.write(json.dumps(entry).encode() + b"\n")
+
+    def close(self) -> None:
+        self.flush()
+        self._close_file()
+
+    def _current_file(self, day: str, incoming: int) -> BinaryIO:
+        if self._file is None or day != self._day:
+            self._open(day)
+        elif self._max_size and self._size and self._size + incoming > self._max_size:
+            self._open(day, self._part + 1)
+        return self._file
+
+    def _open(self, day: str, part: Optional[int] = None) -> None:
+        self._close_file()
+        if part is None:
+            # Resume the newest existing part for *day*, or start a new one
+            # if it is already full.
+            part = 0
+            while self._log_path(day, part + 1).exists():
+                part += 1
+            path = self._log_path(day, part)
+            if self._max_size and path.exists() and path.stat().st_size >= self._max_size:
+                part += 1
+        path = self._log_path(day, part)
+        self._file = open(path, "ab")
+        if self._format != "json":
+            self._index = open(str(path) + INDEX_SUFFIX, "ab")
+        self._day, self._part = day, part
+        self._size = self._file.tell()
+
+    def _close_file(self) -> None:
+        for f in (self._file, self._index):
+            if f is not None:
+                if self._durability == "fsync":
+                    f.flush()
+                    os.fsync(f.fileno())
+                f.close()
+        self._file = None
+        self._index = None
+
+
+def read_segment_index(path: Union[str, Path]) -> List[dict]:
+    """Load the ``.idx`` sidecar of a compressed segment ([] if missing)."""
+    idx_path = Path(str(path) + INDEX_SUFFIX)
+    entries: List[dict] = []
+    if not idx_path.exists():
+        return entries
+    with open(idx_path, "rb") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break       # torn final line after a crash
+    return entries
+
+
+def _iter_members(f: BinaryIO, offset: int, end: Optional[int] = None,
+                  chunk_size: int = 1 << 16) -> Iterator[bytes]:
+    """Decompress consecutive gzip members in ``[offset, end)`` (end of file
+    if *end* is None).
+
+    The file is read *chunk_size* bytes at a time, so only one member's
+    output is held in memory.  A truncated or corrupt final member ends
+    the iteration.
+    """
+    f.seek(offset)
+    left = -1 if end is None else end - offset
+
+    def read() -> bytes:
+        nonlocal left
+        if left < 0:
+            return f.read(chunk_size)
+        chunk = f.read(min(chunk_size, left))
+        left -= len(chunk)
+        return chunk
+
+    d = zlib.decompressobj(wbits=31)
+    out: List[bytes] = []
+    data = read()
+    while data:
+        try:
+            out.append(d.decompress(data))
+        except zlib.error:
+            return
+        if d.eof:
+            yield b"".join(out)
+            out = []
+            data = d.unused_data
+            d = zlib.decompressobj(wbits=31)
+        else:
+            data = b""
+        if not data:
+            data = read()
+
+
+def iter_segment_lines(path: Union[str, Path], start_ts: Optional[float] = None,
+                       end_ts: Optional[float] = None) -> Iterator[bytes]:
+    """Yield raw JSONL lines from a compressed segment.
+
+    Only blocks whose indexed ``[min_ts, max_ts]`` overlaps the window are
+    read and decompressed; individual lines in those blocks may still fall
+    outside it, so callers filter on ``ts`` themselves.  Bytes not covered
+    by any index entry (a block whose index line was lost in a crash, at
+    the end or followed by blocks written after a restart) are scanned in
+    full.
+    """
+    index = read_segment_index(path)
+    with open(path, "rb") as f:
+        covered = 0
+        for entry in index:
+            if entry["offset"] > covered:
+                for block in _iter_members(f, covered, entry["offset"]):
+                    yield from block.splitlines()
+            covered = entry["offset"] + entry["length"]
+            if start_ts is not None and entry["max_ts"] < start_ts:
+                continue
+            if end_ts is not None and entry["min_ts"] > end_ts:
+                continue
+            f.seek(entry["offset"])
+            yield from gzip.decompress(f.read(entry["length"])).splitlines()
+
+        for block in _iter_members(f, covered):
+            yield from block.splitlines()
+
+
+class QueuedEventLogger:
+    """Runs an EventLogger on a dedicated writer thread.
+
+    ``log_events`` only enqueues, so a slow disk no longer delays the poll
+    loop.  The queue holds at most ``logging.queue_size`` events; when it is
+    full, ``logging.backpressure`` decides what happens: ``block`` waits for
+    the writer, ``drop_oldest`` discards the oldest queued events, ``drop``
+    discards the incoming ones.  Discards are counted in ``dropped``.
+    ``close()`` drains everything still queued before returning.
+
+    A batch the inner logger fails on is counted in ``errors`` and the
+    writer moves on.  Should the writer thread die anyway, ``log_events``
+    counts events as dropped instead of waiting on it.
+    """
+
+    def __init__(self, config: dict, logger: Optional[EventLogger] = None):
+        log_cfg = config.get("logging", {})
+        self._logger = logger if logger is not None else EventLogger(config)
+        self._max_events = int(log_cfg.get("queue_size", 10000))
+        self._policy = log_cfg.get("backpressure", "block")
+        if self._policy not in _BACKPRESSURE:
+            raise ValueError(f"logging.backpressure must be one of {_BACKPRESSURE}")
+        # Wake at least this often so the inner logger's flush_interval holds.
+        self._tick = max(float(log_cfg.get("flush_interval", 0.0)), 0.05)
+
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._closing = False
+        self.dropped: int = 0
+        self.written: int = 0
+        self.errors: int = 0
+        self._warned_dead: bool = False
+        self._thread = threading.Thread(target=self._run, name="lksm-log-writer",
+                                        daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def log_event(self, event: LKSMEvent) -> None:
+        self.log_events([event])
+
+    def log_events(self, events: List[LKSMEvent]) -> None:
+        if not events:
+            return
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("logger is closed")
+            if not self._thread.is_alive():
+                self._drop_dead(len(events))
+                return
+            room = self._max_events - len(self._queue)
+            if len(events) > room:
+                if self._policy == "drop":
+                    self.dropped += len(events) - max(room, 0)
+                    events = events[:max(room, 0)]
+                elif self._policy == "drop_oldest":
+                    excess = min(len(events) - room, len(self._queue))
+                    for _ in range(excess):
+                        self._queue.popleft()
+                    self.dropped += excess
+                    if len(events) > self._max_events:
+                        self.dropped += len(events) - self._max_events
+                        events = events[-self._max_events:]
+                else:
+                    for i, ev in enumerate(events):
+                        while len(self._queue) >= self._max_events and not self._closing:
+                            if not self._thread.is_alive():
+                                self._drop_dead(len(events) - i)
+                                return
+                            self._cond.wait(self._tick)
+                        self._queue.append(ev)
+                        self._cond.notify_all()
+                    return
+            self._queue.extend(events)
+            self._cond.notify_all()
+
+    def _drop_dead(self, n: int) -> None:
+        """Count *n* events as dropped because the writer thread is gone."""
+        self.dropped += n
+        if not self._warned_dead:
+            print("Warning: event log writer thread has stopped, dropping events")
+            self._warned_dead = True
+
+    def flush_if_due(self) -> None:
+        """No-op: the writer thread applies the flush policy itself."""
+
+    def close(self) -> None:
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._logger.close()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._queue and not self._closing:
+                    self._cond.wait(self._tick)
+                batch = list(self._queue)
+                self._queue.clear()
+                closing = self._closing
+                self._cond.notify_all()
+            try:
+                if batch:
+                    self._logger.log_events(batch)
+                    self.written += len(batch)
+                self._logger.flush_if_due()
+            except Exception as exc:
+                # Skip the batch; a dead writer would stall log_events().
+                self.errors += 1
+                print(f"Warning: event log write failed: {exc}")
+            if closing and not batch:
+                return
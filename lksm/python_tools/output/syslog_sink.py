@@ -0,0 +1,262 @@
+"""
+SyslogSink — writes alerts as RFC 5424 records to a local or remote syslog.
+"""
+
+import errno
+import os
+import socket
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+
+from python_tools.core.module_base import LKSMEvent
+from python_tools.core.severity import severity_at_least
+
+# LKSM severity -> syslog severity (RFC 5424 section 6.2.1).
+_SYSLOG_SEVERITY = {"critical": 2, "high": 3, "medium": 4, "info": 6}
+
+FACILITIES = {
+    "kern": 0, "user": 1, "daemon": 3, "auth": 4, "syslog": 5, "authpriv": 10,
+    "local0": 16, "local1": 17, "local2": 18, "local3": 19,
+    "local4": 20, "local5": 21, "local6": 22, "local7": 23,
+}
+
+
+def parse_address(address: str) -> Tuple[str, object]:
+    """``/dev/log`` -> ("unix", path); ``udp://h:514`` / ``tcp://h:601`` -> (scheme, (h, port))."""
+    if "://" not in address:
+        return "unix", address
+    scheme, _, rest = address.partition("://")
+    if scheme not in ("udp", "tcp"):
+        raise ValueError(f"unsupported syslog address {address!r}")
+    host, _, port = rest.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"syslog address needs host:port, got {address!r}")
+    return scheme, (host.strip("[]"), int(port))
+
+
+class SyslogSink:
+    """Sends alerts to syslog from a background thread.
+
+    ``submit()`` drops events below *min_severity* and queues the rest
+    (bounded by *queue_size*, oldest dropped first), so the daemon loop
+    only pays for a filter and a deque append.  The writer thread turns
+    each batch into records using a header cached per (severity, type) and
+    the event's cached JSON as MSG; the timestamp is taken once per batch.
+
+    One socket is kept open.  Datagram transports (unix, udp) send one
+    record per datagram; TCP joins a whole batch into a single
+    write using octet-counting framing (RFC 6587).  On a send error the
+    socket is reopened and the batch retried once from the first record
+    not fully sent; whatever is still unsent after that is counted in
+    ``failed`` and reconnects are spaced by *reconnect_delay*.  A datagram
+    too large for the transport (``EMSGSIZE``) is dropped on its own and
+    counted in ``failed``.
+    """
+
+    def __init__(self, address: str = "/dev/log", facility: str = "local0",
+                 min_severity: str = "medium", app_name: str = "lksm",
+                 hostname: Optional[str] = None, batch_size: int = 512,
+                 queue_size: int = 100000, reconnect_delay: float = 1.0):
+        self.transport, self.target = parse_address(address)
+        try:
+            self.facility = FACILITIES[facility]
+        except KeyError:
+            raise ValueError(f"unknown syslog facility {facility!r}") from None
+        self.accepts = severity_at_least(min_severity)
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.reconnect_delay = reconnect_delay
+        self._host = (hostname or socket.gethostname() or "-").split(".")[0]
+        self._app = app_name
+        self._headers: Dict[Tuple[str, str], Tuple[bytes, bytes]] = {}
+        self._sock: Optional[socket.socket] = None
+        self._stream = False
+        self._retry_at = 0.0
+        self._warned = False
+        self._warned_size = False
+
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._stop = False
+        self.sent = self.failed = self.dropped = self.connects = 0
+        self._thread = threading.Thread(target=self._run, daemon=True, name="lksm-syslog")
+        self._thread.start()
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional["SyslogSink"]:
+        """A sink for ``alerts.syslog`` (``true`` or a mapping), or None."""
+        alerts_cfg = config.get("alerts", {})
+        cfg = alerts_cfg.get("syslog", False)
+        if not alerts_cfg.get("enabled", False) or not cfg:
+            return None
+        if cfg is True:
+            cfg = {}
+        if not cfg.get("enabled", True):
+            return None
+        return cls(address=cfg.get("address", "/dev/log"),
+                   facility=cfg.get("facility", "local0"),
+                   min_severity=cfg.get("min_severity", "medium"),
+                   app_name=cfg.get("app_name", "lksm"),
+                   hostname=cfg.get("hostname"),
+                   batch_size=int(cfg.get("batch_size", 512)),
+                   queue_size=int(cfg.get("queue_size", 100000)),
+                   reconnect_delay=float(cfg.get("reconnect_delay", 1.0)))
+
+    def submit(self, events: List[LKSMEvent]) -> None:
+        accepts = self.accepts
+        batch = [ev for ev in events if accepts(ev)]
+        if not batch:
+            return
+        with self._cond:
+            self._queue.extend(batch)
+            overflow = len(self._queue) - self.queue_size
+            if overflow > 0:
+                for _ in range(overflow):
+                    self._queue.popleft()
+                self.dropped += overflow
+            self._cond.notify()
+
+    # ---- formatting ----
+
+    def _header(self, ev: LKSMEvent) -> Tuple[bytes, bytes]:
+        key = (ev.severity, ev.type)
+        header = self._headers.get(key)
+        if header is None:
+            pri = self.facility * 8 + _SYSLOG_SEVERITY.get(ev.severity, 6)
+            msgid = "".join(c for c in ev.type if 33 <= ord(c) <= 126)[:32] or "-"
+            header = self._headers[key] = (
+                b"<%d>1 " % pri,
+                f" {self._host} {self._app} {os.getpid()} {msgid} - ".encode())
+        return header
+
+    def format(self, events: List[LKSMEvent], now: Optional[float] = None) -> List[bytes]:
+        """RFC 5424 records for *events*, all stamped with *now*."""
+        if now is None:
+            now = time.time()
+        stamp = (time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now))
+                 + ".%06dZ" % int((now % 1) * 1e6)).encode()
+        header = self._header
+        out = []
+        for ev in events:
+            pri, rest = header(ev)
+            out.append(pri + stamp + rest + ev.to_json())
+        return out
+
+    # ---- transport ----
+
+    def _connect(self) -> socket.socket:
+        if self.transport == "unix":
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            try:
+                sock.connect(self.target)
+                self._stream = False
+            except OSError:
+                sock.close()
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(self.target)
+                self._stream = True
+        elif self.transport == "tcp":
+            sock = socket.create_connection(self.target)
+            self._stream = True
+        else:
+            host, port = self.target
+            family, _, _, _, addr = socket.getaddrinfo(host, port, type=socket.SOCK_DGRAM)[0]
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            sock.connect(addr)
+            self._stream = False
+        return sock
+
+    def _send(self, records: List[bytes], start: int) -> Tuple[int, Optional[OSError]]:
+        """Send ``records[start:]``.
+
+        Returns how many of *records* are done (sent, or dropped as
+        oversized) and the error that stopped the send, if any.
+        """
+        sock = self._sock
+        done = start
+        if self._stream:
+            if self.transport == "tcp":
+                frames = [b"%d %s" % (len(r), r) for r in records[start:]]
+            else:
+                frames = [r + b"\n" for r in records[start:]]
+            data = memoryview(b"".join(frames))
+            sent = 0
+            try:
+                while sent < len(data):
+                    sent += sock.send(data[sent:])
+            except OSError as exc:
+                # Records cut off mid-frame are resent whole on the next socket.
+                done += bisect_right(list(accumulate(len(f) for f in frames)), sent)
+                self.sent += done - start
+                return done, exc
+            self.sent += len(frames)
+            return len(records), None
+        send = sock.send
+        try:
+            for r in records[start:]:
+                try:
+                    send(r)
+                    self.sent += 1
+                except OSError as exc:
+                    if exc.errno != errno.EMSGSIZE:
+                        raise
+                    self.failed += 1
+                    if not self._warned_size:
+                        print(f"Warning: dropping {len(r)}-byte syslog record: {exc}")
+                        self._warned_size = True
+                done += 1
+        except OSError as exc:
+            return done, exc
+        return done, None
+
+    def _write(self, records: List[bytes]) -> None:
+        done = 0
+        for _ in range(2):
+            if self._sock is None:
+                if time.monotonic() < self._retry_at:
+                    break
+                try:
+                    self._sock = self._connect()
+                    self.connects += 1
+                    self._warned = False
+                except OSError as exc:
+                    if not self._warned:
+                        print(f"Warning: cannot reach syslog at {self.target}: {exc}")
+                        self._warned = True
+                    self._retry_at = time.monotonic() + self.reconnect_delay
+                    break
+            done, exc = self._send(records, done)
+            if exc is None:
+                return
+            self._sock.close()
+            self._sock = None
+        self.failed += len(records) - done
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._stop:
+                    self._cond.wait()
+                if not self._queue:
+                    break
+                n = min(len(self._queue), self.batch_size)
+                batch = [self._queue.popleft() for _ in range(n)]
+            self._write(self.format(batch))
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Send what is queued, then close the socket."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        return {"sent": self.sent, "failed": self.failed, "dropped": self.dropped,
+                "connects": self.connects, "queued": len(self._queue)}
@@ -0,0 +1,183 @@
+"""
+WebhookDispatcher — posts alert batches to ``alerts.webhooks`` endpoints.
+"""
+
+import http.client
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from python_tools.core.module_base import LKSMEvent
+from python_tools.core.severity import severity_at_least
+
+
+class _Endpoint:
+    """One webhook URL: its queue, worker threads and counters."""
+
+    def __init__(self, spec: dict, defaults: dict):
+        self.url = spec["url"]
+        parts = urlsplit(self.url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"unsupported webhook url {self.url!r}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+        opt = dict(defaults)
+        opt.update(spec)
+        self.accepts = severity_at_least(opt.get("min_severity", "medium"))
+        self.batch_size = int(opt.get("batch_size", 100))
+        self.linger = float(opt.get("linger", 0.05))
+        self.concurrency = int(opt.get("concurrency", 2))
+        self.max_retries = int(opt.get("max_retries", 3))
+        self.backoff = float(opt.get("backoff", 0.5))
+        self.timeout = float(opt.get("timeout", 5.0))
+        self.queue_size = int(opt.get("queue_size", 10000))
+        self.headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        self.headers.update(opt.get("headers") or {})
+
+        self.queue: deque = deque()
+        self.cond = threading.Condition()
+        self.sent = self.batches = self.failed = self.retries = self.dropped = 0
+        self.connections = 0
+
+    def connect(self) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        self.connections += 1
+        return cls(self.host, self.port, timeout=self.timeout)
+
+
+class WebhookDispatcher:
+    """Delivers alert events to webhooks without ever blocking the daemon.
+
+    ``submit()`` only filters (``min_severity``) and appends to a bounded
+    per-endpoint queue, dropping the oldest alerts when it is full.  Each
+    endpoint has ``concurrency`` worker threads, each holding one persistent
+    ``http.client`` connection, so at most that many requests are in flight
+    per URL.  A worker waits up to ``linger`` seconds to fill a batch of up
+    to ``batch_size`` events, POSTs them as one JSON document, and retries
+    failures (connection errors, 429 and 5xx) with exponential backoff and
+    jitter before giving the batch up.
+
+    Options can be set for all endpoints under ``alerts.webhook_defaults``
+    and overridden per entry in ``alerts.webhooks``.
+    """
+
+    def __init__(self, endpoints: List[dict], defaults: Optional[dict] = None):
+        self.endpoints = [_Endpoint(spec, defaults or {}) for spec in endpoints]
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        for ep in self.endpoints:
+            for i in range(ep.concurrency):
+                t = threading.Thread(target=self._worker, args=(ep,), daemon=True,
+                                     name=f"lksm-webhook-{ep.host}-{i}")
+                t.start()
+                self._threads.append(t)
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional["WebhookDispatcher"]:
+        """A dispatcher for the enabled ``alerts.webhooks``, or None."""
+        alerts_cfg = config.get("alerts", {})
+        if not alerts_cfg.get("enabled", False):
+            return None
+        hooks = [h for h in alerts_cfg.get("webhooks") or []
+                 if h.get("enabled", True) and h.get("url")]
+        if not hooks:
+            return None
+        return cls(hooks, alerts_cfg.get("webhook_defaults"))
+
+    def submit(self, events: List[LKSMEvent]) -> None:
+        for ep in self.endpoints:
+            batch = [ev for ev in events if ep.accepts(ev)]
+            if not batch:
+                continue
+            with ep.cond:
+                ep.queue.extend(batch)
+                overflow = len(ep.queue) - ep.queue_size
+                for _ in range(max(overflow, 0)):
+                    ep.queue.popleft()
+                if overflow > 0:
+                    ep.dropped += overflow
+                ep.cond.notify()
+
+    # ---- workers ----
+
+    def _take(self, ep: _Endpoint) -> List[LKSMEvent]:
+        with ep.cond:
+            while not ep.queue:
+                if self._stop.is_set():
+                    return []
+                ep.cond.wait(0.5)
+            if len(ep.queue) < ep.batch_size and not self._stop.is_set():
+                deadline = time.monotonic() + ep.linger
+                while len(ep.queue) < ep.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not ep.cond.wait(remaining):
+                        break
+            n = min(len(ep.queue), ep.batch_size)
+            return [ep.queue.popleft() for _ in range(n)]
+
+    def _worker(self, ep: _Endpoint) -> None:
+        conn = None
+        while True:
+            batch = self._take(ep)
+            if not batch:
+                break
+            body = (b'{"source": "lksm", "count": %d, "events": [' % len(batch)
+                    + b", ".join(ev.to_json() for ev in batch) + b"]}")
+            conn = self._deliver(ep, conn, body, len(batch))
+        if conn is not None:
+            conn.close()
+
+    def _deliver(self, ep: _Endpoint, conn, body: bytes, n: int):
+        for attempt in range(ep.max_retries + 1):
+            if attempt:
+                with ep.cond:
+                    ep.retries += 1
+                time.sleep(ep.backoff * (2 ** (attempt - 1)) * (0.5 + random.random()))
+            try:
+                if conn is None:
+                    conn = ep.connect()
+                conn.request("POST", ep.path, body=body, headers=ep.headers)
+                resp = conn.getresponse()
+                resp.read()
+                status = resp.status
+                if resp.will_close:
+                    conn.close()
+                    conn = None
+            except (OSError, http.client.HTTPException):
+                if conn is not None:
+                    conn.close()
+                conn = None
+                continue
+            if status < 300:
+                with ep.cond:
+                    ep.sent += n
+                    ep.batches += 1
+                return conn
+            if status != 429 and status < 500:
+                break                       # the endpoint rejected it; retrying won't help
+        with ep.cond:
+            ep.failed += 1
+        print(f"Warning: webhook {ep.url} failed, {n} alerts not delivered")
+        return conn
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop accepting work, give workers *timeout* seconds to drain."""
+        self._stop.set()
+        for ep in self.endpoints:
+            with ep.cond:
+                ep.cond.notify_all()
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(deadline - time.monotonic(), 0))
+
+    def stats(self) -> Dict[str, dict]:
+        return {ep.url: {"sent": ep.sent, "batches": ep.batches, "failed": ep.failed,
+                         "retries": ep.retries, "dropped": ep.dropped,
+                         "queued": len(ep.queue), "connections": ep.connections}
+                for ep in self.endpoints}
@@ -0,0 +1,164 @@
+"""
+Tests for the streaming log analyzer behind ``--mode analyze``.
+"""
+
+import io
+import json
+from collections import Counter
+
+import pytest
+
+from python_tools import main as lksm_main
+from python_tools.analysis.analyzer import (
+    Aggregates, EventFilter, Progress, analyze_files, analyze_lines, analyze_parallel,
+    expand_inputs, iter_range_lines, plan_shards,
+)
+from python_tools.core.coalesce import EventCoalescer
+from python_tools.core.module_base import LKSMEvent, ModuleRegistry
+from python_tools.output.json_logger import EventLogger
+
+
+def _sample_events(n=200):
+    events = []
+    for i in range(n):
+        if i % 10 == 0:
+            events.append(LKSMEvent(seq=i, ts=float(i), type="suspicious_probe",
+                                    data={"message": f"SUSPICIOUS #{i}"},
+                                    severity="high", source="kprobe_reader"))
+        else:
+            events.append(LKSMEvent(seq=i, ts=float(i), type="kprobe_registered",
+                                    data={"symbol": f"sym_{i % 3}"},
+                                    source="kprobe_reader" if i % 2 else "procfs"))
+    return events
+
+
+@pytest.fixture(params=["json", "gzip"])
+def log_dir(request, tmp_path):
+    out = tmp_path / "logs"
+    logger = EventLogger({"logging": {"output_dir": str(out), "format": request.param}})
+    events = _sample_events()
+    for start in range(0, len(events), 25):
+        logger.log_events(events[start:start + 25])
+    logger.close()
+    return out
+
+
+def test_expand_inputs_globs_and_skips_index(log_dir):
+    paths = expand_inputs([str(log_dir / "lksm_events_*")])
+    assert len(paths) == 1
+    assert not paths[0].endswith(".idx")
+    assert expand_inputs([str(log_dir / "nothing_*.jsonl")]) == []
+
+
+def test_aggregates_over_whole_log(log_dir):
+    agg = analyze_files(expand_inputs([str(log_dir / "*")]))
+    report = agg.report(top=2)
+    assert report["lines"] == 200
+    assert report["matched"] == 200
+    assert report["by_type"] == {"kprobe_registered": 180, "suspicious_probe": 20}
+    assert report["by_severity"] == {"info": 180, "high": 20}
+    expected = Counter(ev.data["symbol"] for ev in _sample_events()
+                       if ev.type == "kprobe_registered")
+    assert report["top_symbols"] == sorted(expected.items(), key=lambda kv: (-kv[1], kv[0]))[:2]
+    assert [e["seq"] for e in report["suspicious_timeline"]] == list(range(0, 200, 10))
+    assert (report["first_ts"], report["last_ts"]) == (0.0, 199.0)
+
+
+def test_filters_by_time_type_severity_and_source(log_dir):
+    paths = expand_inputs([str(log_dir / "*")])
+    flt = EventFilter(start_ts=50, end_ts=99, types=["kprobe_registered"], sources=["procfs"])
+    report = analyze_files(paths, flt).report()
+    assert report["by_type"] == {"kprobe_registered": 20}
+    assert report["by_source"] == {"procfs": 20}
+
+    report = analyze_files(paths, EventFilter(severities=["high"])).report()
+    assert report["matched"] == 20
+
+
+def test_timeline_keeps_latest_and_merge_matches_single_pass():
+    lines = [ev.to_json() for ev in _sample_events()]
+    flt = EventFilter()
+    whole = analyze_lines(lines, flt, Aggregates(timeline_limit=5))
+
+    parts = [analyze_lines(lines[i:i + 37], flt, Aggregates(timeline_limit=5))
+             for i in range(0, len(lines), 37)]
+    merged = Aggregates(timeline_limit=5)
+    for part in reversed(parts):
+        merged.merge(part)
+
+    assert merged.report() == whole.report()
+    assert [e["seq"] for e in whole.report()["suspicious_timeline"]] == [150, 160, 170, 180, 190]
+
+
+def test_coalesced_log_counts_every_event(tmp_path):
+    out = tmp_path / "logs"
+    logger = EventLogger({"logging": {"output_dir": str(out)}})
+    coalescer, registry = EventCoalescer(window=10.0), ModuleRegistry()
+    events = registry.assign_seq(_sample_events())
+    ready, summaries = coalescer.process(events, now=0.0)
+    summaries += coalescer.flush()
+    logger.log_events(ready + registry.assign_seq(summaries))
+    logger.close()
+    assert len(ready) + len(summaries) < 200           # bursts were folded
+
+    report = analyze_files(expand_inputs([str(out / "*")])).report()
+    assert report["matched"] == 200
+    assert report["by_type"] == {"kprobe_registered": 180, "suspicious_probe": 20}
+    assert report["by_severity"] == {"info": 180, "high": 20}
+    assert report["by_source"] == dict(Counter(ev.source for ev in _sample_events()))
+    expected = Counter(ev.data["symbol"] for ev in _sample_events()
+                       if ev.type == "kprobe_registered")
+    assert dict(report["top_symbols"]) == dict(expected)
+
+
+def test_bad_and_blank_lines_are_counted_not_fatal():
+    lines = [b'{"type": "x", "ts": 1}\n', b"\n", b"{oops\n", b"null\n", b"123\n", b"[1]\n"]
+    agg = analyze_lines(lines, EventFilter(), Aggregates())
+    assert (agg.lines, agg.bad_lines, agg.matched) == (5, 4, 1)
+
+
+def test_progress_readout(log_dir):
+    paths = expand_inputs([str(log_dir / "*")])
+    out = io.StringIO()
+    analyze_files(paths, progress=Progress(1, stream=out))
+    assert "MB/s" in out.getvalue() and "lines/s" in out.getvalue()
+
+
+def test_analyze_cli(log_dir, monkeypatch, capsys):
+    monkeypatch.setattr("sys.argv", [
+        "lksm", "--mode", "analyze", "--config", "/nonexistent.yml", "--quiet", "--json",
+        "--file", str(log_dir / "lksm_events_*"), "--type", "suspicious_probe",
+    ])
+    assert lksm_main.main() == 0
+    out = capsys.readouterr().out
+    report = json.loads(out[out.index("{"):])
+    assert report["matched"] == 20
+
+
+# --------------- Parallel analysis ---------------
+
+def test_byte_ranges_partition_lines_exactly(tmp_path):
+    path = tmp_path / "x.jsonl"
+    lines = [f'{{"seq": {i}, "pad": "{"y" * (i % 13)}"}}\n'.encode() for i in range(500)]
+    path.write_bytes(b"".join(lines))
+    size = path.stat().st_size
+    for shard_bytes in (1, 7, 64, 1000, size):
+        got = []
+        for p, start, end in plan_shards([str(path)], shard_bytes):
+            got.extend(iter_range_lines(p, start, end))
+        assert got == lines, shard_bytes
+
+
+@pytest.mark.parametrize("shard_bytes", [333, 4096])
+def test_parallel_matches_single_process(log_dir, shard_bytes):
+    # Add a second plain file so shards span several inputs.
+    extra = log_dir / "lksm_events_2026-01-01.jsonl"
+    extra.write_bytes(b"".join(ev.to_json() + b"\n" for ev in _sample_events(150)) + b"{bad\n")
+    paths = expand_inputs([str(log_dir / "lksm_events_*")])
+    flt = EventFilter(start_ts=20, severities=["info", "high"])
+
+    single = analyze_files(paths, flt, timeline_limit=7).report()
+    parallel = analyze_parallel(paths, flt, timeline_limit=7, workers=2,
+                                shard_bytes=shard_bytes).report()
+    assert parallel == single
+    assert single["bad_lines"] == 1
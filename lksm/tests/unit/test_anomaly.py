@@ -0,0 +1,86 @@
+"""
+Tests for streaming anomaly detection over kprobe registrations.
+"""
+
+from python_tools.analysis.anomaly import AnomalyDetector, CountMinSketch
+from python_tools.core.module_base import LKSMEvent
+
+CFG = {"min_rate": 5, "sigma": 3.0, "symbol_window": 10.0, "symbol_burst": 20,
+       "learning_period": 5.0, "sketch_width": 256, "sketch_depth": 4}
+
+
+def _reg(ts, symbol="vfs_read", seq=0):
+    return LKSMEvent(seq=seq, ts=ts, type="kprobe_registered", data={"symbol": symbol})
+
+
+def _kinds(alerts):
+    return [a.data["kind"] for a in alerts]
+
+
+def test_sketch_never_undercounts():
+    cms = CountMinSketch(width=64, depth=3)
+    for i in range(500):
+        cms.add(f"sym{i % 50}")
+    assert all(cms.estimate(f"sym{i}") >= 10 for i in range(50))
+    assert cms.add("sym0", 5) >= 15
+    cms.clear()
+    assert cms.estimate("sym0") == 0
+    assert cms.add("sym0") == 1
+
+
+def test_sketch_indexes_do_not_depend_on_hash_seed():
+    # Fixed for every process, unlike hash(), which PYTHONHASHSEED salts.
+    assert CountMinSketch(width=1000, depth=3)._indexes("vfs_read") == [986, 203, 420]
+
+
+def test_steady_stream_is_quiet():
+    det = AnomalyDetector(CFG)
+    events = [_reg(t + k / 4, f"s{k}") for t in range(30) for k in range(4)]
+    assert det.observe(events) == []
+    assert det.stats()["distinct_symbols"] == 4
+    assert det.observed == 120
+
+
+def test_global_rate_spike_alerts_then_escalates():
+    det = AnomalyDetector(CFG)
+    det.observe([_reg(t + k / 4, f"s{k}") for t in range(30) for k in range(4)])
+    burst = [_reg(30.0 + k / 1000, f"s{k % 4}") for k in range(60)]
+    alerts = det.observe(burst)
+    assert _kinds(alerts) == ["global_rate", "global_rate"]
+    # Fires as soon as the bucket crosses the threshold, not at its end,
+    # then once more when it passes twice the threshold.
+    assert [a.data["count"] for a in alerts] == [6, 11]
+    assert [a.severity for a in alerts] == ["medium", "high"]
+    assert alerts[0].type == "anomaly"
+    assert alerts[0].source == "anomaly"
+    # The next quiet bucket does not re-alert.
+    assert det.observe([_reg(31.5, "s0")]) == []
+
+
+def test_new_symbol_after_learning_period():
+    det = AnomalyDetector(CFG)
+    assert det.observe([_reg(0.0, "vfs_read"), _reg(1.0, "do_sys_open")]) == []
+    alerts = det.observe([_reg(10.0, "kallsyms_lookup_name", seq=7), _reg(11.0, "vfs_read")])
+    assert _kinds(alerts) == ["new_symbol"]
+    assert alerts[0].data["symbol"] == "kallsyms_lookup_name"
+    assert alerts[0].data["event_seq"] == 7
+    assert alerts[0].severity == "medium"
+    assert det.observe([_reg(12.0, "kallsyms_lookup_name")]) == []
+
+
+def test_symbol_burst_alerts_once_per_window():
+    det = AnomalyDetector(dict(CFG, min_rate=1000))
+    alerts = det.observe([_reg(k / 100, "commit_creds") for k in range(50)])
+    assert _kinds(alerts) == ["symbol_rate"]
+    assert alerts[0].data["symbol"] == "commit_creds"
+    # A new window re-arms the check.
+    alerts = det.observe([_reg(20.0 + k / 100, "commit_creds") for k in range(20)])
+    assert _kinds(alerts) == ["symbol_rate"]
+    assert det.stats()["alerts"]["symbol_rate"] == 2
+
+
+def test_other_event_types_are_ignored():
+    det = AnomalyDetector(CFG)
+    ev = LKSMEvent(seq=1, ts=100.0, type="suspicious_probe", data={"symbol": "x"})
+    assert det.observe([ev]) == []
+    assert det.observed == 0
@@ -0,0 +1,91 @@
+"""
+Tests for persisting the kprobe reader position across restarts.
+"""
+
+import io
+import json
+
+import pytest
+
+from python_tools.core import checkpoint
+from python_tools.core.checkpoint import ReaderCheckpoint
+from python_tools.core.modules.kprobe_reader import KprobeReaderModule
+
+
+def _kmsg(first, count):
+    return b"".join(
+        b"1,%d,%d,-;[PHOTON RING] Kprobe registered for symbol: s%d\n" % (seq, seq * 1000, seq)
+        for seq in range(first, first + count)
+    )
+
+
+@pytest.fixture()
+def boot_id(tmp_path, monkeypatch):
+    path = tmp_path / "boot_id"
+    path.write_text("boot-a\n")
+    monkeypatch.setattr(checkpoint, "_BOOT_ID_PATH", str(path))
+    return path
+
+
+def _config(path, every=100):
+    return {"communication": {"checkpoint_path": str(path), "checkpoint_every": every,
+                              "checkpoint_interval": 3600}}
+
+
+def _run(ring, config):
+    reader = KprobeReaderModule(source=io.BytesIO(ring))
+    reader.start(config)
+    events = reader.poll()
+    reader.stop()
+    return [ev.data["symbol"] for ev in events]
+
+
+def test_restart_resumes_after_checkpoint(tmp_path, boot_id):
+    ckpt = tmp_path / "state" / "reader.checkpoint"
+    assert _run(_kmsg(0, 5), _config(ckpt)) == ["s0", "s1", "s2", "s3", "s4"]
+    assert json.loads(ckpt.read_text()) == {"last_seq": 4, "last_ts": 0.004, "boot_id": "boot-a"}
+    # Same kernel ring plus two new records: only the new ones come back.
+    assert _run(_kmsg(0, 7), _config(ckpt)) == ["s5", "s6"]
+
+
+def test_reboot_discards_checkpoint(tmp_path, boot_id, capsys):
+    ckpt = tmp_path / "reader.checkpoint"
+    _run(_kmsg(0, 5), _config(ckpt))
+    boot_id.write_text("boot-b\n")
+    assert _run(_kmsg(0, 2), _config(ckpt)) == ["s0", "s1"]
+    assert "previous boot" in capsys.readouterr().out
+
+
+def test_timestamp_regression_without_boot_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoint, "_BOOT_ID_PATH", str(tmp_path / "missing"))
+    ckpt = tmp_path / "reader.checkpoint"
+    ckpt.write_text(json.dumps({"last_seq": 50, "last_ts": 1e12, "boot_id": None}))
+    assert ReaderCheckpoint(str(ckpt)).load() is None
+    ckpt.write_text(json.dumps({"last_seq": 50, "last_ts": 0.5, "boot_id": None}))
+    assert ReaderCheckpoint(str(ckpt)).load()["last_seq"] == 50
+
+
+def test_writes_are_batched(tmp_path, boot_id):
+    ckpt = ReaderCheckpoint(str(tmp_path / "c"), every=10, interval=3600)
+    for seq in range(9):
+        ckpt.record(seq, float(seq), 1)
+    assert ckpt.saves == 0
+    ckpt.record(9, 9.0, 1)
+    assert ckpt.saves == 1
+    ckpt.record(9, 0.0, 0)             # idle poll: nothing new to write
+    ckpt.save()
+    assert ckpt.saves == 1
+
+
+def test_interval_flushes_idle_reader(tmp_path, boot_id):
+    ckpt = ReaderCheckpoint(str(tmp_path / "c"), every=1000, interval=0)
+    ckpt.record(3, 3.0, 1)
+    assert ckpt.saves == 1
+    assert not (tmp_path / "c.tmp").exists()
+
+
+def test_corrupt_checkpoint_is_ignored(tmp_path, boot_id, capsys):
+    ckpt = tmp_path / "reader.checkpoint"
+    ckpt.write_text("{not json")
+    assert _run(_kmsg(0, 2), _config(ckpt)) == ["s0", "s1"]
+    assert "unreadable checkpoint" in capsys.readouterr().out
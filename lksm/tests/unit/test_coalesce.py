@@ -0,0 +1,92 @@
+"""
+Tests for burst coalescing of repeated events.
+"""
+
+from python_tools.core.coalesce import EventCoalescer
+from python_tools.core.module_base import LKSMEvent, ModuleRegistry
+
+
+def _reg(seq, ts, symbol="vfs_read", severity="info", source="kprobe_reader"):
+    return LKSMEvent(seq=seq, ts=ts, type="kprobe_registered", data={"symbol": symbol},
+                     severity=severity, source=source)
+
+
+def test_burst_becomes_first_event_plus_summary():
+    co = EventCoalescer(window=1.0)
+    burst = [_reg(i, 10.0 + i / 100) for i in range(500)]
+    ready, closed = co.process(burst, now=0.0)
+    assert ready == [burst[0]] and ready[0].seq == 0
+    assert closed == []
+    assert co.absorbed == 499
+
+    ready, closed = co.process([], now=1.0)
+    assert len(closed) == 1
+    summary = closed[0]
+    assert summary.data == {"symbol": "vfs_read", "count": 499, "first_seq": 1,
+                            "last_seq": 499, "first_ts": 10.01, "last_ts": 14.99}
+    assert summary.ts == 14.99 and summary.seq == 0
+
+
+def test_single_event_passes_through_with_its_seq():
+    co = EventCoalescer(window=1.0)
+    original = _reg(7, 5.0)
+    ready, _ = co.process([original], now=0.0)
+    assert ready == [original] and ready[0].seq == 7
+    _, closed = co.process([], now=2.0)
+    assert closed == []
+    assert "count" not in original.data
+
+
+def test_keys_separate_type_source_and_field():
+    co = EventCoalescer(window=1.0)
+    co.process([_reg(1, 1.0, "a"), _reg(2, 1.0, "b"), _reg(3, 1.0, "a", source="procfs_reader"),
+                _reg(4, 1.1, "a")], now=0.0)
+    closed = co.flush()
+    assert [(ev.source, ev.data["symbol"], ev.data["count"]) for ev in closed] == [
+        ("kprobe_reader", "a", 1)]
+    assert (closed[0].data["first_seq"], closed[0].data["last_seq"]) == (4, 4)
+
+
+def test_high_severity_and_unkeyed_types_are_never_held():
+    co = EventCoalescer(window=10.0)
+    urgent = _reg(1, 1.0, "kallsyms_lookup_name", severity="high")
+    other = LKSMEvent(seq=2, ts=1.0, type="rule_match", data={"rule": "x"})
+    ready, closed = co.process([urgent, urgent, other], now=0.0)
+    assert ready == [urgent, urgent, other]
+    assert len(co) == 0
+
+
+def test_group_count_is_bounded():
+    co = EventCoalescer(window=60.0, max_groups=10)
+    events = [_reg(i, 1.0, f"s{i}") for i in range(25)] + [_reg(25, 2.0, "s24")]
+    ready, closed = co.process(events, now=0.0)
+    assert len(co) == 10
+    assert len(ready) == 25 and closed == []      # evicted groups had no repeats
+    assert [ev.data["count"] for ev in co.flush()] == [1]
+
+
+def test_seqs_stay_monotonic_and_summaries_are_new_events():
+    reg = ModuleRegistry()
+    co = EventCoalescer(window=1.0)
+    batch = reg.assign_seq([_reg(0, 1.0), _reg(0, 1.1), _reg(0, 1.2)])
+    ready, _ = co.process(batch, now=0.0)
+    assert [ev.seq for ev in ready] == [0]
+    urgent = reg.assign_seq([_reg(0, 2.0, severity="critical")])
+    ready, closed = co.process(urgent, now=1.5)
+    out = ready + reg.assign_seq(closed)
+    assert [ev.seq for ev in out] == [3, 4]
+    assert out[1].data["count"] == 2
+    assert (out[1].data["first_seq"], out[1].data["last_seq"]) == (1, 2)
+
+
+def test_reconfigure_applies_new_settings_to_open_groups():
+    co = EventCoalescer(window=60.0, max_groups=10)
+    co.process([_reg(i, 1.0, f"s{i % 4}") for i in range(8)], now=0.0)
+    co.reconfigure({"window": 1.0, "max_groups": 2, "passthrough": ["info"]})
+    assert (co.window, co.max_groups) == (1.0, 2)
+    ready, _ = co.process([_reg(8, 2.0, "s0")], now=0.5)
+    assert [ev.seq for ev in ready] == [8]          # info is now passed through
+    ready, closed = co.process([_reg(9, 2.0, "new", severity="medium")], now=0.5)
+    assert len(co) == 2 and len(closed) == 3        # shrunk to the new bound
+    _, closed = co.process([], now=2.0)
+    assert len(co) == 0 and len(closed) == 1        # expired under the new window
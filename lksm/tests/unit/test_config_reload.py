@@ -0,0 +1,152 @@
+"""
+Tests for hot-reloading the config and rules files.
+"""
+
+import os
+import time
+
+import pytest
+import yaml
+
+from python_tools.config.reloader import ConfigReloader
+
+RULES_V1 = """\
+rules:
+  - name: "shadow"
+    type: file
+    condition:
+      path_matches: [/etc/shadow]
+    severity: medium
+"""
+
+RULES_V2 = RULES_V1 + """\
+  - name: "passwd"
+    type: file
+    condition:
+      path_matches: [/etc/passwd]
+    severity: high
+"""
+
+
+def _touch(path, text):
+    """Rewrite *path* and push its mtime forward so the change is visible."""
+    before = path.stat().st_mtime_ns if path.exists() else 0
+    path.write_text(text)
+    os.utime(path, ns=(before + 10**9, before + 10**9))
+
+
+@pytest.fixture()
+def files(tmp_path):
+    rules = tmp_path / "rules.yml"
+    rules.write_text(RULES_V1)
+    config = tmp_path / "config.yml"
+    config.write_text(f"analysis:\n  enable_rules: true\n  rules_file: {rules}\n")
+    return config, rules
+
+
+def _reloader(config_path):
+    return ConfigReloader(str(config_path), yaml.safe_load(config_path.read_text()), interval=0)
+
+
+def test_no_change_no_reload(files):
+    config, _ = files
+    r = _reloader(config)
+    assert r.check() is False
+    assert r.take() is None
+
+
+def test_rules_edit_produces_new_engine(files):
+    config, rules = files
+    r = _reloader(config)
+    _touch(rules, RULES_V2)
+    assert r.check() is True
+    new_config, engine = r.take()
+    assert [rule.name for rule in engine.rules] == ["shadow", "passwd"]
+    assert new_config["analysis"]["enable_rules"] is True
+    assert r.take() is None          # consumed
+
+
+def test_config_edit_can_disable_rules(files):
+    config, _ = files
+    r = _reloader(config)
+    _touch(config, "analysis:\n  enable_rules: false\ncommunication:\n  poll_interval: 0.5\n")
+    assert r.check() is True
+    new_config, engine = r.take()
+    assert engine is None
+    assert new_config["communication"]["poll_interval"] == 0.5
+
+
+@pytest.mark.parametrize("bad", [
+    "rules:\n  - name: x\n    condition: [1, 2\n",                       # YAML error
+    "rules:\n  - name: x\n    condition:\n      a_not_in: nolist\n",      # compile error
+    "- just\n- a list\n",                                                  # not a mapping
+    "rules: {name: x}\n",                                                   # rules not a list
+    "lists: [1, 2]\nrules: []\n",                                           # lists not a mapping
+])
+def test_bad_rules_rejected_and_not_retried(files, bad, capsys):
+    config, rules = files
+    r = _reloader(config)
+    _touch(rules, bad)
+    assert r.check() is False
+    assert r.take() is None
+    assert r.rejected == 1
+    assert "rejected" in capsys.readouterr().out
+
+    assert r.check() is False        # unchanged since rejection
+    assert r.rejected == 1
+
+    _touch(rules, RULES_V2)          # fixed file is picked up
+    assert r.check() is True
+
+
+@pytest.mark.parametrize("bad", [
+    "- just\n- a list\n",
+    "analysis: [1, 2]\n",
+    "analysis:\n  enable_rules: true\ncommunication: 5\n",
+])
+def test_bad_config_rejected(files, bad):
+    config, _ = files
+    r = _reloader(config)
+    _touch(config, bad)
+    assert r.check() is False
+    assert r.rejected == 1
+
+
+def test_background_thread_survives_malformed_files(files):
+    config, rules = files
+    r = ConfigReloader(str(config), yaml.safe_load(config.read_text()), interval=0.01)
+    r.start()
+    try:
+        _touch(config, "analysis: [1, 2]\n")
+        for _ in range(200):
+            if r.rejected:
+                break
+            time.sleep(0.01)
+        assert r.rejected == 1
+        _touch(config, f"analysis:\n  enable_rules: true\n  rules_file: {rules}\n")
+        _touch(rules, RULES_V2)
+        for _ in range(200):
+            update = r.take()
+            if update:
+                break
+            time.sleep(0.01)
+        assert update is not None and len(update[1].rules) == 2
+    finally:
+        r.stop()
+
+
+def test_background_thread_detects_change(files):
+    config, rules = files
+    r = ConfigReloader(str(config), yaml.safe_load(config.read_text()), interval=0.01)
+    r.start()
+    try:
+        _touch(rules, RULES_V2)
+        for _ in range(200):
+            update = r.take()
+            if update:
+                break
+            time.sleep(0.01)
+        assert update is not None
+        assert len(update[1].rules) == 2
+    finally:
+        r.stop()
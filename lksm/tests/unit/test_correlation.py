@@ -0,0 +1,103 @@
+"""
+Tests for the event correlation window engine.
+"""
+
+from pathlib import Path
+
+import pytest
+import yaml
+
+from python_tools.analysis.correlation import CorrelationEngine
+from python_tools.core.module_base import LKSMEvent
+
+DEFAULT_CONFIG = Path(__file__).resolve().parents[2] / "config" / "default_config.yml"
+
+
+def _ev(seq, ts, ev_type, source="kprobe_reader", **data):
+    return LKSMEvent(seq=seq, ts=ts, type=ev_type, data=data, source=source)
+
+
+@pytest.fixture()
+def engine():
+    config = yaml.safe_load(DEFAULT_CONFIG.read_text())
+    return CorrelationEngine(config["analysis"]["correlation"])
+
+
+def test_kallsyms_probe_then_module_load(engine):
+    alerts = engine.observe([
+        _ev(1, 100.0, "kprobe_registered", symbol="kallsyms_lookup_name"),
+        _ev(2, 101.0, "kprobe_registered", symbol="vfs_read"),
+        _ev(3, 104.5, "module", module_name="rootkit"),
+    ])
+    assert len(alerts) == 1
+    alert = alerts[0]
+    assert alert.type == "correlation"
+    assert alert.severity == "critical"
+    assert alert.data["event_seqs"] == [1, 3]
+    assert alert.data["span"] == 4.5
+    # The prefix was consumed: a second load does not re-alert.
+    assert engine.observe([_ev(4, 105.0, "module", module_name="other")]) == []
+
+
+def test_sequence_outside_window_is_ignored(engine):
+    engine.observe([_ev(1, 100.0, "kprobe_registered", symbol="kallsyms_lookup_name")])
+    assert engine.observe([_ev(2, 111.0, "module", module_name="rootkit")]) == []
+
+
+def test_order_matters(engine):
+    alerts = engine.observe([
+        _ev(1, 100.0, "module", module_name="rootkit"),
+        _ev(2, 101.0, "kprobe_registered", symbol="kallsyms_lookup_name"),
+    ])
+    assert alerts == []
+
+
+def test_key_joins_steps_and_multi_step_chains():
+    engine = CorrelationEngine({"sequences": [{
+        "name": "probe, open, exec",
+        "key": "pid",
+        "within": 5,
+        "steps": [
+            {"type": "kprobe_registered", "symbol": ["do_sys_open", "vfs_read"]},
+            {"type": "file", "path_matches": "/etc/*"},
+            {"type": "process"},
+        ],
+    }]})
+    alerts = engine.observe([
+        _ev(1, 0.0, "kprobe_registered", symbol="vfs_read", pid=10),
+        _ev(2, 0.5, "kprobe_registered", symbol="vfs_read", pid=20),
+        _ev(3, 1.0, "file", path="/etc/shadow", pid=20),
+        _ev(4, 1.5, "process", pid=10),          # pid 10 never opened a file
+        _ev(5, 2.0, "process", pid=20),
+        _ev(6, 2.5, "file", path="/tmp/x", pid=10),
+    ])
+    assert [a.data["event_seqs"] for a in alerts] == [[2, 3, 5]]
+    assert alerts[0].data["pid"] == 20
+    assert engine.stats()["hits"] == {"probe, open, exec": 1}
+
+
+def test_window_is_bounded_by_count_and_time():
+    engine = CorrelationEngine({"max_entries": 100, "window_seconds": 5, "sequences": [{
+        "name": "a then b", "key": "symbol", "within": 5,
+        "steps": [{"type": "a"}, {"type": "b"}],
+    }]})
+    engine.observe([_ev(i, i / 1000, "a", symbol=f"s{i}") for i in range(1000)])
+    assert len(engine) <= 100
+    assert engine.evicted == 900
+    # Oldest keys were evicted, the newest are still indexed.
+    assert engine.observe([_ev(2000, 1.0, "b", symbol="s0")]) == []
+    assert len(engine.observe([_ev(2001, 1.0, "b", symbol="s999")])) == 1
+
+    engine.observe([_ev(3000, 100.0, "a", symbol="late")])
+    assert len(engine) == 1
+
+
+@pytest.mark.parametrize("spec", [
+    {"sequences": [{"name": "x", "steps": [{"type": "a"}]}]},
+    {"sequences": [{"steps": [{"type": "a"}, {"type": "b"}]}]},
+    {"sequences": [{"name": "x", "steps": [{"type": "a"}, {"symbol": "b"}]}]},
+    {"sequences": [{"name": "x", "steps": [{"type": "a"}, {"type": "b"}]}] * 2},
+])
+def test_invalid_sequences_are_rejected(spec):
+    with pytest.raises(ValueError):
+        CorrelationEngine(spec)
@@ -0,0 +1,251 @@
+"""
+Tests for the daemon poll loop in main.py.
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from python_tools.core.module_base import (
+    AsyncMonitorModule, LKSMEvent, ModuleRegistry, MonitorModule,
+)
+from python_tools.main import _restart_settings, async_poll_cycles, poll_cycles
+
+
+class PipeModule(MonitorModule):
+    """Emits one event per byte written to its pipe; exposes the read end."""
+
+    def __init__(self):
+        self.r, self.w = os.pipe()
+        os.set_blocking(self.r, False)
+
+    @property
+    def name(self):
+        return "pipe"
+
+    def start(self, config):
+        pass
+
+    def stop(self):
+        os.close(self.r)
+        os.close(self.w)
+
+    def fileno(self):
+        return self.r
+
+    def poll(self):
+        try:
+            data = os.read(self.r, 4096)
+        except BlockingIOError:
+            return []
+        return [LKSMEvent(seq=0, ts=0.0, type="pipe", data={"b": b}, source="pipe")
+                for b in data]
+
+
+class CountingModule(MonitorModule):
+    def __init__(self):
+        self.polls = 0
+
+    @property
+    def name(self):
+        return "counting"
+
+    def start(self, config):
+        pass
+
+    def stop(self):
+        pass
+
+    def poll(self):
+        self.polls += 1
+        return []
+
+
+class InactiveModule(CountingModule):
+    @property
+    def name(self):
+        return "inactive"
+
+    @property
+    def active(self):
+        return False
+
+
+@pytest.fixture()
+def pipe_module():
+    m = PipeModule()
+    yield m
+    m.stop()
+
+
+def test_ready_fd_is_drained_without_waiting_for_interval(pipe_module):
+    reg = ModuleRegistry()
+    reg.register(pipe_module)
+    reg.register(CountingModule())
+    cycles = poll_cycles(reg, interval=10.0)
+
+    next(cycles)                      # first cycle polls the interval module
+    threading.Timer(0.05, os.write, (pipe_module.w, b"ab")).start()
+    t0 = time.monotonic()
+    events = next(cycles)
+    assert time.monotonic() - t0 < 2.0
+    assert [ev.type for ev in events] == ["pipe", "pipe"]
+    assert [ev.seq for ev in events] == [0, 1]
+    cycles.close()
+
+
+def test_modules_without_fd_keep_interval_polling(pipe_module):
+    counting = CountingModule()
+    reg = ModuleRegistry()
+    reg.register(pipe_module)
+    reg.register(counting)
+    cycles = poll_cycles(reg, interval=0.01)
+    for _ in range(5):
+        next(cycles)
+    assert counting.polls >= 3
+    cycles.close()
+
+
+def test_inactive_modules_do_not_wake_the_loop(pipe_module):
+    inactive = InactiveModule()
+    reg = ModuleRegistry()
+    reg.register(pipe_module)
+    reg.register(inactive)
+    cycles = poll_cycles(reg, interval=0.001)
+    threading.Timer(0.05, os.write, (pipe_module.w, b"a")).start()
+    assert [ev.type for ev in next(cycles)] == ["pipe"]     # no interval cycles first
+    assert inactive.polls == 0
+    cycles.close()
+
+
+def test_stop_event_ends_loop(pipe_module):
+    reg = ModuleRegistry()
+    reg.register(pipe_module)
+    stop = threading.Event()
+    stop.set()
+    assert list(poll_cycles(reg, interval=0.01, stop_event=stop)) == []
+
+
+def test_fallback_to_sleep_loop_when_not_event_driven():
+    counting = CountingModule()
+    reg = ModuleRegistry()
+    reg.register(counting)
+    cycles = poll_cycles(reg, interval=0.0, event_driven=False)
+    next(cycles)
+    next(cycles)
+    assert counting.polls == 2
+    cycles.close()
+
+
+# --------------- asyncio runner ---------------
+
+class TickerModule(AsyncMonitorModule):
+    def __init__(self, count):
+        self.count = count
+
+    @property
+    def name(self):
+        return "ticker"
+
+    def start(self, config):
+        pass
+
+    def stop(self):
+        pass
+
+    async def stream(self):
+        for i in range(self.count):
+            await asyncio.sleep(0.001)
+            yield LKSMEvent(seq=0, ts=float(i), type="tick", data={"i": i}, source="ticker")
+
+
+class BrokenStream(TickerModule):
+    async def stream(self):
+        raise RuntimeError("source went away")
+        yield  # pragma: no cover
+
+
+class LegacyModule(CountingModule):
+    @property
+    def name(self):
+        return "legacy"
+
+    def poll(self):
+        super().poll()
+        return [LKSMEvent(seq=0, ts=0.0, type="legacy", data={}, source="legacy")]
+
+
+async def _collect(registry, want, interval=0.01):
+    got = []
+    cycles = async_poll_cycles(registry, interval)
+    try:
+        async for batch in cycles:
+            got.extend(batch)
+            if len([ev for ev in got if ev.type == "tick"]) >= want:
+                break
+    finally:
+        await cycles.aclose()
+    return got
+
+
+def test_async_runner_drives_async_and_legacy_modules():
+    reg = ModuleRegistry()
+    reg.register(TickerModule(5))
+    reg.register(LegacyModule())
+    events = asyncio.run(_collect(reg, want=5))
+
+    ticks = [ev.data["i"] for ev in events if ev.type == "tick"]
+    assert ticks == [0, 1, 2, 3, 4]
+    assert any(ev.type == "legacy" for ev in events)
+    assert [ev.seq for ev in events] == list(range(len(events)))
+
+
+def test_async_runner_wakes_legacy_module_on_fd(pipe_module):
+    reg = ModuleRegistry()
+    reg.register(pipe_module)
+
+    async def scenario():
+        asyncio.get_running_loop().call_later(0.02, os.write, pipe_module.w, b"xy")
+        cycles = async_poll_cycles(reg, interval=10.0)
+        batch = await cycles.__anext__()
+        await cycles.aclose()
+        return batch
+
+    events = asyncio.run(asyncio.wait_for(scenario(), 2.0))
+    assert [ev.type for ev in events] == ["pipe", "pipe"]
+
+
+def test_async_runner_surfaces_module_failure():
+    reg = ModuleRegistry()
+    reg.register(BrokenStream(1))
+    reg.register(LegacyModule())
+
+    async def scenario():
+        async for _ in async_poll_cycles(reg, interval=0.01):
+            pass
+
+    with pytest.raises(RuntimeError, match="source went away"):
+        asyncio.run(asyncio.wait_for(scenario(), 2.0))
+
+
+def test_async_module_is_inert_under_sync_poll():
+    reg = ModuleRegistry()
+    reg.register(TickerModule(3))
+    assert reg.poll_all() == []
+
+
+def test_reload_reports_settings_that_need_a_restart():
+    old = {"analysis": {"enable_rules": True, "anomaly": {"sigma": 3.0}},
+           "communication": {"coalesce": {"window": 1.0}, "poll_interval": 0.1},
+           "alerts": {"enabled": False}}
+    new = {"analysis": {"enable_rules": False, "anomaly": {"sigma": 4.0},
+                        "correlation": {"sequences": []}},
+           "communication": {"coalesce": {"window": 2.0}, "poll_interval": 0.1},
+           "alerts": {"enabled": True}, "metrics": {"enabled": True}}
+    assert _restart_settings(old, new) == ["alerts.enabled", "analysis.anomaly",
+                                           "metrics.enabled"]
+    assert _restart_settings({}, {"analysis": {"correlation": {}}}) == []
+    assert _restart_settings(old, old) == []
@@ -0,0 +1,123 @@
+"""
+Tests for the shared-memory event ring.
+"""
+
+import json
+import multiprocessing
+
+import pytest
+
+from python_tools.core.module_base import LKSMEvent
+from python_tools.output.event_ring import RingReader, RingWriter
+
+
+def _events(seqs, pad=""):
+    return [LKSMEvent(seq=i, ts=float(i), type="t", data={"pad": pad}) for i in seqs]
+
+
+def _seqs(records):
+    return [json.loads(r)["seq"] for r in records]
+
+
+@pytest.fixture()
+def ring_path(tmp_path):
+    return tmp_path / "events.ring"
+
+
+def test_readers_have_independent_cursors(ring_path):
+    writer = RingWriter(ring_path, "64KB")
+    live = RingReader(ring_path)
+    writer.publish(_events(range(3)))
+    late = RingReader(ring_path)                  # joins at the live end
+    replay = RingReader(ring_path, from_start=True)
+    writer.publish(_events(range(3, 5)))
+
+    assert _seqs(live.read(max_records=2)) == [0, 1]
+    assert _seqs(live.read()) == [2, 3, 4]
+    assert _seqs(late.read()) == [3, 4]
+    assert _seqs(replay.read()) == [0, 1, 2, 3, 4]
+    assert live.read() == []
+    assert live.lag == 0
+
+
+def test_wrap_around_keeps_records_intact(ring_path):
+    writer = RingWriter(ring_path, 4096)
+    reader = RingReader(ring_path)
+    seen = []
+    for batch in range(40):
+        writer.publish(_events(range(batch * 5, batch * 5 + 5), pad="x" * (batch % 7 * 20)))
+        seen.extend(_seqs(reader.read()))
+    assert seen == list(range(200))
+    assert reader.overruns == 0
+
+
+def test_slow_reader_overrun_skips_to_oldest_intact(ring_path):
+    writer = RingWriter(ring_path, 4096)
+    reader = RingReader(ring_path)
+    writer.publish(_events(range(200), pad="y" * 40))
+    got = _seqs(reader.read())
+    assert reader.overruns == 1
+    assert got == list(range(got[0], 200))       # contiguous, newest retained
+    assert 0 < got[0] < 200
+
+
+def test_overrun_during_copy_discards_the_copy(ring_path):
+    writer = RingWriter(ring_path, 4096)
+    reader = RingReader(ring_path)
+    writer.publish(_events(range(10), pad="a" * 40))
+    real_tail, calls = reader._tail, []
+
+    def tail_after_overwrite():
+        calls.append(1)
+        if len(calls) == 2:
+            # Between the copy and the re-check, the writer laps the reader
+            # with records of a different size, so old length fields lie.
+            writer.publish(_events(range(100, 160), pad="b" * 7))
+        return real_tail()
+
+    reader._tail = tail_after_overwrite
+    got = _seqs(reader.read())
+    assert reader.overruns == 1
+    assert got and got == list(range(got[0], 160)) and got[0] > 100
+
+
+def test_writer_restart_resyncs_readers(ring_path):
+    writer = RingWriter(ring_path, "64KB")
+    reader = RingReader(ring_path)
+    writer.publish(_events(range(10)))
+    assert len(reader.read()) == 10
+    writer.close()
+
+    writer = RingWriter(ring_path, "64KB")
+    writer.publish(_events([100, 101]))
+    assert _seqs(reader.read()) == [100, 101]
+
+
+def test_oversized_event_is_skipped(ring_path):
+    writer = RingWriter(ring_path, 1024)
+    reader = RingReader(ring_path)
+    writer.publish(_events([1], pad="z" * 2000) + _events([2]))
+    assert writer.oversized == 1
+    assert _seqs(reader.read()) == [2]
+
+
+def test_rejects_foreign_file(tmp_path):
+    path = tmp_path / "not-a-ring"
+    path.write_bytes(b"\0" * 128)
+    with pytest.raises(ValueError):
+        RingReader(path)
+
+
+def _child_read(path, queue):
+    reader = RingReader(path, from_start=True)
+    queue.put(_seqs(reader.read()))
+
+
+def test_reader_in_another_process(ring_path):
+    writer = RingWriter(ring_path, "64KB")
+    writer.publish(_events(range(5)))
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_child_read, args=(str(ring_path), queue))
+    proc.start()
+    assert queue.get(timeout=10) == [0, 1, 2, 3, 4]
+    proc.join(10)
@@ -0,0 +1,119 @@
+"""
+Tests for the daemon -> dashboard event socket.
+"""
+
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from python_tools.core.module_base import LKSMEvent
+from python_tools.output import dashboard
+from python_tools.output.event_socket import EventPublisher, EventSubscriber
+
+
+def _events(seqs, pad=""):
+    return [LKSMEvent(seq=i, ts=float(i), type="t", data={"pad": pad}, severity="high")
+            for i in seqs]
+
+
+def _wait(pred, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not pred():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture()
+def sock_path(tmp_path):
+    return str(tmp_path / "events.sock")
+
+
+def test_subscriber_receives_published_batches(sock_path):
+    received = []
+    lock = threading.Lock()
+
+    def on_lines(lines):
+        with lock:
+            received.extend(lines)
+
+    sub = EventSubscriber(sock_path, on_lines)
+    sub.start()                       # before the publisher exists
+    pub = EventPublisher(sock_path)
+    try:
+        assert _wait(lambda: (pub.publish([]), pub.subscribers)[1] == 1)
+        pub.publish(_events(range(3)))
+        pub.publish(_events(range(3, 5)))
+        assert _wait(lambda: len(received) == 5)
+        assert [json.loads(line)["seq"] for line in received] == [0, 1, 2, 3, 4]
+    finally:
+        sub.stop()
+        pub.close()
+
+
+def test_subscriber_feeds_dashboard_buffer(sock_path):
+    dashboard.configure(500)
+    with dashboard._lock:
+        dashboard._events.clear()
+    pub = EventPublisher(sock_path)
+    sub = EventSubscriber(sock_path, dashboard.push_json)
+    sub.start()
+    try:
+        assert _wait(lambda: (pub.publish([]), pub.subscribers)[1] == 1)
+        pub.publish(_events([7, 8]))
+        assert _wait(lambda: len(dashboard._events) == 2)
+        app = dashboard.create_app()
+        with app.test_client() as client:
+            body = client.get("/api/events?severity=high&since=7").json
+        assert [ev["seq"] for ev in body] == [8]
+    finally:
+        sub.stop()
+        pub.close()
+        with dashboard._lock:
+            dashboard._events.clear()
+
+
+def test_new_subscriber_gets_backlog_and_resets(sock_path):
+    dashboard.configure(500)
+    dashboard.push_json([b'{"seq": 99, "type": "stale", "severity": "info"}'])
+    pub = EventPublisher(sock_path, backlog=3)
+    pub.publish(_events(range(5)))    # nobody listening yet
+    sub = EventSubscriber(sock_path, dashboard.push_json, on_connect=dashboard.clear_events)
+    sub.start()
+    try:
+        assert _wait(lambda: (pub.publish([]), pub.subscribers)[1] == 1)
+        assert _wait(lambda: len(dashboard._events) == 3)
+        assert [e[0] for e in dashboard._events] == [2, 3, 4]
+    finally:
+        sub.stop()
+        pub.close()
+        dashboard.clear_events()
+
+
+def test_stuck_subscriber_is_dropped_without_blocking(sock_path):
+    pub = EventPublisher(sock_path, max_pending=64 * 1024)
+    stuck = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stuck.connect(sock_path)          # never reads
+    try:
+        batch = _events(range(100), pad="x" * 1000)
+        t0 = time.monotonic()
+        for _ in range(50):
+            pub.publish(batch)
+            if pub.dropped_clients:
+                break
+        assert pub.dropped_clients == 1
+        assert pub.subscribers == 0
+        assert time.monotonic() - t0 < 2
+    finally:
+        stuck.close()
+        pub.close()
+
+
+def test_publisher_replaces_stale_socket_file(sock_path):
+    EventPublisher(sock_path)._sock.close()   # leaves the path behind
+    pub = EventPublisher(sock_path)
+    pub.close()
@@ -0,0 +1,348 @@
+"""
+Tests for EventLogger buffering, rotation and durability settings.
+"""
+
+import gzip
+import json
+import threading
+import time
+
+import pytest
+
+from python_tools.core.module_base import LKSMEvent
+from python_tools.output import json_logger
+from python_tools.output.json_logger import (
+    EventLogger, QueuedEventLogger, _parse_size, iter_segment_lines, read_segment_index,
+)
+
+
+def _events(start, n):
+    return [LKSMEvent(seq=i, ts=float(i), type="t", data={"pad": "x" * 40}, source="unit")
+            for i in range(start, start + n)]
+
+
+def _seqs(log_dir):
+    out = []
+    for path in sorted(log_dir.glob("*.jsonl")):
+        out.extend(json.loads(line)["seq"] for line in path.read_text().splitlines())
+    return out
+
+
+@pytest.fixture()
+def day(monkeypatch):
+    current = {"day": "2026-02-10"}
+    monkeypatch.setattr(json_logger, "_today", lambda: current["day"])
+    return current
+
+
+def test_parse_size():
+    assert _parse_size("100MB") == 100 * 1024 * 1024
+    assert _parse_size("64KB") == 64 * 1024
+    assert _parse_size("2g") == 2 << 30
+    assert _parse_size(4096) == 4096
+    assert _parse_size(None) == 0
+    with pytest.raises(ValueError):
+        _parse_size("lots")
+
+
+def test_buffers_until_byte_threshold(tmp_path, day):
+    log_dir = tmp_path / "logs"
+    logger = EventLogger({"logging": {"output_dir": str(log_dir),
+                                      "flush_interval": 3600, "flush_bytes": "1KB"}})
+    logger.log_events(_events(0, 2))
+    assert _seqs(log_dir) == []          # still buffered
+    logger.log_events(_events(2, 20))
+    assert _seqs(log_dir) == list(range(22))
+    logger.close()
+
+
+def test_close_flushes_pending(tmp_path, day):
+    log_dir = tmp_path / "logs"
+    logger = EventLogger({"logging": {"output_dir": str(log_dir),
+                                      "flush_interval": 3600, "flush_bytes": "1MB"}})
+    logger.log_events(_events(0, 3))
+    logger.close()
+    assert _seqs(log_dir) == [0, 1, 2]
+
+
+def test_rotates_on_size_without_splitting_batches(tmp_path, day):
+    log_dir = tmp_path / "logs"
+    logger = EventLogger({"logging": {"output_dir": str(log_dir), "max_file_size": 1000}})
+    for start in range(0, 30, 3):
+        logger.log_events(_events(start, 3))
+    logger.close()
+
+    files = sorted(log_dir.glob("*.jsonl"))
+    assert "lksm_events_2026-02-10.jsonl" in {f.name for f in files}
+    assert len(files) > 1
+    assert all(f.stat().st_size <= 1000 for f in files)
+    assert sorted(_seqs(log_dir)) == list(range(30))
+
+
+def test_rotates_on_date_change(tmp_path, day):
+    log_dir = tmp_path / "logs"
+    logger = EventLogger({"logging": {"output_dir": str(log_dir),
+                                      "flush_interval": 3600, "flush_bytes": "1MB"}})
+    logger.log_events(_events(0, 2))
+    day["day"] = "2026-02-11"
+    logger.log_events(_events(2, 2))
+    logger.close()
+
+    first = (log_dir / "lksm_events_2026-02-10.jsonl").read_text().splitlines()
+    second = (log_dir / "lksm_events_2026-02-11.jsonl").read_text().splitlines()
+    assert [json.loads(l)["seq"] for l in first] == [0, 1]
+    assert [json.loads(l)["seq"] for l in second] == [2, 3]
+
+
+def test_restart_resumes_newest_part(tmp_path, day):
+    log_dir = tmp_path / "logs"
+    cfg = {"logging": {"output_dir": str(log_dir), "max_file_size": 1000}}
+    logger = EventLogger(cfg)
+    for start in range(0, 12, 3):
+        logger.log_events(_events(start, 3))
+    logger.close()
+    parts_before = sorted(p.name for p in log_dir.glob("*.jsonl"))
+
+    logger = EventLogger(cfg)
+    logger.log_events(_events(12, 1))
+    logger.close()
+    parts_after = sorted(p.name for p in log_dir.glob("*.jsonl"))
+    assert len(parts_after) - len(parts_before) <= 1
+    assert sorted(_seqs(log_dir)) == list(range(13))
+
+
+@pytest.mark.parametrize("durability", ["none", "flush", "fsync"])
+def test_durability_modes_write_everything(tmp_path, day, durability):
+    log_dir = tmp_path / "logs"
+    logger = EventLogger({"logging": {"output_dir": str(log_dir), "durability": durability}})
+    logger.log_events(_events(0, 5))
+    logger.close()
+    assert _seqs(log_dir) == list(range(5))
+
+
+def test_rejects_unknown_durability(tmp_path):
+    with pytest.raises(ValueError):
+        EventLogger({"logging": {"output_dir": str(tmp_path), "durability": "sometimes"}})
+
+
+# --------------- Compressed segments ---------------
+
+def _gz_logger(log_dir, **extra):
+    cfg = {"output_dir": str(log_dir), "format": "gzip"}
+    cfg.update(extra)
+    return EventLogger({"logging": cfg})
+
+
+def test_gzip_segment_is_plain_gzip_with_one_block_per_flush(tmp_path, day):
+    log_dir = tmp_path / "logs"
+    logger = _gz_logger(log_dir)
+    for start in range(0, 30, 10):
+        logger.log_events(_events(start, 10))
+    logger.close()
+
+    seg = log_dir / "lksm_events_2026-02-10.jsonl.gz"
+    lines = gzip.decompress(seg.read_bytes()).splitlines()
+    assert [json.loads(l)["seq"] for l in lines] == list(range(30))
+
+    index = read_segment_index(seg)
+    assert [(e["first_seq"], e["last_seq"], e["count"]) for e in index] == \
+        [(0, 9, 10), (10, 19, 10), (20, 29, 10)]
+    assert index[1]["offset"] == index[0]["offset"] + index[0]["length"]
+
+
+def test_iter_segment_lines_skips_blocks_outside_window(tmp_path, day):
+    log_dir = tmp_path / "logs"
+    logger = _gz_logger(log_dir)
+    for start in range(0, 100, 10):
+        logger.log_events(_events(start, 10))    # ts == seq
+    logger.close()
+    seg = log_dir / "lksm_events_2026-02-10.jsonl.gz"
+
+    # Corrupt a block outside the window: it must never be decompressed.
+    index = read_segment_index(seg)
+    data = bytearray(seg.read_bytes())
+    data[index[0]["offset"] + 12] ^= 0xFF
+    seg.write_bytes(bytes(data))
+
+    seqs = [json.loads(l)["seq"] for l in iter_segment_lines(seg, start_ts=42, end_ts=57)]
+    assert seqs == list(range(40, 60))
+
+
+def test_iter_segment_lines_scans_unindexed_tail(tmp_path, day):
+    log_dir = tmp_path / "logs"
+    logger = _gz_logger(log_dir)
+    for start in range(0, 30, 10):
+        logger.log_events(_events(start, 10))
+    logger.close()
+    seg = log_dir / "lksm_events_2026-02-10.jsonl.gz"
+    idx = tmp_path / "logs" / "lksm_events_2026-02-10.jsonl.gz.idx"
+    idx.write_bytes(idx.read_bytes().splitlines(keepends=True)[0] + b'{"offs')
+
+    seqs = [json.loads(l)["seq"] for l in iter_segment_lines(seg)]
+    assert seqs == list(range(30))
+
+
+def test_orphan_block_before_a_restart_is_still_read(tmp_path, day):
+    log_dir = tmp_path / "logs"
+    logger = _gz_logger(log_dir)
+    logger.log_events(_events(0, 1))
+    logger.log_events(_events(1, 1))
+    logger.close()
+    idx = log_dir / "lksm_events_2026-02-10.jsonl.gz.idx"
+    idx.write_bytes(idx.read_bytes().splitlines(keepends=True)[0])   # lose seq 1's line
+
+    logger = _gz_logger(log_dir)
+    logger.log_events(_events(2, 1))
+    logger.close()
+    seg = log_dir / "lksm_events_2026-02-10.jsonl.gz"
+    seqs = [json.loads(l)["seq"] for l in iter_segment_lines(seg)]
+    assert seqs == [0, 1, 2]
+    # The orphan has no ts range, so a window never skips it.
+    seqs = [json.loads(l)["seq"] for l in iter_segment_lines(seg, start_ts=2.0)]
+    assert seqs == [1, 2]
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1 << 16])
+def test_iter_members_reads_in_chunks(tmp_path, chunk_size):
+    blob = b"".join(gzip.compress(b"block%d\n" % i * 50, mtime=0) for i in range(5))
+    path = tmp_path / "seg.gz"
+    path.write_bytes(b"junk" + blob + gzip.compress(b"torn\n")[:-6])
+    with open(path, "rb") as f:
+        members = list(json_logger._iter_members(f, 4, chunk_size=chunk_size))
+        assert members == [b"block%d\n" % i * 50 for i in range(5)]
+        second = 4 + len(gzip.compress(b"block0\n" * 50, mtime=0))
+        third = second + len(gzip.compress(b"block1\n" * 50, mtime=0))
+        members = list(json_logger._iter_members(f, second, third, chunk_size=chunk_size))
+        assert members == [b"block1\n" * 50]
+
+
+def test_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        EventLogger({"logging": {"output_dir": str(tmp_path), "format": "xml"}})
+
+
+# --------------- QueuedEventLogger ---------------
+
+class GatedLogger:
+    """Stand-in EventLogger whose writes block until the test opens the gate."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.entered = threading.Event()
+        self.seqs = []
+        self.closed = False
+
+    def log_events(self, events):
+        self.entered.set()
+        self.gate.wait(5)
+        self.seqs.extend(ev.seq for ev in events)
+
+    def flush_if_due(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def _stalled_writer(policy, queue_size=4):
+    inner = GatedLogger()
+    q = QueuedEventLogger({"logging": {"queue_size": queue_size, "backpressure": policy}},
+                          logger=inner)
+    q.log_events(_events(0, 1))     # writer picks this up and stalls on the gate
+    assert inner.entered.wait(2)
+    return q, inner
+
+
+def test_queued_logger_drains_on_close(tmp_path, day):
+    log_dir = tmp_path / "logs"
+    q = QueuedEventLogger({"logging": {"output_dir": str(log_dir)}})
+    for start in range(0, 50, 5):
+        q.log_events(_events(start, 5))
+    q.close()
+    assert _seqs(log_dir) == list(range(50))
+    assert q.queue_depth == 0 and q.dropped == 0 and q.written == 50
+
+
+def test_queued_logger_drop_counts_incoming():
+    q, inner = _stalled_writer("drop")
+    q.log_events(_events(1, 6))
+    assert q.queue_depth == 4
+    assert q.dropped == 2
+    inner.gate.set()
+    q.close()
+    assert inner.seqs == [0, 1, 2, 3, 4]
+    assert inner.closed
+
+
+def test_queued_logger_drop_oldest_keeps_newest():
+    q, inner = _stalled_writer("drop_oldest")
+    q.log_events(_events(1, 6))
+    assert q.dropped == 2
+    inner.gate.set()
+    q.close()
+    assert inner.seqs == [0, 3, 4, 5, 6]
+
+
+def test_queued_logger_block_waits_for_writer():
+    q, inner = _stalled_writer("block")
+    done = threading.Event()
+
+    def producer():
+        q.log_events(_events(1, 6))
+        done.set()
+
+    threading.Thread(target=producer).start()
+    time.sleep(0.05)
+    assert not done.is_set()            # queue full, producer is blocked
+    inner.gate.set()
+    assert done.wait(2)
+    q.close()
+    assert inner.seqs == list(range(7))
+    assert q.dropped == 0
+
+
+class FailingLogger(GatedLogger):
+    """Raises *exc* on the first batch, then writes normally."""
+
+    def __init__(self, exc):
+        super().__init__()
+        self.gate.set()
+        self.exc = exc
+
+    def log_events(self, events):
+        if self.exc is not None:
+            exc, self.exc = self.exc, None
+            raise exc
+        super().log_events(events)
+
+
+def test_queued_logger_survives_unexpected_errors(capsys):
+    inner = FailingLogger(TypeError("not serializable"))
+    q = QueuedEventLogger({}, logger=inner)
+    q.log_events(_events(0, 2))
+    time.sleep(0.1)
+    q.log_events(_events(2, 2))
+    q.close()
+    assert inner.seqs == [2, 3]
+    assert q.errors == 1 and q.written == 2
+    assert "not serializable" in capsys.readouterr().out
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_queued_logger_does_not_block_on_dead_writer():
+    inner = FailingLogger(SystemExit())
+    q = QueuedEventLogger({"logging": {"queue_size": 2, "backpressure": "block"}},
+                          logger=inner)
+    q.log_events(_events(0, 1))
+    q._thread.join(2)
+    assert not q._thread.is_alive()
+    done = threading.Event()
+
+    def producer():
+        q.log_events(_events(1, 5))
+        done.set()
+
+    threading.Thread(target=producer, daemon=True).start()
+    assert done.wait(2)
+    assert q.dropped == 5
+    q.close()
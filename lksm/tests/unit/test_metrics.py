@@ -0,0 +1,161 @@
+"""
+Tests for pipeline metrics: histograms, Prometheus rendering, instrumentation.
+"""
+
+import time
+
+import pytest
+
+from python_tools.core.metrics import Histogram, MetricsRegistry, StageTimer
+from python_tools.core.module_base import LKSMEvent, ModuleRegistry, MonitorModule
+from python_tools.output.dashboard import create_app
+
+
+class _Module(MonitorModule):
+    def __init__(self, name, n_events=1, delay=0.0):
+        self._name, self.n_events, self.delay = name, n_events, delay
+
+    @property
+    def name(self):
+        return self._name
+
+    def start(self, config):
+        pass
+
+    def stop(self):
+        pass
+
+    def poll(self):
+        if self.delay:
+            time.sleep(self.delay)
+        return [LKSMEvent(seq=0, ts=0.0, type="t", data={}) for _ in range(self.n_events)]
+
+
+def test_histogram_buckets_are_upper_inclusive():
+    h = Histogram((0.1, 1.0))
+    for v in (0.05, 0.1, 0.5, 1.0, 7.0):
+        h.observe(v)
+    assert h.counts == [2, 2, 1]
+    assert h.count == 5 and h.sum == pytest.approx(8.65)
+    assert h.quantile(0.5) == 1.0 and h.quantile(1.0) == float("inf")
+
+
+def test_render_is_prometheus_text():
+    m = MetricsRegistry()
+    h = m.histogram("lksm_stage_seconds", "Stage time.", buckets=(0.1, 1.0), stage="log")
+    h.observe(0.05)
+    h.observe(3.0)
+    m.counter("lksm_events_total", "Events.", module='we"ird').inc(4)
+    m.gauge("lksm_queue_depth", "Depth.", fn=lambda: 7)
+    assert m.render().splitlines() == [
+        "# HELP lksm_stage_seconds Stage time.",
+        "# TYPE lksm_stage_seconds histogram",
+        'lksm_stage_seconds_bucket{stage="log",le="0.1"} 1',
+        'lksm_stage_seconds_bucket{stage="log",le="1.0"} 1',
+        'lksm_stage_seconds_bucket{stage="log",le="+Inf"} 2',
+        'lksm_stage_seconds_sum{stage="log"} 3.05',
+        'lksm_stage_seconds_count{stage="log"} 2',
+        "# HELP lksm_events_total Events.",
+        "# TYPE lksm_events_total counter",
+        'lksm_events_total{module="we\\"ird"} 4',
+        "# HELP lksm_queue_depth Depth.",
+        "# TYPE lksm_queue_depth gauge",
+        "lksm_queue_depth 7",
+    ]
+
+
+def test_same_name_and_labels_share_a_series():
+    m = MetricsRegistry()
+    assert m.counter("c", "C.", a="1") is m.counter("c", "C.", a="1")
+    assert m.counter("c", "C.", a="1") is not m.counter("c", "C.", a="2")
+    with pytest.raises(ValueError):
+        m.histogram("c", "C.")
+
+
+def test_render_tolerates_series_created_meanwhile():
+    m = MetricsRegistry()
+    made = []
+
+    def late_series():
+        # Stands in for a module thread registering a series mid-render.
+        made.append(m.counter("lksm_late_total", "Late.", n=str(len(made))))
+        made.append(m.counter(f"lksm_late{len(made)}_total", "Late."))
+        return 1
+
+    m.counter("lksm_late_total", "Late.", n="first")
+    m.gauge("lksm_g", "G.", fn=late_series)
+    assert "lksm_g 1" in m.render()
+    assert m.snapshot()["lksm_g"] == 1
+    assert len(made) == 4
+
+
+def test_registry_times_poll_all_and_each_module():
+    m = MetricsRegistry()
+    reg = ModuleRegistry(metrics=m)
+    reg.register(_Module("a", n_events=2))
+    reg.register(_Module("b", n_events=0, delay=0.002))
+    for _ in range(3):
+        reg.poll_all()
+    snap = m.snapshot()
+    assert snap["lksm_poll_all_seconds"]["count"] == 3
+    assert snap['lksm_module_poll_seconds{module="b"}']["count"] == 3
+    assert snap['lksm_module_poll_seconds{module="b"}']["mean"] >= 0.002
+    assert snap['lksm_module_events_total{module="a"}'] == 6
+    assert snap['lksm_module_events_total{module="b"}'] == 0
+
+
+def test_concurrent_missed_deadline_is_counted():
+    m = MetricsRegistry()
+    reg = ModuleRegistry(concurrent=True, poll_timeout=0.01, metrics=m)
+    reg.register(_Module("slow", delay=0.2))
+    reg.poll_all()
+    assert m.snapshot()['lksm_module_missed_deadlines_total{module="slow"}'] == 1
+    reg.stop_all()
+
+
+def test_registry_without_metrics_is_unchanged():
+    reg = ModuleRegistry()
+    reg.register(_Module("a", n_events=2))
+    assert [ev.seq for ev in reg.poll_all()] == [0, 1]
+
+
+def test_stage_timer_and_dump(tmp_path):
+    m = MetricsRegistry()
+    StageTimer(m, "log").record(0.003, 10)
+    path = tmp_path / "metrics" / "lksm.prom"
+    m.write(str(path))
+    text = path.read_text()
+    assert 'lksm_stage_events_total{stage="log"} 10' in text
+    assert 'lksm_stage_seconds_bucket{stage="log",le="0.0025"} 0' in text
+    assert 'lksm_stage_seconds_bucket{stage="log",le="0.005"} 1' in text
+
+
+def test_metrics_endpoint_serves_registry_and_dump(tmp_path):
+    m = MetricsRegistry()
+    m.counter("lksm_cycles_total", "Cycles.").inc(2)
+    dump = tmp_path / "daemon.prom"
+    dump.write_text("# TYPE lksm_poll_all_seconds histogram\n")
+    client = create_app(metrics=m, metrics_file=str(dump)).test_client()
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.content_type.startswith("text/plain; version=0.0.4")
+    assert "lksm_cycles_total 2" in resp.get_data(as_text=True)
+    assert "lksm_poll_all_seconds histogram" in resp.get_data(as_text=True)
+
+    assert create_app().test_client().get("/metrics").status_code == 404
+    missing = create_app(metrics_file=str(tmp_path / "none")).test_client().get("/metrics")
+    assert missing.status_code == 200 and missing.get_data() == b""
+
+
+def test_concurrent_polls_are_timed_on_worker_threads():
+    m = MetricsRegistry()
+    reg = ModuleRegistry(concurrent=True, poll_timeout=2.0, metrics=m)
+    for i in range(4):
+        reg.register(_Module(f"m{i}", n_events=1))
+    for _ in range(25):
+        reg.poll_all()
+    snap = m.snapshot()
+    assert all(snap[f'lksm_module_events_total{{module="m{i}"}}'] == 25 for i in range(4))
+    assert all(snap[f'lksm_module_poll_seconds{{module="m{i}"}}']["count"] == 25
+               for i in range(4))
+    reg.stop_all()
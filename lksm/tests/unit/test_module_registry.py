@@ -2,16 +2,50 @@
 Tests for ModuleRegistry, KprobeReaderModule, dashboard, and JSON logger.
 """
 
+import io
 import json
+import os
+import threading
+import time
+
 import pytest
-from unittest.mock import patch, MagicMock
 
 from python_tools.core.module_base import LKSMEvent, ModuleRegistry, MonitorModule
-from python_tools.core.modules.kprobe_reader import KprobeReaderModule, _parse_message
-from python_tools.output.dashboard import create_app, push_events, _events, _lock
+from python_tools.core.modules.kprobe_reader import (
+    KprobeReaderModule, _parse_message, parse_dmesg_lines, parse_kmsg_records,
+)
+from python_tools.output import dashboard
+from python_tools.output.dashboard import create_app, push_events
 from python_tools.output.json_logger import EventLogger
 
 
+# --------------- Event model tests ---------------
+
+def test_event_to_dict_and_json_round_trip():
+    ev = LKSMEvent(seq=3, ts=1.5, type="t", data={"k": [1, 2]}, severity="high", source="s")
+    assert ev.to_dict() == {
+        "seq": 3, "ts": 1.5, "type": "t", "data": {"k": [1, 2]},
+        "severity": "high", "source": "s",
+    }
+    assert json.loads(ev.to_json()) == ev.to_dict()
+
+
+def test_event_json_is_cached_until_seq_changes():
+    ev = LKSMEvent(seq=0, ts=1.0, type="t", data={})
+    first = ev.to_json()
+    assert ev.to_json() is first
+    ev.seq = 7
+    assert json.loads(ev.to_json())["seq"] == 7
+
+
+def test_event_is_slotted_and_comparable():
+    ev = LKSMEvent(seq=0, ts=1.0, type="t", data={"a": 1})
+    assert not hasattr(ev, "__dict__")
+    assert ev == LKSMEvent(seq=0, ts=1.0, type="t", data={"a": 1})
+    assert ev != LKSMEvent(seq=1, ts=1.0, type="t", data={"a": 1})
+    assert ev.severity == "info" and ev.source == "unknown"
+
+
 # --------------- Registry tests ---------------
 
 class FakeModule(MonitorModule):
@@ -50,6 +84,62 @@ def test_poll_assigns_sequential_ids():
     assert second[0].seq == 1
 
 
+class SlowModule(MonitorModule):
+    """Blocks in poll() until the test releases it."""
+
+    def __init__(self, name="slow"):
+        self._name = name
+        self.release = threading.Event()
+
+    @property
+    def name(self):
+        return self._name
+
+    def start(self, config):
+        pass
+
+    def stop(self):
+        self.release.set()
+
+    def poll(self):
+        self.release.wait(5)
+        self.release.clear()
+        return [LKSMEvent(seq=0, ts=2.0, type="slow", data={}, source=self._name)]
+
+
+def test_concurrent_poll_merges_in_registration_order():
+    reg = ModuleRegistry(concurrent=True, poll_timeout=2.0)
+    slow = SlowModule()
+    reg.register(slow)
+    reg.register(FakeModule())
+    slow.release.set()
+    events = reg.poll_all()
+    assert [ev.source for ev in events] == ["slow", "fake"]
+    assert [ev.seq for ev in events] == [0, 1]
+    assert reg.missed_deadlines == []
+    reg.stop_all()
+
+
+def test_concurrent_poll_skips_module_past_deadline():
+    reg = ModuleRegistry(concurrent=True, poll_timeout=0.05)
+    slow = SlowModule()
+    reg.register(slow)
+    reg.register(FakeModule())
+
+    first = reg.poll_all()
+    assert [ev.source for ev in first] == ["fake"]
+    assert reg.missed_deadlines == ["slow"]
+
+    # The in-flight poll finishes later; its events land in a later cycle.
+    slow.release.set()
+    time.sleep(0.05)
+    second = reg.poll_all()
+    assert [ev.source for ev in second] == ["slow", "fake"]
+    assert [ev.seq for ev in first + second] == [0, 1, 2]
+    assert reg.missed_deadlines == []
+    reg.stop_all()
+
+
 # --------------- KprobeReader parse tests ---------------
 
 def test_parse_kprobe_registered():
@@ -72,7 +162,11 @@ def test_parse_generic():
     assert etype == "photon_ring_generic"
 
 
-# --------------- KprobeReader dmesg integration ---------------
+def test_parse_suspicious_takes_priority_over_generic_text():
+    sev, etype, data = _parse_message("probe on kallsyms_lookup_name: SUSPICIOUS")
+    assert etype == "suspicious_probe"
+    assert data == {"message": "probe on kallsyms_lookup_name: SUSPICIOUS"}
+
 
 FAKE_DMESG = """\
 kern  :info  : [  120.001234] [PHOTON RING] Kprobe registered for symbol: do_init_module
@@ -81,48 +175,91 @@ kern  :info  : [  130.000000] some unrelated line
 """
 
 
-@patch("python_tools.core.modules.kprobe_reader.subprocess.run")
-def test_kprobe_reader_poll(mock_run):
-    mock_run.return_value = MagicMock(stdout=FAKE_DMESG)
+@pytest.mark.parametrize("batch", [
+    FAKE_DMESG,
+    FAKE_DMESG.encode(),
+    FAKE_DMESG.splitlines(),
+    [line.encode() for line in FAKE_DMESG.splitlines()],
+])
+def test_parse_dmesg_lines_accepts_any_batch_shape(batch):
+    events = parse_dmesg_lines(batch)
+    assert [ev.type for ev in events] == ["kprobe_registered", "suspicious_probe"]
+    assert events[0].ts == 120.001234
+    assert events[0].data == {"symbol": "do_init_module"}
 
-    reader = KprobeReaderModule()
+
+def test_parse_kmsg_records_batch_and_cursor():
+    blob = (
+        b"6,1,1000000,-;unrelated\n"
+        b"1,2,2000000,-;[PHOTON RING] Kprobe registered for symbol: a\n"
+        b"1,3,3000000,-;[PHOTON RING] Kprobe registered for symbol: b\n"
+    )
+    events, last = parse_kmsg_records(blob)
+    assert [ev.data["symbol"] for ev in events] == ["a", "b"]
+    assert last == 3
+
+    events, last = parse_kmsg_records(blob.splitlines(), after_seq=2)
+    assert [ev.data["symbol"] for ev in events] == ["b"]
+    assert last == 3
+
+
+# --------------- KprobeReader /dev/kmsg integration ---------------
+
+FAKE_KMSG = (
+    b"1,500,120001234,-;[PHOTON RING] Kprobe registered for symbol: do_init_module\n"
+    b" SUBSYSTEM=kprobe\n"
+    b"1,501,120002345,-;[PHOTON RING] SUSPICIOUS *** kallsyms_lookup_name probe detected!\n"
+    b"6,502,130000000,-;some unrelated line\n"
+)
+
+
+class GrowingSource(io.BytesIO):
+    """BytesIO that lets a test append records after the reader has drained it."""
+
+    def append(self, data: bytes) -> None:
+        pos = self.tell()
+        self.seek(0, io.SEEK_END)
+        self.write(data)
+        self.seek(pos)
+
+
+def test_kprobe_reader_poll():
+    reader = KprobeReaderModule(source=io.BytesIO(FAKE_KMSG))
     reader.start({})
 
     events = reader.poll()
     assert len(events) == 2
     assert events[0].type == "kprobe_registered"
     assert events[0].data["symbol"] == "do_init_module"
+    assert events[0].ts == pytest.approx(120.001234)
     assert events[1].type == "suspicious_probe"
     assert events[1].severity == "high"
 
 
-@patch("python_tools.core.modules.kprobe_reader.subprocess.run")
-def test_kprobe_reader_deduplicates(mock_run):
-    mock_run.return_value = MagicMock(stdout=FAKE_DMESG)
-
-    reader = KprobeReaderModule()
+def test_kprobe_reader_reads_only_new_records():
+    src = GrowingSource(FAKE_KMSG)
+    reader = KprobeReaderModule(source=src)
     reader.start({})
 
     first = reader.poll()
     assert len(first) == 2
 
-    # Same dmesg output → no new events
-    second = reader.poll()
-    assert len(second) == 0
+    # Nothing appended → no new events
+    assert reader.poll() == []
 
+    src.append(b"1,503,140000000,-;[PHOTON RING] Kprobe registered for symbol: vfs_read\n")
+    third = reader.poll()
+    assert len(third) == 1
+    assert third[0].data["symbol"] == "vfs_read"
 
-FAKE_DMESG_SAME_TS = """\
-kern  :info  : [  120.001234] [PHOTON RING] Kprobe registered for symbol: do_init_module
-kern  :warn  : [  120.001234] [PHOTON RING] SUSPICIOUS *** kallsyms_lookup_name probe detected!
-"""
-
-
-@patch("python_tools.core.modules.kprobe_reader.subprocess.run")
-def test_kprobe_reader_same_timestamp_different_msg(mock_run):
-    """Events with identical timestamps but different messages are both captured."""
-    mock_run.return_value = MagicMock(stdout=FAKE_DMESG_SAME_TS)
 
-    reader = KprobeReaderModule()
+def test_kprobe_reader_same_timestamp_different_msg():
+    """Records with identical timestamps are distinguished by sequence number."""
+    src = io.BytesIO(
+        b"1,10,120001234,-;[PHOTON RING] Kprobe registered for symbol: do_init_module\n"
+        b"1,11,120001234,-;[PHOTON RING] SUSPICIOUS *** kallsyms_lookup_name probe detected!\n"
+    )
+    reader = KprobeReaderModule(source=src)
     reader.start({})
 
     events = reader.poll()
@@ -131,19 +268,75 @@ def test_kprobe_reader_same_timestamp_different_msg(mock_run):
     assert events[1].type == "suspicious_probe"
 
 
+def test_kprobe_reader_skips_replayed_sequence_numbers():
+    src = io.BytesIO(FAKE_KMSG + FAKE_KMSG)
+    reader = KprobeReaderModule(source=src)
+    reader.start({})
+    assert len(reader.poll()) == 2
+
+
+def test_kprobe_reader_handles_partial_record():
+    src = GrowingSource(b"1,7,5000000,-;[PHOTON RING] Kprobe registered for sym")
+    reader = KprobeReaderModule(source=src)
+    reader.start({})
+    assert reader.poll() == []
+
+    src.append(b"bol: do_exit\n")
+    events = reader.poll()
+    assert len(events) == 1
+    assert events[0].data["symbol"] == "do_exit"
+
+
+def test_kprobe_reader_opens_path_from_config(tmp_path):
+    kmsg = tmp_path / "kmsg"
+    kmsg.write_bytes(FAKE_KMSG)
+
+    reader = KprobeReaderModule()
+    reader.start({"communication": {"kmsg_path": str(kmsg)}})
+    assert len(reader.poll()) == 2
+    reader.stop()
+    assert reader.poll() == []
+
+
+def test_kprobe_reader_fileno_only_for_waitable_sources(tmp_path):
+    kmsg = tmp_path / "kmsg"
+    kmsg.write_bytes(FAKE_KMSG)
+    reader = KprobeReaderModule(source=str(kmsg))
+    reader.start({})
+    assert reader.fileno() is None      # regular files are always "ready"
+    reader.stop()
+
+    assert KprobeReaderModule(source=io.BytesIO()).fileno() is None
+
+    r, w = os.pipe()
+    with os.fdopen(r, "rb", buffering=0) as pipe_r:
+        reader = KprobeReaderModule(source=pipe_r)
+        reader.start({})
+        assert reader.fileno() == r
+    os.close(w)
+
+
+def test_kprobe_reader_missing_device_is_quiet(tmp_path):
+    reader = KprobeReaderModule(source=str(tmp_path / "does-not-exist"))
+    reader.start({})
+    assert reader.poll() == []
+
+
 # --------------- Dashboard smoke tests ---------------
 
 @pytest.fixture()
 def dashboard_client():
-    """Yield a Flask test client with a clean event deque."""
-    with _lock:
-        _events.clear()
+    """Yield a Flask test client with a clean, default-sized event deque."""
+    dashboard.configure(500)
+    with dashboard._lock:
+        dashboard._events.clear()
     app = create_app()
     app.config["TESTING"] = True
     with app.test_client() as client:
         yield client
-    with _lock:
-        _events.clear()
+    dashboard.configure(500)
+    with dashboard._lock:
+        dashboard._events.clear()
 
 
 def test_dashboard_index_returns_html(dashboard_client):
@@ -183,6 +376,113 @@ def test_api_events_respects_maxlen(dashboard_client):
     assert data[0]["seq"] == 2   # first two evicted
 
 
+def test_configure_resizes_the_same_buffer(dashboard_client):
+    events = dashboard._events
+    push_events(_bulk(range(10)))
+    dashboard.configure(4)
+    with dashboard._lock:
+        assert dashboard._events is events
+        assert [e[0] for e in events] == [6, 7, 8, 9]
+    push_events(_bulk(range(10, 13)))
+    assert [ev["seq"] for ev in dashboard_client.get("/api/events").json] == [9, 10, 11, 12]
+
+
+def _bulk(seqs):
+    return [LKSMEvent(seq=i, ts=float(i), type="bulk", data={"i": i}, source="test")
+            for i in seqs]
+
+
+def test_api_events_since_returns_only_newer(dashboard_client):
+    push_events(_bulk(range(1, 11)))
+    resp = dashboard_client.get("/api/events?since=7")
+    assert [ev["seq"] for ev in resp.json] == [8, 9, 10]
+    assert dashboard_client.get("/api/events?since=10").json == []
+
+
+def test_api_events_long_poll_wakes_on_push(dashboard_client):
+    push_events(_bulk([1]))
+    timer = threading.Timer(0.05, push_events, args=(_bulk([2]),))
+    timer.start()
+    t0 = time.monotonic()
+    resp = dashboard_client.get("/api/events?since=1&wait=5")
+    timer.join()
+    assert [ev["seq"] for ev in resp.json] == [2]
+    assert time.monotonic() - t0 < 4
+
+
+@pytest.mark.parametrize("wait, min_elapsed", [("0.3", 0.25), ("nan", 0.0), ("x", 0.0)])
+def test_api_events_wait_accepts_fractional_seconds(dashboard_client, wait, min_elapsed):
+    push_events(_bulk([1]))
+    t0 = time.monotonic()
+    resp = dashboard_client.get(f"/api/events?since=1&wait={wait}")
+    elapsed = time.monotonic() - t0
+    assert resp.json == []
+    assert min_elapsed <= elapsed < 2
+
+
+def test_api_stream_sends_backlog_then_new_events(dashboard_client):
+    push_events(_bulk([1, 2]))
+    resp = dashboard_client.get("/api/stream", buffered=False)
+    assert resp.content_type.startswith("text/event-stream")
+    frames = iter(resp.response)
+    assert next(frames).startswith(b"retry:")
+    backlog = next(frames)
+    assert backlog.startswith(b"id: 1\ndata: {")
+    assert b"id: 2\n" in backlog
+
+    push_events(_bulk([3]))
+    frame = next(frames)
+    assert frame.startswith(b"id: 3\ndata: ")
+    assert json.loads(frame.split(b"data: ", 1)[1])["seq"] == 3
+    resp.close()
+
+
+def test_api_events_limit_and_filters(dashboard_client):
+    push_events([
+        LKSMEvent(seq=i, ts=float(i), type="probe" if i % 2 else "rule_match",
+                  data={}, severity="high" if i % 3 == 0 else "info")
+        for i in range(1, 13)
+    ])
+    get = lambda q: [ev["seq"] for ev in dashboard_client.get("/api/events?" + q).json]
+    assert get("limit=3") == [10, 11, 12]              # newest without a cursor
+    assert get("since=4&limit=3") == [5, 6, 7]         # next page after a cursor
+    assert get("type=probe") == [1, 3, 5, 7, 9, 11]
+    assert get("severity=high") == [3, 6, 9, 12]
+    assert get("type=probe&severity=high") == [3, 9]
+    assert get("type=rule_match,probe&limit=2") == [11, 12]
+
+
+def test_api_events_etag_not_modified(dashboard_client):
+    push_events(_bulk([1]))
+    first = dashboard_client.get("/api/events")
+    etag = first.headers["ETag"]
+    again = dashboard_client.get("/api/events", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+
+    push_events(_bulk([2]))
+    changed = dashboard_client.get("/api/events", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert len(changed.json) == 2
+
+
+def test_buffer_size_from_config(dashboard_client):
+    create_app({"dashboard": {"max_events_display": 5}})
+    push_events(_bulk(range(1, 11)))
+    assert [ev["seq"] for ev in dashboard_client.get("/api/events").json] == [6, 7, 8, 9, 10]
+
+
+def test_api_stream_resumes_from_last_event_id(dashboard_client):
+    push_events(_bulk([1, 2, 3]))
+    resp = dashboard_client.get("/api/stream", headers={"Last-Event-ID": "2"},
+                                buffered=False)
+    frames = iter(resp.response)
+    next(frames)
+    assert next(frames).startswith(b"id: 3\n")
+    resp.close()
+
+
 # --------------- JSON logger smoke tests ---------------
 
 def test_logger_creates_jsonl(tmp_path):
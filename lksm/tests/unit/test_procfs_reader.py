@@ -0,0 +1,134 @@
+"""
+Tests for the binary /proc/lksm transport (ProcfsReaderModule).
+"""
+
+import os
+
+import pytest
+
+from python_tools.core.modules.kprobe_reader import KprobeReaderModule, _parse_message
+from python_tools.core.modules.procfs_reader import (
+    F_SUSPICIOUS, RECORD, ProcfsReaderModule, decode_records, encode_record,
+)
+
+
+def _records(start, count, **kw):
+    return b"".join(encode_record(seq, seq * 1_000_000, f"sym{seq}", pid=100 + seq, **kw)
+                    for seq in range(start, start + count))
+
+
+def test_record_layout_matches_kernel_header():
+    assert RECORD.size == 96
+
+
+def test_decode_batch():
+    blob = _records(0, 3) + encode_record(3, 5_000_000_000, "kallsyms_lookup_name",
+                                          pid=42, flags=F_SUSPICIOUS)
+    events, last, lost, end = decode_records(blob)
+    assert [ev.type for ev in events] == ["kprobe_registered"] * 4 + ["suspicious_probe"]
+    assert events[0].data == {"symbol": "sym0", "pid": 100}
+    assert events[3].ts == 5.0
+    assert events[4].severity == "high"
+    assert events[4].data == {"message": "SUSPICIOUS *** kallsyms_lookup_name probe detected!"}
+    assert (last, lost, end) == (3, 0, len(blob))
+
+
+def test_suspicious_data_matches_kmsg_transport():
+    events, _, _, _ = decode_records(encode_record(0, 0, "kallsyms_lookup_name",
+                                                   flags=F_SUSPICIOUS))
+    assert _parse_message("SUSPICIOUS *** kallsyms_lookup_name probe detected!") == (
+        events[1].severity, events[1].type, events[1].data)
+
+
+def test_decode_stops_at_bad_header():
+    blob = _records(0, 2) + b"\0" * RECORD.size + _records(2, 1)
+    events, last, lost, end = decode_records(blob)
+    assert [ev.data["symbol"] for ev in events] == ["sym0", "sym1"]
+    assert (last, lost, end) == (1, 0, 2 * RECORD.size)
+
+
+def test_decode_counts_sequence_gaps():
+    blob = _records(0, 2) + _records(5, 1)
+    _, last, lost, _ = decode_records(blob)
+    assert (last, lost) == (5, 3)
+
+
+def test_long_symbol_is_truncated():
+    events, _, _, _ = decode_records(encode_record(0, 0, "x" * 200))
+    assert events[0].data["symbol"] == "x" * 63
+
+
+def test_reader_on_regular_file(tmp_path):
+    path = tmp_path / "lksm"
+    path.write_bytes(_records(0, 300))
+    reader = ProcfsReaderModule(source=str(path))
+    reader.start({})
+    assert reader.fileno() is None              # interval-polled
+    events = reader.poll()
+    assert len(events) == 300
+    assert events[-1].data["symbol"] == "sym299"
+    assert reader.poll() == []
+
+    with open(path, "ab") as f:
+        f.write(_records(310, 2))
+    assert [ev.data["symbol"] for ev in reader.poll()] == ["sym310", "sym311"]
+    assert reader.lost == 10
+    reader.stop()
+
+
+def test_reader_on_fifo_reassembles_partial_records(tmp_path):
+    path = tmp_path / "lksm.fifo"
+    os.mkfifo(path)
+    reader = ProcfsReaderModule(source=str(path))
+    reader.start({})
+    assert reader.fileno() is not None          # waitable
+    with open(path, "wb", buffering=0) as w:
+        blob = _records(0, 3)
+        w.write(blob[:150])
+        assert [ev.data["symbol"] for ev in reader.poll()] == ["sym0"]
+        w.write(blob[150:])
+        assert [ev.data["symbol"] for ev in reader.poll()] == ["sym1", "sym2"]
+    reader.stop()
+
+
+def test_reader_resyncs_after_garbage(tmp_path, capsys):
+    path = tmp_path / "lksm"
+    path.write_bytes(b"\0" * RECORD.size)
+    reader = ProcfsReaderModule(source=str(path))
+    reader.start({})
+    assert reader.poll() == []
+    assert "bad record header" in capsys.readouterr().out
+    with open(path, "ab") as f:
+        f.write(_records(0, 1))
+    assert len(reader.poll()) == 1
+    assert reader.errors == 1
+
+
+def test_reader_keeps_records_around_garbage_in_one_read(tmp_path, capsys):
+    path = tmp_path / "lksm"
+    path.write_bytes(_records(0, 3) + b"junk" * 10 + _records(3, 2) + b"\xff" * 7)
+    reader = ProcfsReaderModule(source=str(path))
+    reader.start({})
+    assert [ev.data["symbol"] for ev in reader.poll()] == ["sym0", "sym1", "sym2",
+                                                           "sym3", "sym4"]
+    assert reader.errors == 1 and reader.lost == 0
+    assert capsys.readouterr().out.count("bad record header") == 1
+
+
+@pytest.mark.parametrize("interface, kmsg_active, procfs_active", [
+    ("kmsg", True, False),
+    ("procfs", False, True),
+])
+def test_interface_selects_transport(tmp_path, interface, kmsg_active, procfs_active):
+    (tmp_path / "kmsg").write_bytes(b"")
+    (tmp_path / "lksm").write_bytes(b"")
+    config = {"communication": {"interface": interface,
+                                "kmsg_path": str(tmp_path / "kmsg"),
+                                "procfs_path": str(tmp_path / "lksm")}}
+    kmsg, procfs = KprobeReaderModule(), ProcfsReaderModule()
+    kmsg.start(config)
+    procfs.start(config)
+    assert (kmsg._file is not None) == kmsg.active == kmsg_active
+    assert (procfs._fd is not None) == procfs.active == procfs_active
+    kmsg.stop()
+    procfs.stop()
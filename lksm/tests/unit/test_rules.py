@@ -0,0 +1,118 @@
+"""
+Tests for the compiled rules engine (config/rules.yml).
+"""
+
+from pathlib import Path
+
+import pytest
+import yaml
+
+from python_tools.analysis.analyzer import EventFilter, analyze_files, analyze_parallel
+from python_tools.analysis.rules import RuleEngine
+from python_tools.core.module_base import LKSMEvent
+
+RULES_YML = Path(__file__).resolve().parents[2] / "config" / "rules.yml"
+
+
+@pytest.fixture(scope="module")
+def engine_spec():
+    return yaml.safe_load(RULES_YML.read_text())
+
+
+@pytest.fixture()
+def engine(engine_spec):
+    return RuleEngine(engine_spec)
+
+
+def _names(rules):
+    return [r.name for r in rules]
+
+
+def test_bundled_rules_compile(engine):
+    assert len(engine.rules) == 3
+
+
+def test_shell_from_web_server(engine):
+    hit = engine.match("process", {"parent_process_name": "nginx", "child_process_name": "bash"})
+    assert _names(hit) == ["Suspicious shell spawn from web server"]
+    assert engine.match("process", {"parent_process_name": "cron", "child_process_name": "bash"}) == []
+    assert engine.match("process", {"parent_process_name": "nginx", "child_process_name": "python"}) == []
+
+
+def test_module_not_in_named_allowlist(engine):
+    assert _names(engine.match("module", {"module_name": "rootkit"})) == \
+        ["Unauthorized kernel module load"]
+    assert engine.match("module", {"module_name": "kprobe_detector"}) == []
+    assert engine.match("module", {}) == []
+
+
+def test_sensitive_file_globs(engine):
+    for path in ("/etc/shadow", "/etc/passwd", "/root/.ssh/id_rsa"):
+        assert _names(engine.match("file", {"path": path})) == ["Sensitive file access"], path
+    assert engine.match("file", {"path": "/etc/hosts"}) == []
+    assert engine.match("file", {"path": None}) == []
+
+
+def test_rules_are_indexed_by_type(engine):
+    # A process-shaped payload on a different event type never matches.
+    assert engine.match("file", {"parent_process_name": "nginx",
+                                 "child_process_name": "bash"}) == []
+
+
+def test_wildcard_rules_apply_to_every_type():
+    engine = RuleEngine({"rules": [
+        {"name": "any sym", "condition": {"symbol": ["kallsyms_lookup_name"]}},
+        {"name": "typed", "type": "kprobe_registered", "condition": {"symbol": "vfs_read"}},
+    ]})
+    assert _names(engine.match("kprobe_registered", {"symbol": "kallsyms_lookup_name"})) == ["any sym"]
+    assert _names(engine.match("other", {"symbol": "kallsyms_lookup_name"})) == ["any sym"]
+    assert _names(engine.match("kprobe_registered", {"symbol": "vfs_read"})) == ["typed"]
+
+
+def test_hit_counters_and_eval_cost(engine):
+    for _ in range(3):
+        engine.match("file", {"path": "/etc/shadow"})
+    engine.match("file", {"path": "/tmp/x"})
+    stats = engine.stats()
+    assert stats["hits"]["Sensitive file access"] == 3
+    assert stats["hits"]["Unauthorized kernel module load"] == 0
+    assert stats["evaluated"] == 4
+    assert stats["avg_eval_ns"] > 0
+
+
+def test_evaluate_emits_rule_match_events(engine):
+    ev = LKSMEvent(seq=41, ts=9.0, type="module", data={"module_name": "evil"}, source="x")
+    alerts = engine.evaluate([ev])
+    assert len(alerts) == 1
+    alert = alerts[0]
+    assert alert.type == "rule_match"
+    assert alert.severity == "critical"
+    assert alert.data["rule"] == "Unauthorized kernel module load"
+    assert alert.data["event_seq"] == 41
+    # Alerts are not re-evaluated.
+    assert engine.evaluate(alerts) == []
+
+
+@pytest.mark.parametrize("spec", [
+    {"rules": [{"description": "no name"}]},
+    {"rules": [{"name": "a"}, {"name": "a"}]},
+    {"rules": [{"name": "a", "condition": {"module_name_not_in": "missing_list"}}]},
+    {"rules": [{"name": "a", "condition": ["not", "a", "mapping"]}]},
+])
+def test_invalid_rules_are_rejected(spec):
+    with pytest.raises(ValueError):
+        RuleEngine(spec)
+
+
+def test_analyzer_counts_rule_hits(tmp_path, engine_spec):
+    path = tmp_path / "lksm_events_2026-02-10.jsonl"
+    events = [LKSMEvent(seq=i, ts=float(i), type="file",
+                        data={"path": "/etc/shadow" if i % 4 == 0 else "/tmp/f"})
+              for i in range(100)]
+    path.write_bytes(b"".join(ev.to_json() + b"\n" for ev in events))
+
+    single = analyze_files([str(path)], EventFilter(), rules_spec=engine_spec).report()
+    assert single["rule_hits"] == {"Sensitive file access": 25}
+    parallel = analyze_parallel([str(path)], EventFilter(), workers=2, shard_bytes=500,
+                                rules_spec=engine_spec).report()
+    assert parallel == single
@@ -0,0 +1,214 @@
+"""
+Tests for the RFC 5424 syslog alert sink.
+"""
+
+import errno
+import os
+import re
+import socket
+
+import pytest
+
+from python_tools.core.module_base import LKSMEvent
+from python_tools.output.syslog_sink import SyslogSink, parse_address
+
+_RFC5424 = re.compile(rb"<(\d+)>1 (\S+) host lksm (\d+) (\S+) - (\{.*\})$")
+
+
+def _alerts(n, severity="high", type_="rule_match"):
+    return [LKSMEvent(seq=i, ts=float(i), type=type_, data={"rule": "r"},
+                      severity=severity, source="rules") for i in range(n)]
+
+
+@pytest.fixture()
+def dgram(tmp_path):
+    path = str(tmp_path / "log")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(path)
+    sock.settimeout(2.0)
+    yield path, sock
+    sock.close()
+
+
+def _recv_all(sock, n):
+    return [sock.recv(65536) for _ in range(n)]
+
+
+def test_records_are_rfc5424(dgram):
+    path, server = dgram
+    sink = SyslogSink(path, facility="auth", hostname="host.example")
+    sink.submit(_alerts(1, "critical") + _alerts(1, "medium", "anomaly"))
+    sink.close()
+    first, second = (_RFC5424.match(r) for r in _recv_all(server, 2))
+    assert first.group(1) == b"34"                 # auth(4) * 8 + crit(2)
+    assert second.group(1) == b"36" and second.group(4) == b"anomaly"
+    assert re.match(rb"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{6}Z$", first.group(2))
+    assert b'"seq": 0' in first.group(5)
+    assert sink.stats()["sent"] == 2
+
+
+def test_info_is_kept_off_the_wire(dgram):
+    path, server = dgram
+    sink = SyslogSink(path)
+    sink.submit(_alerts(5, "info") + _alerts(1, "medium"))
+    sink.close()
+    assert len(_recv_all(server, 1)) == 1
+    server.settimeout(0.1)
+    with pytest.raises(socket.timeout):
+        server.recv(65536)
+    assert sink.stats()["sent"] == 1
+
+
+def test_tcp_batches_use_octet_counting():
+    server = socket.create_server(("127.0.0.1", 0))
+    port = server.getsockname()[1]
+    sink = SyslogSink(f"tcp://127.0.0.1:{port}", hostname="host")
+    sink.submit(_alerts(200))
+    conn, _ = server.accept()
+    sink.close()
+    data = b""
+    conn.settimeout(2.0)
+    while True:
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    records = []
+    while data:
+        length, _, data = data.partition(b" ")
+        records.append(data[:int(length)])
+        data = data[int(length):]
+    assert len(records) == 200 and all(_RFC5424.match(r) for r in records)
+    assert sink.stats()["connects"] == 1
+    conn.close()
+    server.close()
+
+
+def test_reconnects_after_receiver_restarts(dgram):
+    path, server = dgram
+    sink = SyslogSink(path, reconnect_delay=0.0)
+    sink.submit(_alerts(1))
+    _recv_all(server, 1)
+    server.close()
+    os.unlink(path)
+    fresh = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    fresh.bind(path)
+    fresh.settimeout(2.0)
+    sink.submit(_alerts(3))
+    sink.close()
+    assert len(_recv_all(fresh, 3)) == 3
+    assert sink.stats()["connects"] == 2
+    fresh.close()
+
+
+def test_missing_receiver_counts_failures_without_blocking(tmp_path, capsys):
+    sink = SyslogSink(str(tmp_path / "nowhere"), reconnect_delay=60)
+    sink.submit(_alerts(10))
+    sink.submit(_alerts(10))
+    sink.close()
+    assert sink.stats()["failed"] == 20 and sink.stats()["sent"] == 0
+    assert capsys.readouterr().out.count("cannot reach syslog") == 1
+
+
+class _FlakySocket:
+    """Datagram socket stand-in: fails with *errnos* on the given sends."""
+
+    def __init__(self, wire, fail_at):
+        self.wire, self.fail_at, self.calls = wire, fail_at, 0
+
+    def send(self, data):
+        self.calls += 1
+        err = self.fail_at.get(self.calls)
+        if err:
+            raise OSError(err, os.strerror(err))
+        self.wire.append(data)
+        return len(data)
+
+    def close(self):
+        pass
+
+
+def test_retry_resumes_after_the_last_sent_record(monkeypatch):
+    wire = []
+    socks = iter([_FlakySocket(wire, {3: errno.ECONNREFUSED}), _FlakySocket(wire, {})])
+    sink = SyslogSink("/dev/null", reconnect_delay=0.0)
+    monkeypatch.setattr(sink, "_connect", lambda: next(socks))
+    sink._write([b"r0", b"r1", b"r2", b"r3"])
+    assert wire == [b"r0", b"r1", b"r2", b"r3"]
+    assert (sink.sent, sink.failed, sink.connects) == (4, 0, 2)
+    sink.close()
+
+
+def test_tcp_resends_a_record_cut_off_mid_frame(monkeypatch):
+    class Stream:
+        def __init__(self, limit):
+            self.data, self.limit = b"", limit
+
+        def send(self, data):
+            if self.limit is not None and len(self.data) >= self.limit:
+                raise OSError(errno.EPIPE, "broken pipe")
+            n = len(data) if self.limit is None else min(len(data), self.limit - len(self.data))
+            self.data += bytes(data[:n])
+            return n
+
+        def close(self):
+            pass
+
+    first, second = Stream(limit=10), Stream(limit=None)   # frames are 6 bytes each
+    socks = iter([first, second])
+    sink = SyslogSink("tcp://127.0.0.1:1", reconnect_delay=0.0)
+
+    def connect():
+        sink._stream = True
+        return next(socks)
+
+    monkeypatch.setattr(sink, "_connect", connect)
+    sink._write([b"r0xx", b"r1xx", b"r2xx"])
+    assert first.data == b"4 r0xx4 r1"
+    assert second.data == b"4 r1xx4 r2xx"
+    assert (sink.sent, sink.failed) == (3, 0)
+    sink.close()
+
+
+def test_oversized_datagram_is_dropped_alone(monkeypatch, capsys):
+    wire = []
+    sink = SyslogSink("/dev/null")
+    monkeypatch.setattr(sink, "_connect", lambda: _FlakySocket(wire, {2: errno.EMSGSIZE}))
+    sink._write([b"r0", b"big", b"r2"])
+    assert wire == [b"r0", b"r2"]
+    assert (sink.sent, sink.failed, sink.connects) == (2, 1, 1)
+    assert "dropping 3-byte syslog record" in capsys.readouterr().out
+    sink.close()
+
+
+def test_failed_counts_only_unsent_records(monkeypatch):
+    wire = []
+    sink = SyslogSink("/dev/null", reconnect_delay=60)
+    socks = iter([_FlakySocket(wire, {2: errno.EPIPE}), _FlakySocket(wire, {1: errno.EPIPE})])
+    monkeypatch.setattr(sink, "_connect", lambda: next(socks))
+    sink._write([b"r0", b"r1", b"r2"])
+    assert wire == [b"r0"]
+    assert (sink.sent, sink.failed) == (1, 2)
+    sink.close()
+
+
+def test_config_and_addresses():
+    assert SyslogSink.from_config({"alerts": {"enabled": True, "syslog": False}}) is None
+    assert SyslogSink.from_config({"alerts": {"enabled": False, "syslog": True}}) is None
+    assert parse_address("udp://10.0.0.1:514") == ("udp", ("10.0.0.1", 514))
+    assert parse_address("tcp://[::1]:601") == ("tcp", ("::1", 601))
+    with pytest.raises(ValueError):
+        parse_address("http://x:1")
+    with pytest.raises(ValueError):
+        SyslogSink("/dev/null", facility="nope")
+
+
+def test_udp_transport():
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(("127.0.0.1", 0))
+    server.settimeout(2.0)
+    sink = SyslogSink(f"udp://127.0.0.1:{server.getsockname()[1]}", hostname="host")
+    sink.submit(_alerts(3))
+    sink.close()
+    assert all(_RFC5424.match(r) for r in _recv_all(server, 3))
+    server.close()
@@ -0,0 +1,133 @@
+"""
+Tests for the batched webhook alert dispatcher.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from python_tools.core.module_base import LKSMEvent
+from python_tools.output.webhook import WebhookDispatcher
+
+
+class _Hook(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"      # keep-alive
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        srv = self.server
+        with srv.lock:
+            srv.peers.add(self.client_address)
+            status = srv.statuses.pop(0) if srv.statuses else 200
+            if status == 200:
+                srv.batches.append(json.loads(body))
+        if srv.delay:
+            time.sleep(srv.delay)
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Hook)
+    srv.daemon_threads = True
+    srv.lock = threading.Lock()
+    srv.peers, srv.batches, srv.statuses, srv.delay = set(), [], [], 0.0
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    srv.url = f"http://127.0.0.1:{srv.server_address[1]}/hook"
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _alerts(n, severity="high"):
+    return [LKSMEvent(seq=i, ts=float(i), type="rule_match", data={"rule": "r"},
+                      severity=severity, source="rules") for i in range(n)]
+
+
+def _received(srv):
+    return [ev["seq"] for batch in srv.batches for ev in batch["events"]]
+
+
+def test_events_are_batched_over_persistent_connections(server):
+    hooks = WebhookDispatcher([{"url": server.url, "batch_size": 50, "concurrency": 2,
+                                "linger": 0.2}])
+    for i in range(4):
+        hooks.submit(_alerts(50)[i * 10:(i + 1) * 10] + _alerts(250)[50 + i * 50:100 + i * 50])
+    hooks.close()
+    stats = hooks.stats()[server.url]
+    assert stats["sent"] == 240
+    assert sorted(_received(server)) == sorted(list(range(40)) + list(range(50, 250)))
+    assert all(len(b["events"]) == b["count"] <= 50 for b in server.batches)
+    assert stats["batches"] < 20
+    assert len(server.peers) <= 2 and stats["connections"] <= 2
+
+
+def test_below_min_severity_is_not_posted(server):
+    hooks = WebhookDispatcher([{"url": server.url}], {"min_severity": "medium", "linger": 0})
+    hooks.submit(_alerts(3, "info") + _alerts(2, "medium"))
+    hooks.close()
+    assert [len(b["events"]) for b in server.batches] == [2]
+
+
+def test_server_errors_are_retried_with_backoff(server):
+    server.statuses = [500, 503]
+    hooks = WebhookDispatcher([{"url": server.url, "backoff": 0.01, "linger": 0,
+                                "concurrency": 1}])
+    hooks.submit(_alerts(5))
+    hooks.close()
+    stats = hooks.stats()[server.url]
+    assert stats["retries"] == 2 and stats["failed"] == 0
+    assert _received(server) == [0, 1, 2, 3, 4]
+
+
+def test_client_errors_are_not_retried(server, capsys):
+    server.statuses = [400]
+    hooks = WebhookDispatcher([{"url": server.url, "backoff": 0.01, "linger": 0,
+                                "concurrency": 1}])
+    hooks.submit(_alerts(1))
+    hooks.close()
+    assert hooks.stats()[server.url]["failed"] == 1
+    assert hooks.stats()[server.url]["retries"] == 0
+    assert "not delivered" in capsys.readouterr().out
+
+
+def test_unreachable_endpoint_never_blocks_submit(server):
+    port = server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    hooks = WebhookDispatcher([{"url": f"http://127.0.0.1:{port}/", "queue_size": 100,
+                                "backoff": 0.05, "concurrency": 1}])
+    start = time.monotonic()
+    for _ in range(50):
+        hooks.submit(_alerts(20))
+    assert time.monotonic() - start < 0.5
+    hooks.close(timeout=1.0)
+    stats = hooks.stats()[f"http://127.0.0.1:{port}/"]
+    assert stats["sent"] == 0 and stats["dropped"] >= 800
+
+
+def test_slow_endpoint_limits_in_flight_requests(server):
+    server.delay = 0.05
+    hooks = WebhookDispatcher([{"url": server.url, "batch_size": 1, "linger": 0,
+                                "concurrency": 3}])
+    hooks.submit(_alerts(30))
+    hooks.close()
+    assert hooks.stats()[server.url]["sent"] == 30
+    assert len(server.peers) <= 3
+
+
+def test_from_config_requires_enabled_url():
+    assert WebhookDispatcher.from_config({"alerts": {"enabled": True, "webhooks": [
+        {"url": "", "enabled": False}]}}) is None
+    assert WebhookDispatcher.from_config({"alerts": {"enabled": False, "webhooks": [
+        {"url": "http://x/"}]}}) is None
+    with pytest.raises(ValueError):
+        WebhookDispatcher([{"url": "ftp://x/"}])